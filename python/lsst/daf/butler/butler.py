@@ -386,6 +386,100 @@ class Butler:
 
         return ref
 
+    @transactional
+    def putMany(self, items, producer=None):
+        """Store and register many datasets.
+
+        All `Registry` entries are added (in bulk, for each `DatasetType`)
+        within a single transaction before any dataset is written, and (for
+        datastores that support it) the datasets are then written
+        concurrently.  If any write fails, the transaction is rolled back,
+        removing both the `Registry` entries and any files already written.
+
+        Parameters
+        ----------
+        items : iterable of `tuple`
+            Tuples of ``(obj, datasetRefOrType, dataId)``, with the same
+            meaning as the corresponding arguments to `put`.  ``dataId``
+            should be `None` when ``datasetRefOrType`` is a `DatasetRef`.
+        producer : `Quantum`, optional
+            The producer of all datasets.
+
+        Returns
+        -------
+        refs : `list` of `DatasetRef`
+            References to the stored datasets, in the same order as
+            ``items``.
+
+        Raises
+        ------
+        TypeError
+            Raised if the butler was not constructed with a Run, and is hence
+            read-only.
+        """
+        if self.run is None:
+            raise TypeError("Butler is read-only.")
+        standardized = []
+        for obj, datasetRefOrType, dataId in items:
+            if isinstance(datasetRefOrType, DatasetRef) and datasetRefOrType.id is not None:
+                raise ValueError("DatasetRef must not be in registry, must have None id")
+            datasetType, dataId = self._standardizeArgs(datasetRefOrType, dataId)
+            standardized.append((obj, datasetType, dataId))
+        log.debug("Butler putMany: %d datasets, producer=%s", len(standardized), producer)
+
+        toStore = []
+        refs = self._addDatasetsForPut(standardized, producer, toStore)
+        self.datastore.putMany(toStore)
+        return refs
+
+    def _addDatasetsForPut(self, items, producer, toStore):
+        """Add `Registry` entries for datasets about to be stored, recursing
+        into the components of virtual composites.
+
+        Parameters
+        ----------
+        items : `list` of `tuple`
+            Tuples of ``(obj, datasetType, dataId)``.
+        producer : `Quantum` or `None`
+            The producer of all datasets.
+        toStore : `list`
+            List to which ``(obj, ref)`` pairs that must be written to the
+            datastore are appended.
+
+        Returns
+        -------
+        refs : `list` of `DatasetRef`
+            References to the added datasets, in the same order as ``items``.
+        """
+        refs = [None]*len(items)
+        byType = {}
+        for i, (obj, datasetType, dataId) in enumerate(items):
+            byType.setdefault(datasetType, []).append(i)
+        for datasetType, indices in byType.items():
+            # If not a virtual composite, add and attach components at the
+            # same time.
+            isVirtualComposite = self.composites.shouldBeDisassembled(datasetType)
+            added = self.registry.addDatasets(datasetType, [items[i][2] for i in indices], run=self.run,
+                                              producer=producer, recursive=not isVirtualComposite)
+            for i, ref in zip(indices, added):
+                refs[i] = ref
+            if isVirtualComposite:
+                assembler = datasetType.storageClass.assembler()
+                compItems = []
+                parents = []
+                for i, ref in zip(indices, added):
+                    obj, _, dataId = items[i]
+                    for component, info in assembler.disassemble(obj).items():
+                        compType = self.registry.getDatasetType(datasetType.componentTypeName(component))
+                        compItems.append((info.component, compType, dataId))
+                        parents.append((component, ref))
+                compRefs = self._addDatasetsForPut(compItems, producer, toStore)
+                for (component, ref), compRef in zip(parents, compRefs):
+                    self.registry.attachComponent(component, ref, compRef)
+            else:
+                toStore.extend((items[i][0], ref) for i, ref in zip(indices, added))
+        return refs
+
     def getDirect(self, ref, parameters=None):
         """Retrieve a stored dataset.
 
@@ -477,6 +571,76 @@ class Butler:
             raise ValueError("DatasetRef.id does not match id in registry")
         return self.getDirect(ref, parameters=parameters)
 
+    def getMany(self, refs, parameters=None, *, ordered=True):
+        """Retrieve many stored datasets.
+
+        Datastore records for all datasets are resolved at once and (for
+        datastores that support it) files are read concurrently, so the I/O
+        latency of different datasets overlaps.
+
+        Parameters
+        ----------
+        refs : iterable of `DatasetRef`
+            References to the datasets.  Any that do not have an ``id`` are
+            looked up in the Butler's collection (in bulk, for each
+            `DatasetType`).
+        parameters : `dict`, optional
+            Additional StorageClass-defined options applied to every dataset,
+            typically used to efficiently read only a subset of each.
+        ordered : `bool`, optional
+            If `True` (default), yield datasets in the same order as
+            ``refs``; if `False`, yield them as they are read.
+
+        Yields
+        ------
+        ref : `DatasetRef`
+            Resolved reference to a dataset.
+        obj : `object`
+            The dataset.
+
+        Raises
+        ------
+        LookupError
+            Raised if a dataset without an ``id`` could not be found in the
+            Butler's collection.
+        """
+        refs = list(refs)
+        log.debug("Butler getMany: %d datasets, parameters=%s", len(refs), parameters)
+
+        # Resolve any refs without IDs, with one lookup per DatasetType.
+        unresolved = {}
+        for i, ref in enumerate(refs):
+            if ref.id is None:
+                unresolved.setdefault(ref.datasetType, []).append(i)
+        for datasetType, indices in unresolved.items():
+            dataIds = [DataId(refs[i].dataId, dimensions=datasetType.dimensions,
+                              universe=self.registry.dimensions)
+                       for i in indices]
+            found = self.registry.findMany(self.collection, datasetType, dataIds)
+            for i, dataId in zip(indices, dataIds):
+                ref = found.get(dataId)
+                if ref is None:
+                    raise LookupError("Dataset {} with data ID {} could not be found in {}".format(
+                                      datasetType.name, dataId, self.collection))
+                refs[i] = ref
+
+        # Composites that were disassembled on put have no datastore entry of
+        # their own; they are reassembled from their components by getDirect.
+        disassembled = {i for i, ref in enumerate(refs)
+                        if ref.isComposite() and self.composites.shouldBeDisassembled(ref.datasetType)}
+        results = self.datastore.getMany([ref for i, ref in enumerate(refs) if i not in disassembled],
+                                         parameters=parameters, ordered=ordered)
+        if ordered:
+            for i, ref in enumerate(refs):
+                if i in disassembled:
+                    yield ref, self.getDirect(ref, parameters=parameters)
+                else:
+                    yield next(results)
+        else:
+            yield from results
+            for i in sorted(disassembled):
+                yield refs[i], self.getDirect(refs[i], parameters=parameters)
+
     def getUri(self, datasetRefOrType, dataId=None, predict=False, **kwds):
         """Return the URI to the Dataset.
 
@@ -612,6 +776,82 @@ class Butler:
             # This also implicitly disassociates.
             self.registry.removeDataset(ref)
 
+    def prune(self, refs=None, *, collection=None, delete=True, remember=True, chunkSize=1000,
+              progress=None):
+        """Remove many datasets from a collection and possibly the repository.
+
+        This is a bulk version of `remove`: datasets are processed in chunks,
+        with a small number of `Datastore` and `Registry` operations for each
+        chunk rather than several for each dataset.
+
+        Parameters
+        ----------
+        refs : iterable of `DatasetRef`, optional
+            The datasets to remove.  Must all have valid ``id`` attributes.
+            If `None` (default), all datasets in ``collection`` are removed.
+        collection : `str`, optional
+            The collection to remove the datasets from.  Defaults to the
+            Butler's collection.
+        delete : `bool`
+            If `True` (default) actually delete the datasets from the
+            Datastore (i.e. actually remove files).
+        remember : `bool`
+            If `True` (default), retain dataset and provenance records in
+            the `Registry` for these datasets.
+        chunkSize : `int`, optional
+            Number of datasets to remove with each set of operations.
+        progress : callable, optional
+            Function called after each chunk with the number of datasets
+            removed so far and the total number of datasets to remove.
+            Progress is also logged at DEBUG level.
+
+        Returns
+        -------
+        refs : `list` of `DatasetRef`
+            The datasets that were removed.
+
+        Raises
+        ------
+        ValueError
+            Raised if ``delete`` and ``remember`` are both `False`; a dataset
+            cannot remain in a `Datastore` if all of its `Registry` entries are
+            removed.
+        AmbiguousDatasetError
+            Raised if any of the given datasets has no ``id``.
+        OrphanedRecordError
+            Raised if ``remember`` is `False` but a dataset is still present
+            in a `Datastore` not recognized by this `Butler` client.
+
+        Notes
+        -----
+        Each chunk is removed from the `Datastore` before it is removed from
+        the `Registry`, and chunks that have already been processed are not
+        restored if a later chunk fails.
+        """
+        if not delete and not remember:
+            raise ValueError("Cannot retain dataset in Datastore without keeping Registry dataset record.")
+        if collection is None:
+            collection = self.collection
+        if refs is None:
+            refs = self.registry.getDatasetsInCollection(collection)
+        else:
+            refs = list(refs)
+        total = len(refs)
+        for start in range(0, total, chunkSize):
+            chunk = refs[start:start + chunkSize]
+            if delete:
+                self.datastore.removeMany(chunk)
+            if remember:
+                self.registry.disassociate(collection, chunk)
+            else:
+                # This also implicitly disassociates.
+                self.registry.removeDatasets(chunk)
+            done = start + len(chunk)
+            log.debug("Butler prune: removed %d of %d datasets from %s", done, total, collection)
+            if progress is not None:
+                progress(done, total)
+        return refs
+
     @transactional
     def ingest(self, path, datasetRefOrType, dataId=None, *, formatter=None, transfer=None, **kwds):
         """Store and register a dataset that already exists on disk.
@@ -116,3 +116,72 @@ class DatabaseDict(MutableMapping):
         # This constructor is currently defined just to clearly document the
         # interface subclasses should conform to.
         pass
+
+    def getMany(self, keys):
+        """Return the values associated with many keys.
+
+        The default implementation calls ``__getitem__`` for each key.
+
+        Parameters
+        ----------
+        keys : iterable
+            Keys to look up.
+
+        Returns
+        -------
+        values : `dict`
+            Dictionary mapping key to value.  Keys that are not present are
+            not included.
+        """
+        result = {}
+        for key in keys:
+            try:
+                result[key] = self[key]
+            except KeyError:
+                pass
+        return result
+
+    def setMany(self, items):
+        """Set the values associated with many keys.
+
+        The default implementation calls ``__setitem__`` for each key.
+
+        Parameters
+        ----------
+        items : `dict`
+            Dictionary mapping key to value.
+        """
+        for key, value in items.items():
+            self[key] = value
+
+    def updateMany(self, items):
+        """Replace the values associated with many existing keys.
+
+        Keys that are not present are silently ignored.  The default
+        implementation calls ``__setitem__`` for each present key.
+
+        Parameters
+        ----------
+        items : `dict`
+            Dictionary mapping key to value.
+        """
+        for key, value in items.items():
+            if key in self:
+                self[key] = value
+
+    def deleteMany(self, keys):
+        """Remove the entries associated with many keys.
+
+        Keys that are not present are silently ignored.  The default
+        implementation calls ``__delitem__`` for each key.
+
+        Parameters
+        ----------
+        keys : iterable
+            Keys of the entries to remove.
+        """
+        for key in keys:
+            try:
+                del self[key]
+            except KeyError:
+                pass
@@ -22,6 +22,7 @@
 __all__ = ("DatasetType", "DatasetRef")
 
 from copy import deepcopy
+from collections.abc import MutableMapping
 import hashlib
 import re
 
@@ -38,6 +39,61 @@ def _safeMakeMappingProxyType(data):
     return MappingProxyType(data)
 
 
+class _DeferredComponents(MutableMapping):
+    """A `dict`-like container of component `DatasetRef` instances whose
+    content is only obtained the first time it is accessed.
+
+    Parameters
+    ----------
+    loader : callable
+        Callable with no arguments that returns a mapping of component name
+        to `DatasetRef`.  Called at most once.
+    """
+
+    __slots__ = ("_loader", "_data")
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._data = None
+
+    def _load(self):
+        if self._data is None:
+            self._data = dict(self._loader())
+            self._loader = None
+        return self._data
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+
+    def __delitem__(self, key):
+        del self._load()[key]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def __repr__(self):
+        if self._data is None:
+            return "<deferred components>"
+        return repr(self._data)
+
+    def __reduce__(self):
+        """Support pickling by converting to a regular `dict`.
+        """
+        return (dict, (self._load(),))
+
+    def __deepcopy__(self, memo):
+        """Support deep copy by converting to a regular `dict`, so the loader
+        (and whatever it refers to) is not copied.
+        """
+        return deepcopy(self._load(), memo)
+
+
 class DatasetType:
     r"""A named category of Datasets that defines how they are organized,
     related, and stored.
@@ -458,6 +514,19 @@ class DatasetRef:
         ref._id = None
         return ref
 
+    def _deferComponents(self, loader):
+        """Arrange for `components` to be populated on first access.
+
+        Typically used by `Registry`.
+
+        Parameters
+        ----------
+        loader : callable
+            Callable with no arguments that returns a mapping of component
+            name to `DatasetRef`.  Will be called at most once.
+        """
+        self._components = _DeferredComponents(loader)
+
     def isComponent(self):
         """Boolean indicating whether this `DatasetRef` refers to a
         component of a composite.
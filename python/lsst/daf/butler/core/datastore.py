@@ -26,13 +26,16 @@ Support for generic data stores.
 __all__ = ("DatastoreConfig", "Datastore", "DatastoreValidationError")
 
 import contextlib
+import itertools
 import logging
+import threading
 from collections import namedtuple
 from abc import ABCMeta, abstractmethod
 
 from lsst.utils import doImport
 from .config import ConfigSubset
 from .exceptions import ValidationError
+from .utils import transactional
 
 
 class DatastoreConfig(ConfigSubset):
@@ -211,11 +214,25 @@ class Datastore(metaclass=ABCMeta):
         self.config = DatastoreConfig(config)
         self.registry = registry
         self.name = "ABCDataStore"
-        self._transaction = None
+        self._threadLocal = threading.local()
 
     def __str__(self):
         return self.name
 
+    @property
+    def _transaction(self):
+        """The innermost `DatastoreTransaction` of the calling thread, or
+        `None` if it is not within a transaction.
+
+        Transaction state is kept per thread, so a `Datastore` (together with
+        a thread-safe `Registry`) may be shared between threads.
+        """
+        return getattr(self._threadLocal, "transaction", None)
+
+    @_transaction.setter
+    def _transaction(self, transaction):
+        self._threadLocal.transaction = transaction
+
     def __repr__(self):
         return self.name
 
@@ -271,6 +288,32 @@ class Datastore(metaclass=ABCMeta):
         """
         raise NotImplementedError("Must be implemented by subclass")
 
+    def getMany(self, datasetRefs, parameters=None, ordered=True):
+        """Load many `InMemoryDataset` objects from the store.
+
+        The default implementation calls `get` for each Dataset in turn.
+
+        Parameters
+        ----------
+        datasetRefs : iterable of `DatasetRef`
+            References to the required Datasets.
+        parameters : `dict`, optional
+            `StorageClass`-specific parameters applied to every Dataset.
+        ordered : `bool`, optional
+            If `True` (default), yield Datasets in the same order as
+            ``datasetRefs``; if `False`, implementations may yield them in
+            any order (e.g. as soon as each is read).
+
+        Yields
+        ------
+        datasetRef : `DatasetRef`
+            Reference to a Dataset.
+        inMemoryDataset : `object`
+            Requested Dataset or slice thereof as an InMemoryDataset.
+        """
+        for datasetRef in datasetRefs:
+            yield datasetRef, self.get(datasetRef, parameters=parameters)
+
     @abstractmethod
     def put(self, inMemoryDataset, datasetRef):
         """Write a `InMemoryDataset` with a given `DatasetRef` to the store.
@@ -284,6 +327,21 @@ class Datastore(metaclass=ABCMeta):
         """
         raise NotImplementedError("Must be implemented by subclass")
 
+    @transactional
+    def putMany(self, items):
+        """Write many `InMemoryDataset` objects to the store.
+
+        The default implementation calls `put` for each Dataset.
+
+        Parameters
+        ----------
+        items : iterable of `tuple`
+            Pairs of the `InMemoryDataset` to store and the `DatasetRef`
+            associated with it.
+        """
+        for inMemoryDataset, datasetRef in items:
+            self.put(inMemoryDataset, datasetRef)
+
     def ingest(self, path, ref, formatter=None, transfer=None):
         """Add an on-disk file with the given `DatasetRef` to the store,
         possibly transferring it.
@@ -330,6 +388,50 @@ class Datastore(metaclass=ABCMeta):
             "Datastore does not support direct file-based ingest."
         )
 
+    def ingestMany(self, items, transfer=None, progress=None):
+        """Add many on-disk files to the store, possibly transferring them.
+
+        Unlike `ingest`, a failure to ingest one file does not stop the
+        others from being ingested; failures are returned instead.
+
+        The default implementation calls `ingest` for each file.
+
+        Parameters
+        ----------
+        items : iterable of `tuple`
+            Tuples of ``(path, ref, formatter)``, with the same meaning as the
+            corresponding arguments to `ingest`.  ``formatter`` may be `None`.
+        transfer : str (optional)
+            Transfer mode for all files; see `ingest`.
+        progress : callable, optional
+            Function called after each file is processed (successfully or
+            not) with the number of files processed so far and the total
+            number of files.
+
+        Returns
+        -------
+        failures : `list` of `tuple`
+            Tuples of ``(path, ref, exception)`` for the files that could not
+            be ingested.
+
+        Raises
+        ------
+        NotImplementedError
+            Raised if the given transfer mode is not supported.
+        """
+        items = list(items)
+        failures = []
+        for done, (path, ref, formatter) in enumerate(items, start=1):
+            try:
+                self.ingest(path, ref, formatter=formatter, transfer=transfer)
+            except NotImplementedError:
+                raise
+            except Exception as err:
+                failures.append((path, ref, err))
+            if progress is not None:
+                progress(done, len(items))
+        return failures
+
     @abstractmethod
     def getUri(self, datasetRef):
         """URI to the Dataset.
@@ -371,6 +473,35 @@ class Datastore(metaclass=ABCMeta):
         """
         raise NotImplementedError("Must be implemented by subclass")
 
+    def removeMany(self, refs):
+        """Indicate to the Datastore that many Datasets can be removed.
+
+        Unlike `remove`, datasets that are not present are silently ignored.
+        Composite datasets are removed along with their components.
+
+        The default implementation calls `remove` for each dataset and its
+        components.
+
+        Parameters
+        ----------
+        refs : iterable of `DatasetRef`
+            References to the Datasets to remove.
+
+        Notes
+        -----
+        Some Datastores may implement this method as a silent no-op to
+        disable Dataset deletion through standard interfaces.
+        """
+        for ref in refs:
+            # If a dataset is a composite, we don't know whether it's the
+            # parent or the components that actually need to be removed, so
+            # try them all and swallow errors.
+            for r in itertools.chain([ref], ref.components.values()):
+                try:
+                    self.remove(r)
+                except FileNotFoundError:
+                    pass
+
     @abstractmethod
     def transfer(self, inputDatastore, datasetRef):
         """Retrieve a Dataset from an input `Datastore`, and store the result
@@ -87,6 +87,36 @@ class Formatter(metaclass=ABCMeta):
         """
         raise NotImplementedError("Type does not support writing")
 
+    def writeWithChecksum(self, inMemoryDataset, fileDescriptor, hasher=None):
+        """Write a Dataset, computing the size and checksum of the file as it
+        is written.
+
+        The default implementation calls `write` and computes neither.
+
+        Parameters
+        ----------
+        inMemoryDataset : `InMemoryDataset`
+            The Dataset to store.
+        fileDescriptor : `FileDescriptor`
+            Identifies the file to write.
+        hasher : `object`, optional
+            Object with ``update`` and ``hexdigest`` methods (such as a
+            `hashlib` hash object) that is passed the contents of the file as
+            they are written.
+
+        Returns
+        -------
+        path : `str`
+            The path to where the Dataset was stored.
+        size : `int` or `None`
+            Size of the file in bytes, or `None` if it was not computed.
+        checksum : `str` or `None`
+            ``hasher.hexdigest()`` once it has been passed the full contents
+            of the file, or `None` if ``hasher`` is `None` or the size was
+            not computed.
+        """
+        return self.write(inMemoryDataset, fileDescriptor), None, None
+
     @abstractmethod
     def predictPath(self, location):
         """Return the path that would be returned by write, without actually
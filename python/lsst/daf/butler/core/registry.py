@@ -33,6 +33,7 @@ from .dimensions import DimensionConfig, DimensionUniverse, DataId, DimensionKey
 from .schema import SchemaConfig
 from .utils import transactional
 from .dataIdPacker import DataIdPackerFactory
+from .datasets import DatasetType
 
 
 class AmbiguousDatasetError(Exception):
@@ -127,7 +128,8 @@ class Registry(metaclass=ABCMeta):
         This allows explicit values set in external configs to be retained.
         """
         Config.updateParameters(RegistryConfig, config, full,
-                                toCopy=(("skypix", "cls"), ("skypix", "level")), overwrite=overwrite)
+                                toCopy=(("skypix", "cls"), ("skypix", "level"), ("skypix", "ranges")),
+                                overwrite=overwrite)
 
     @staticmethod
     def fromConfig(registryConfig, schemaConfig=None, dimensionConfig=None, create=False, butlerRoot=None):
@@ -326,6 +328,42 @@ class Registry(metaclass=ABCMeta):
         """
         raise NotImplementedError("Must be implemented by subclass")
 
+    def findMany(self, collection, datasetType, dataIds):
+        """Lookup multiple datasets of the same `DatasetType`.
+
+        The default implementation calls `find` for each data ID.
+
+        Parameters
+        ----------
+        collection : `str`
+            Identifies the collection to search.
+        datasetType : `DatasetType` or `str`
+            A `DatasetType` or the name of one.
+        dataIds : iterable of `dict` or `DataId`
+            `dict`-like objects containing the `Dimension` links that identify
+            each dataset within a collection.
+
+        Returns
+        -------
+        refs : `dict`
+            Dictionary mapping `DataId` to the `DatasetRef` found for it.
+            Data IDs with no matching dataset are not included.
+
+        Raises
+        ------
+        LookupError
+            If one or more data ID keys are missing.
+        """
+        if not isinstance(datasetType, DatasetType):
+            datasetType = self.getDatasetType(datasetType)
+        result = {}
+        for dataId in dataIds:
+            dataId = DataId(dataId, dimensions=datasetType.dimensions, universe=self.dimensions)
+            ref = self.find(collection, datasetType, dataId)
+            if ref is not None:
+                result[dataId] = ref
+        return result
+
     @abstractmethod
     @transactional
     def registerDatasetType(self, datasetType):
@@ -436,6 +474,50 @@ class Registry(metaclass=ABCMeta):
         """
         raise NotImplementedError("Must be implemented by subclass")
 
+    @transactional
+    def addDatasets(self, datasetType, dataIds, run, producer=None, recursive=False, **kwds):
+        """Add multiple Dataset entries of the same `DatasetType` to the
+        `Registry`.
+
+        The default implementation calls `addDataset` for each data ID.
+
+        Parameters
+        ----------
+        datasetType : `DatasetType` or `str`
+            A `DatasetType` or the name of one.
+        dataIds : iterable of `dict` or `DataId`
+            `dict`-like objects containing the `Dimension` links that identify
+            each dataset within a collection.
+        run : `Run`
+            The `Run` instance that produced the Datasets.
+        producer : `Quantum`
+            Unit of work that produced the Datasets.  May be `None` to store
+            no provenance information, but if present the `Quantum` must
+            already have been added to the Registry.
+        recursive : `bool`
+            If True, recursively add Dataset and attach entries for component
+            Datasets as well.
+        kwds
+            Additional keyword arguments passed to the `DataId` constructor
+            to convert each of ``dataIds`` to a true `DataId` or augment an
+            existing one.
+
+        Returns
+        -------
+        refs : `list` of `DatasetRef`
+            Newly-created `DatasetRef` instances, in the same order as
+            ``dataIds``.
+
+        Raises
+        ------
+        ConflictingDefinitionError
+            If a Dataset with the same `DatasetType` and data ID as one of the
+            new Datasets already exists in the given collection.
+        """
+        return [self.addDataset(datasetType, dataId, run=run, producer=producer, recursive=recursive,
+                                **kwds)
+                for dataId in dataIds]
+
     @abstractmethod
     def getDataset(self, id, datasetType=None, dataId=None):
         """Retrieve a Dataset entry.
@@ -488,6 +570,51 @@ class Registry(metaclass=ABCMeta):
         """
         raise NotImplementedError("Must be implemented by subclass")
 
+    @transactional
+    def removeDatasets(self, refs):
+        """Remove many datasets from the Registry.
+
+        The default implementation calls `removeDataset` for each dataset.
+
+        Parameters
+        ----------
+        refs : iterable of `DatasetRef`
+            References to the datasets to be removed.  Must all include a
+            valid ``id`` attribute, and should be considered invalidated upon
+            return.  Components are removed along with their parents.
+
+        Raises
+        ------
+        AmbiguousDatasetError
+            Raised if ``any(ref.id is None for ref in refs)``.
+        OrphanedRecordError
+            Raised if any of the datasets is still present in any `Datastore`.
+        """
+        for ref in refs:
+            self.removeDataset(ref)
+
+    def getDatasetsInCollection(self, collection):
+        """Return all datasets in a collection.
+
+        Parameters
+        ----------
+        collection : `str`
+            Name of the collection.
+
+        Returns
+        -------
+        refs : `list` of `DatasetRef`
+            References to all datasets in the collection that are not
+            themselves components of other datasets.  Components are
+            available through the ``components`` attribute of their parents.
+
+        Raises
+        ------
+        NotImplementedError
+            Raised if the registry does not support listing collections.
+        """
+        raise NotImplementedError("Must be implemented by subclass")
+
     @abstractmethod
     @transactional
     def attachComponent(self, name, parent, component):
@@ -585,6 +712,29 @@ class Registry(metaclass=ABCMeta):
         # `dataset_id`?
         raise NotImplementedError("Must be implemented by subclass")
 
+    @transactional
+    def addDatasetLocations(self, refs, datastoreName):
+        """Add a datastore name locating many datasets.
+
+        The default implementation calls `addDatasetLocation` for each
+        dataset.
+
+        Parameters
+        ----------
+        refs : iterable of `DatasetRef`
+            References to the datasets for which to add storage information.
+            Components are *not* included automatically.
+        datastoreName : `str`
+            Name of the datastore holding these datasets.
+
+        Raises
+        ------
+        AmbiguousDatasetError
+            Raised if ``any(ref.id is None for ref in refs)``.
+        """
+        for ref in refs:
+            self.addDatasetLocation(ref, datastoreName)
+
     @abstractmethod
     def getDatasetLocations(self, ref):
         """Retrieve datastore locations for a given dataset.
@@ -637,6 +787,29 @@ class Registry(metaclass=ABCMeta):
         # `dataset_id`?
         raise NotImplementedError("Must be implemented by subclass")
 
+    @transactional
+    def removeDatasetLocations(self, datastoreName, refs):
+        """Remove datastore locations associated with many datasets.
+
+        The default implementation calls `removeDatasetLocation` for each
+        dataset.
+
+        Parameters
+        ----------
+        datastoreName : `str`
+            Name of this `Datastore`.
+        refs : iterable of `DatasetRef`
+            References to the datasets for which information is to be removed.
+            Components are *not* included automatically.
+
+        Raises
+        ------
+        AmbiguousDatasetError
+            Raised if ``any(ref.id is None for ref in refs)``.
+        """
+        for ref in refs:
+            self.removeDatasetLocation(datastoreName, ref)
+
     @abstractmethod
     @transactional
     def addExecution(self, execution):
@@ -774,6 +947,22 @@ class Registry(metaclass=ABCMeta):
         """
         raise NotImplementedError("Must be implemented by subclass")
 
+    @transactional
+    def addQuanta(self, quanta):
+        r"""Add many new `Quantum`\ s to the `Registry`.
+
+        The default implementation calls `addQuantum` for each quantum.
+
+        Parameters
+        ----------
+        quanta : iterable of `Quantum`
+            Instances to add to the `Registry`, subject to the same
+            requirements as the argument to `addQuantum`.  Their ``id``
+            attributes will be set.
+        """
+        for quantum in quanta:
+            self.addQuantum(quantum)
+
     @abstractmethod
     def getQuantum(self, id):
         """Retrieve an Quantum.
@@ -785,6 +974,29 @@ class Registry(metaclass=ABCMeta):
         """
         raise NotImplementedError("Must be implemented by subclass")
 
+    def getQuanta(self, ids):
+        """Retrieve many Quanta.
+
+        The default implementation calls `getQuantum` for each ID.
+
+        Parameters
+        ----------
+        ids : iterable of `int`
+            The unique identifiers for the Quanta.
+
+        Returns
+        -------
+        quanta : `dict`
+            Dictionary mapping ID to `Quantum`.  IDs with no matching
+            Quantum are not included.
+        """
+        result = {}
+        for id in ids:
+            quantum = self.getQuantum(id)
+            if quantum is not None:
+                result[id] = quantum
+        return result
+
     @abstractmethod
     @transactional
     def markInputUsed(self, quantum, ref):
@@ -809,6 +1021,72 @@ class Registry(metaclass=ABCMeta):
         """
         raise NotImplementedError("Must be implemented by subclass")
 
+    def getUpstreamDatasets(self, ref, depth=None):
+        """Return the datasets a dataset was (directly or indirectly)
+        produced from.
+
+        Provenance is followed from a dataset to the predicted inputs of the
+        `Quantum` that produced it, then to the predicted inputs of the
+        Quanta that produced those, and so on.
+
+        Parameters
+        ----------
+        ref : `DatasetRef`
+            Dataset to start from.  Must have a valid ``id`` attribute.
+        depth : `int`, optional
+            Maximum number of Quanta to follow back from ``ref``; ``1``
+            returns only the inputs of the Quantum that produced ``ref``.
+            If `None` (default), provenance is followed as far as it goes.
+
+        Returns
+        -------
+        refs : iterator of `DatasetRef`
+            Upstream datasets, in no particular order and without duplicates
+            (``ref`` itself is not included).  May be evaluated lazily.
+
+        Raises
+        ------
+        AmbiguousDatasetError
+            Raised if ``ref.id`` is `None`.
+        NotImplementedError
+            Raised if the registry does not support provenance queries.
+        """
+        raise NotImplementedError("Must be implemented by subclass")
+
+    def getDownstreamDatasets(self, ref, depth=None):
+        """Return the datasets (directly or indirectly) produced from a
+        dataset.
+
+        This is the inverse of `getUpstreamDatasets`: provenance is followed
+        from a dataset to the outputs of the Quanta that (are predicted to)
+        consume it, then to the outputs of the Quanta that consume those, and
+        so on.
+
+        Parameters
+        ----------
+        ref : `DatasetRef`
+            Dataset to start from.  Must have a valid ``id`` attribute.
+        depth : `int`, optional
+            Maximum number of Quanta to follow forward from ``ref``; ``1``
+            returns only the outputs of the Quanta that consume ``ref``.
+            If `None` (default), provenance is followed as far as it goes.
+
+        Returns
+        -------
+        refs : iterator of `DatasetRef`
+            Downstream datasets, in no particular order and without
+            duplicates (``ref`` itself is not included).  May be evaluated
+            lazily.
+
+        Raises
+        ------
+        AmbiguousDatasetError
+            Raised if ``ref.id`` is `None`.
+        NotImplementedError
+            Raised if the registry does not support provenance queries.
+        """
+        raise NotImplementedError("Must be implemented by subclass")
+
     @abstractmethod
     @disableWhenLimited
     @transactional
@@ -997,7 +1275,8 @@ class Registry(metaclass=ABCMeta):
     @abstractmethod
     @disableWhenLimited
     def selectMultipleDatasetTypes(self, originInfo, expression=None, required=(), optional=(),
-                                   prerequisite=(), perDatasetTypeDimensions=(), expandDataIds=True):
+                                   prerequisite=(), perDatasetTypeDimensions=(), expandDataIds=True,
+                                   columnar=False):
         """Evaluate a filter expression and lists of
         `DatasetTypes <DatasetType>` and return a set of dimension values.
 
@@ -1033,11 +1312,20 @@ class Registry(metaclass=ABCMeta):
             types do not need to have the same values in each result row.
         expandDataIds : `bool`
             If `True` (default), expand all data IDs when returning them.
+            Ignored if ``columnar`` is `True`.
+        columnar : `bool`
+            If `True`, yield chunks of results in columnar form instead of
+            individual rows.  Dataset searches are never deferred in this
+            mode.
 
         Yields
         ------
         row : `~lsst.daf.butler.sql.MultipleDatasetQueryRow`
             Single row is a unique combination of units in a transform.
+            If ``columnar`` is `True`,
+            `~lsst.daf.butler.sql.MultipleDatasetQueryColumns` instances
+            holding the link values and dataset IDs of many rows are yielded
+            instead.
 
         Raises
         ------
@@ -1096,97 +1384,155 @@ class Registry(metaclass=ABCMeta):
         NotImplementedError
             Raised if `limited` is `True`.
         """
-        dataId = DataId(dataId, dimension=dimension, universe=self.dimensions, **kwds)
-
-        fieldsToGet = DimensionKeyDict(keys=dataId.dimensions(implied=True).elements, factory=set)
-        fieldsToGet.updateValues(self._fieldsToAlwaysGet)
-
-        # Interpret the 'metadata' argument and initialize the 'fieldsToGet'
-        # dict, which maps each DimensionElement instance to a set of field
-        # names.
-        if metadata is not None:
-            if dimension is not None and not isinstance(metadata, Mapping):
-                # If a single dimension was passed explicitly, permit
-                # 'metadata' to be a sequence corresponding to just that
-                # dimension by updating our mapping-of-sets for that dimension.
-                fieldsToGet[dimension].update(metadata)
-            else:
-                fieldsToGet.updateValues(metadata)
-
-        # If 'region' was passed, add a query for that to fieldsToGet as well.
-        if region and (update or dataId.region is None):
-            holder = dataId.dimensions().getRegionHolder()
-            if holder is not None:
-                if holder.name == "skypix":
-                    # skypix is special; we always obtain those regions from
-                    # self.pixelization
-                    dataId.region = self.pixelization.pixel(dataId["skypix"])
+        dataId, = self.expandDataIds([dataId], dimension=dimension, metadata=metadata, region=region,
+                                     update=update, **kwds)
+        return dataId
+
+    @disableWhenLimited
+    def expandDataIds(self, dataIds, *, dimension=None, metadata=None, region=False, update=False,
+                      **kwds):
+        """Expand multiple data IDs to include additional information.
+
+        This is equivalent to calling `expandDataId` on each data ID, but
+        retrieves the values needed for each `DimensionElement` for all data
+        IDs together, allowing implementations to use one query per element
+        rather than one per element per data ID.
+
+        Parameters
+        ----------
+        dataIds : iterable of `dict` or `DataId`
+            `dict`-like objects containing the `Dimension` links that include
+            the primary keys of the rows to query.  Any true `DataId` objects
+            will be updated in-place.
+        dimension : `Dimension` or `str`
+            A dimension passed to the `DataId` constructor to create a true
+            `DataId` or augment an existing one.
+        metadata : `collections.abc.Mapping`, optional
+            A mapping from `Dimension` or `str` name to column name, indicating
+            fields to read into ``dataId.entries``.
+            If ``dimension`` is provided, may instead be a sequence of column
+            names for that dimension.
+        region : `bool`
+            If `True`, obtain the region associated with each `DataId` (if
+            any) from the `Registry` and attach it as ``dataId.region``.
+        update : `bool`
+            If `True`, assume existing entries and regions in the given
+            `DataId` objects are out-of-date and should be updated by values
+            in the database.  If `False`, existing values will be assumed to
+            be correct and database queries will only be executed if they are
+            missing.
+        kwds
+            Additional keyword arguments passed to the `DataId` constructor
+            to convert each data ID to a true `DataId` or augment an existing
+            one.
+
+        Returns
+        -------
+        dataIds : `list` of `DataId`
+            Data IDs with all requested data populated, in the same order as
+            the given data IDs.
+
+        Raises
+        ------
+        NotImplementedError
+            Raised if `limited` is `True`.
+        LookupError
+            Raised if an entry needed to expand any data ID does not exist.
+        """
+        dataIds = [DataId(dataId, dimension=dimension, universe=self.dimensions, **kwds)
+                   for dataId in dataIds]
+
+        # For each data ID, we track the fields we need to query for (see
+        # below), a dictionary containing all link values (this starts with
+        # the given dataId, but we'll update it to include links for optional
+        # dependencies as we go), and the set of DimensionElements we need to
+        # process.
+        states = []
+        for dataId in dataIds:
+            fieldsToGet = DimensionKeyDict(keys=dataId.dimensions(implied=True).elements, factory=set)
+            fieldsToGet.updateValues(self._fieldsToAlwaysGet)
+
+            # Interpret the 'metadata' argument and initialize the
+            # 'fieldsToGet' dict, which maps each DimensionElement instance to
+            # a set of field names.
+            if metadata is not None:
+                if dimension is not None and not isinstance(metadata, Mapping):
+                    # If a single dimension was passed explicitly, permit
+                    # 'metadata' to be a sequence corresponding to just that
+                    # dimension by updating our mapping-of-sets for that
+                    # dimension.
+                    fieldsToGet[dimension].update(metadata)
                 else:
-                    fieldsToGet[holder].add("region")
-
-        # We now process fieldsToGet with calls to _queryMetadata via a
-        # depth-first traversal of the dependency graph.  As we traverse, we
-        # update...
-
-        # A dictionary containing all link values.  This starts with the given
-        # dataId, but we'll update it to include links for optional
-        # dependencies.
-        allLinks = dict(dataId)
-
-        # A set of DimensionElement names recording the vertices we've
-        # processed:
-        visited = set()
-
-        def visit(element):
-            if element.name in visited:
-                return
-            assert element.links() <= allLinks.keys()
-            entries = dataId.entries[element]
-            dependencies = element.dependencies(implied=True)
-            # Get the set of fields we want to retrieve.
-            fieldsToGetNow = fieldsToGet[element]
-            # Note which links to dependencies we need to query for and which
-            # we already know.  Make sure the ones we know are in the entries
-            # dict for this element.
-            linksWeKnow = dependencies.links().intersection(allLinks.keys())
-            linksWeNeed = dependencies.links() - linksWeKnow
-            fieldsToGetNow |= linksWeNeed
-            entries.update((link, allLinks[link]) for link in linksWeKnow)
-            # Remove fields that are already present in the dataId.
-            if not update:
-                fieldsToGetNow -= entries.keys()
-            # Remove fields that are part of the primary key of this element;
-            # we have to already know those if the query is going to work.
-            # (and we asserted that we do know them up at the top).
-            fieldsToGetNow -= element.links()
+                    fieldsToGet.updateValues(metadata)
+
+            # If 'region' was passed, add a query for that to fieldsToGet as
+            # well.
+            if region and (update or dataId.region is None):
+                holder = dataId.dimensions().getRegionHolder()
+                if holder is not None:
+                    if holder.name == "skypix":
+                        # skypix is special; we always obtain those regions
+                        # from self.pixelization
+                        dataId.region = self.pixelization.pixel(dataId["skypix"])
+                    else:
+                        fieldsToGet[holder].add("region")
+
+            # We process all joins (which are never dependencies of any other
+            # elements) and all dimensions, including implied dependencies.
+            elements = set(dataId.dimensions().joins())
+            elements.update(dataId.dimensions(implied=True))
+            states.append((dataId, fieldsToGet, dict(dataId), elements))
+
+        # We now process fieldsToGet with calls to _queryMetadataMany, one for
+        # each DimensionElement.  Iterating over the universe's (topologically
+        # sorted) elements in reverse guarantees that we process any element
+        # before its dependencies, and hence that we always know all links for
+        # an element by the time we reach it: either we started with them in
+        # the data ID, they were already in the entries dict, or we queried
+        # for them when processing an element that depends on it.
+        for element in reversed(list(self.dimensions.elements)):
+            pending = []
+            for dataId, fieldsToGet, allLinks, elements in states:
+                if element not in elements:
+                    continue
+                assert element.links() <= allLinks.keys()
+                entries = dataId.entries[element]
+                dependencies = element.dependencies(implied=True)
+                # Get the set of fields we want to retrieve.
+                fieldsToGetNow = fieldsToGet[element]
+                # Note which links to dependencies we need to query for and
+                # which we already know.  Make sure the ones we know are in the
+                # entries dict for this element.
+                linksWeKnow = dependencies.links().intersection(allLinks.keys())
+                linksWeNeed = dependencies.links() - linksWeKnow
+                fieldsToGetNow |= linksWeNeed
+                entries.update((link, allLinks[link]) for link in linksWeKnow)
+                # Remove fields that are already present in the dataId.
+                if not update:
+                    fieldsToGetNow -= entries.keys()
+                # Remove fields that are part of the primary key of this
+                # element; we have to already know those if the query is going
+                # to work (and we asserted that we do know them above).
+                fieldsToGetNow -= element.links()
+                pending.append((dataId, fieldsToGetNow, allLinks, dependencies))
             # Actually do the query - only if there's actually anything left
-            # to query.  Put the results in the entries dict.
-            if fieldsToGetNow:
-                result = self._queryMetadata(element, allLinks, fieldsToGetNow)
-                if "region" in result:
-                    dataId.region = result.pop("region")
-                entries.update(result)
-            # Update the running dictionary of link values and the marker set.
-            allLinks.update((link, entries[link]) for link in dependencies.links())
-            visited.add(element.name)
-            # Recurse to dependencies.  Note that at this point we know that
-            # allLinks has all of the links for any element we're recursing to,
-            # either because we started with them in the data ID, they were
-            # already in the entries dict, or we queried for them above.
-            for other in dependencies:
-                visit(other)
-
-        # Kick off the traversal with joins, which are never dependencies of
-        # any other elements.
-        for join in dataId.dimensions().joins():
-            visit(join)
-
-        # Now traverse over the dimensions that are not dependencies of any
-        # other dependencies in this particular graph.
-        for dim in dataId.dimensions().leaves:
-            visit(dim)
-
-        return dataId
+            # to query, and only for the union of the fields needed by any of
+            # the data IDs.  Put the results in the entries dicts.
+            columns = set().union(*(fieldsToGetNow for _, fieldsToGetNow, _, _ in pending))
+            querying = [allLinks for _, fieldsToGetNow, allLinks, _ in pending if fieldsToGetNow]
+            if querying:
+                results = iter(self._queryMetadataMany(element, querying, columns))
+            for dataId, fieldsToGetNow, allLinks, dependencies in pending:
+                entries = dataId.entries[element]
+                if fieldsToGetNow:
+                    result = next(results)
+                    if "region" in fieldsToGetNow:
+                        dataId.region = result["region"]
+                    entries.update((field, result[field]) for field in fieldsToGetNow if field != "region")
+                # Update the running dictionary of link values.
+                allLinks.update((link, entries[link]) for link in dependencies.links())
+
+        return dataIds
 
     @abstractmethod
     @disableWhenLimited
@@ -1223,6 +1569,42 @@ class Registry(metaclass=ABCMeta):
         """
         raise NotImplementedError("Must be implemented by subclass")
 
+    @disableWhenLimited
+    def _queryMetadataMany(self, element, dataIds, columns):
+        """Get metadata associated with multiple data IDs.
+
+        This is conceptually a "protected" method that may be overridden by
+        subclasses to retrieve metadata for many data IDs more efficiently
+        than repeated calls to `_queryMetadata` (which the default
+        implementation does).  Users should call `expandDataIds` instead.
+
+        Parameters
+        ----------
+        element : `DimensionElement`
+            The `Dimension` or `DimensionJoin` to query for column values.
+        dataIds : `list` of `dict` or `DataId`
+            `dict`-like objects containing the `Dimension` links that include
+            the primary keys of the rows to query.  May include link fields
+            beyond those required to identify ``element``, and may contain
+            duplicates.
+        columns : iterable of `str`
+            String column names to query values for.
+
+        Returns
+        -------
+        metadata : `list` of `dict`
+            Dictionaries that map column name to value, in the same order as
+            ``dataIds``.
+
+        Raises
+        ------
+        LookupError
+            Raised if no entry for any of the given data IDs exists.
+        NotImplementedError
+            Raised if `limited` is `True`.
+        """
+        return [self._queryMetadata(element, dataId, columns) for dataId in dataIds]
+
     def makeDataIdPacker(self, name, dataId=None, **kwds):
         """Create an object that can pack certain data IDs into integers.
 
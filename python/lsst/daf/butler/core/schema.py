@@ -100,6 +100,10 @@ class Schema:
     limited : `bool`
         If `True`, ignore tables, views, and associated foreign keys whose
         config descriptions include a "limited" key set to `False`.
+    skypixRanges : `bool`
+        If `True`, use the alternate definitions in the "skypixRanges" key
+        of table and view descriptions, which store ranges of skypix IDs
+        rather than individual skypix IDs.
 
     Attributes
     ----------
@@ -111,14 +115,17 @@ class Schema:
     views : `frozenset`
         The names of entries in ``tables`` that are actually implemented as
         views.
+    skypixRanges : `bool`
+        Whether skypix join tables hold ranges of skypix IDs.
     """
-    def __init__(self, config=None, limited=False):
+    def __init__(self, config=None, limited=False, skypixRanges=False):
         if config is None or not isinstance(config, SchemaConfig):
             config = SchemaConfig(config)
-        builder = SchemaBuilder(config, limited=limited)
+        builder = SchemaBuilder(config, limited=limited, skypixRanges=skypixRanges)
         self.metadata = builder.metadata
         self.views = frozenset(builder.views)
         self.tables = builder.tables
+        self.skypixRanges = skypixRanges
 
 
 class SchemaBuilder:
@@ -131,6 +138,9 @@ class SchemaBuilder:
     limited : `bool`
         If `True`, ignore tables, views, and associated foreign keys whose
         config descriptions include a "limited" key set to `False`.
+    skypixRanges : `bool`
+        If `True`, use the alternate definitions in the "skypixRanges" key
+        of table and view descriptions.
 
     Attributes
     ----------
@@ -147,12 +157,13 @@ class SchemaBuilder:
                           "bool": Boolean, "blob": LargeBinary, "datetime": DateTime,
                           "hash": Base64Bytes}
 
-    def __init__(self, config, limited=False):
+    def __init__(self, config, limited=False, skypixRanges=False):
         self.config = config
         self.metadata = MetaData()
         self.tables = {}
         self.views = set()
         self._limited = limited
+        self._skypixRanges = skypixRanges
         for tableName, tableDescription in self.config["tables"].items():
             self.addTable(tableName, tableDescription)
 
@@ -212,6 +223,9 @@ class SchemaBuilder:
             - columns, a list of column descriptions
             - foreignKeys, a list of foreign-key constraint descriptions
 
+            May also include "skypixRanges", a mapping whose keys replace
+            those of the main description when skypix ranges are in use.
+
         Raises
         ------
         ValueError
@@ -224,6 +238,8 @@ class SchemaBuilder:
             raise ValueError("Table name {} is not all lowercase.")
         if not self.isIncluded(tableName):
             return None
+        if self._skypixRanges and "skypixRanges" in tableDescription:
+            tableDescription = dict(tableDescription, **tableDescription["skypixRanges"])
         doc = stripIfNotNone(tableDescription.get("doc", None))
         # Create a Table object (attaches itself to metadata)
         if self.isView(tableName):
@@ -21,10 +21,13 @@
 
 __all__ = ("iterable", "allSlots", "slotValuesAreEqual", "slotValuesToHash",
            "getFullTypeName", "getInstanceOf", "Singleton", "transactional",
-           "getObjectSize", "stripIfNotNone", "PrivateConstructorMeta")
+           "getObjectSize", "stripIfNotNone", "PrivateConstructorMeta", "parallelMap", "chunked")
 
 import sys
 import functools
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
 
 from lsst.utils import doImport
 
@@ -182,6 +185,91 @@ def transactional(func):
     return inner
 
 
+def parallelMap(func, items, workers=0, processes=False, ordered=True):
+    """Apply a function to many items, optionally using a pool of worker
+    threads or processes.
+
+    Parameters
+    ----------
+    func : callable
+        Function that takes a single item.  If ``processes`` is `True`, it
+        must be picklable (e.g. defined at module scope), as must the items
+        and the values it returns.
+    items : iterable
+        Items to process.
+    workers : `int`, optional
+        Number of worker threads or processes.  If less than two, ``func``
+        is called serially in the calling thread.
+    processes : `bool`, optional
+        If `True`, use a pool of processes rather than threads.
+    ordered : `bool`, optional
+        If `True` (default), yield results in the same order as ``items``;
+        if `False`, yield them as they are completed.
+
+    Yields
+    ------
+    item
+        An item from ``items``.
+    result
+        The value returned by ``func`` for that item.  Exceptions raised by
+        ``func`` are re-raised when this result would have been yielded.
+
+    Notes
+    -----
+    At most ``2*workers`` items are in progress (or done but not yet
+    yielded) at once, so large inputs can be processed without holding all
+    results in memory.  Items not yet started are cancelled if iteration
+    stops early.
+    """
+    if workers < 2:
+        for item in items:
+            yield item, func(item)
+        return
+    executor = (ProcessPoolExecutor if processes else ThreadPoolExecutor)(max_workers=workers)
+    window = 2*workers
+    pending = {}
+    try:
+        if ordered:
+            queue = deque()
+            for item in items:
+                future = executor.submit(func, item)
+                pending[future] = item
+                queue.append(future)
+                if len(queue) >= window:
+                    future = queue.popleft()
+                    yield pending.pop(future), future.result()
+            while queue:
+                future = queue.popleft()
+                yield pending.pop(future), future.result()
+        else:
+            for item in items:
+                pending[executor.submit(func, item)] = item
+                if len(pending) >= window:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield pending.pop(future), future.result()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown()
+
+
+def chunked(iterable, size):
+    """Yield successive `list` chunks of at most ``size`` elements from
+    ``iterable``.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
 def getObjectSize(obj, seen=None):
     """Recursively finds size of objects.
 
@@ -499,6 +499,22 @@ class ChainedDatastore(Datastore):
         if counter == 0:
             raise FileNotFoundError(f"Could not remove from any child datastore: {ref}")
 
+    def removeMany(self, refs):
+        """Indicate to the Datastore that many Datasets can be removed.
+
+        The datasets will be removed from each child datastore.  Datasets
+        that are not present are silently ignored.
+
+        Parameters
+        ----------
+        refs : iterable of `DatasetRef`
+            References to the Datasets to remove.
+        """
+        refs = list(refs)
+        log.debug("Removing %d datasets", len(refs))
+        for datastore in self.datastores:
+            datastore.removeMany(refs)
+
     def transfer(self, inputDatastore, ref):
         """Retrieve a Dataset from an input `Datastore`,
         and store the result in this `Datastore`.
@@ -24,9 +24,12 @@
 __all__ = ("PosixDatastore", )
 
 import os
+import mmap
+import zlib
 import shutil
 import hashlib
 import logging
+import itertools
 from collections import namedtuple
 
 from lsst.daf.butler import (Config, Datastore, DatastoreConfig, LocationFactory,
@@ -34,13 +37,320 @@ from lsst.daf.butler import (Config, Datastore, DatastoreConfig, LocationFactory
                              StorageClassFactory, DatasetTypeNotSupportedError, DatabaseDict,
                              DatastoreValidationError, FileTemplateValidationError,
                              Constraints)
-from lsst.daf.butler.core.utils import transactional, getInstanceOf
+from lsst.daf.butler.core.utils import transactional, getInstanceOf, parallelMap
 from lsst.daf.butler.core.safeFileIo import safeMakeDir
 from lsst.daf.butler.core.repoRelocation import replaceRoot
+from lsst.daf.butler.core.configSupport import LookupKey, processLookupConfigs
 
 log = logging.getLogger(__name__)
 
 
+_CHECKSUM_POLICIES = ("none", "size", "full", "mmap", "deferred")
+"""Supported values for the ``checksum.policies`` configuration of
+`PosixDatastore`."""
+
+_ChecksumPolicy = namedtuple("_ChecksumPolicy", ["policy", "algorithm", "blockSize"])
+"""How to compute the size and checksum of a single file, as determined
+by `PosixDatastore._getChecksumPolicy`.
+"""
+
+
+class _ZlibHasher:
+    """Adapter giving a `zlib` checksum function the (minimal) interface of
+    a `hashlib` hash object.
+
+    Parameters
+    ----------
+    func : callable
+        `zlib.crc32` or `zlib.adler32`.
+    """
+
+    def __init__(self, func):
+        self._func = func
+        self._value = func(b"")
+
+    def update(self, data):
+        self._value = self._func(data, self._value)
+
+    def hexdigest(self):
+        return f"{self._value:08x}"
+
+
+def _newHasher(algorithm):
+    """Create an object that computes a checksum with the given algorithm.
+
+    Parameters
+    ----------
+    algorithm : `str`
+        Name of an algorithm supported by :py:class:`hashlib`, or ``crc32``
+        or ``adler32`` (from :py:mod:`zlib`; much faster, but not
+        cryptographic).
+
+    Returns
+    -------
+    hasher : `object`
+        Object with ``update`` and ``hexdigest`` methods.
+
+    Raises
+    ------
+    NameError
+        Raised if the algorithm is not supported.
+    """
+    if algorithm in ("crc32", "adler32"):
+        return _ZlibHasher(getattr(zlib, algorithm))
+    if algorithm not in hashlib.algorithms_guaranteed:
+        raise NameError("The specified algorithm '{}' is not supported by hashlib".format(algorithm))
+    return hashlib.new(algorithm)
+
+
+def _checksumFile(fullPath, checksumPolicy):
+    """Compute the size and checksum of a file according to a policy.
+
+    Parameters
+    ----------
+    fullPath : `str`
+        Absolute path of the file.
+    checksumPolicy : `_ChecksumPolicy`
+        How to compute the size and checksum.
+
+    Returns
+    -------
+    size : `int` or `None`
+        Size of the file, or `None` for the ``none`` policy.
+    checksum : `str` or `None`
+        Checksum of the file, or `None` unless the policy is ``full`` or
+        ``mmap``.
+    """
+    if checksumPolicy.policy == "none":
+        return None, None
+    size = os.stat(fullPath).st_size
+    if checksumPolicy.policy in ("size", "deferred"):
+        return size, None
+    return size, PosixDatastore.computeChecksum(fullPath, algorithm=checksumPolicy.algorithm,
+                                                block_size=checksumPolicy.blockSize,
+                                                useMmap=(checksumPolicy.policy == "mmap"))
+
+
+_ReadJob = namedtuple("_ReadJob", ["ref", "location", "formatter", "readStorageClass",
+                                   "writeStorageClass", "size", "parameters"])
+"""Everything needed to read a single dataset, gathered by
+`PosixDatastore.get` and `PosixDatastore.getMany` before reading.
+"""
+
+
+def _readDataset(job):
+    """Read a dataset from a file.
+
+    This is defined at module scope so `PosixDatastore.getMany` can run it in
+    worker processes as well as threads.
+
+    Parameters
+    ----------
+    job : `_ReadJob`
+        Description of the dataset to read.
+
+    Returns
+    -------
+    inMemoryDataset : `object`
+        Requested Dataset or slice thereof as an InMemoryDataset.
+    """
+    ref = job.ref
+    location = job.location
+
+    # Too expensive to recalculate the checksum on fetch
+    # but we can check size and existence
+    if not os.path.exists(location.path):
+        raise FileNotFoundError("Dataset with Id {} does not seem to exist at"
+                                " expected location of {}".format(ref.id, location.path))
+    stat = os.stat(location.path)
+    size = stat.st_size
+    if job.size is not None and size != job.size:
+        raise RuntimeError("Integrity failure in Datastore. Size of file {} ({}) does not"
+                           " match recorded size of {}".format(location.path, size, job.size))
+
+    # Is this a component request?
+    component = ref.datasetType.component()
+
+    formatter = getInstanceOf(job.formatter)
+    formatterParams, assemblerParams = formatter.segregateParameters(job.parameters)
+    try:
+        result = formatter.read(FileDescriptor(location, readStorageClass=job.readStorageClass,
+                                               storageClass=job.writeStorageClass,
+                                               parameters=job.parameters),
+                                component=component)
+    except Exception as e:
+        raise ValueError("Failure from formatter for Dataset {}: {}".format(ref.id, e))
+
+    # Process any left over parameters
+    if job.parameters:
+        result = job.readStorageClass.assembler().handleParameters(result, assemblerParams)
+
+    # Validate the returned data type matches the expected data type
+    pytype = job.readStorageClass.pytype
+    if pytype and not isinstance(result, pytype):
+        raise TypeError("Got type {} from formatter but expected {}".format(type(result), pytype))
+
+    return result
+
+
+def _writeAndChecksum(formatter, inMemoryDataset, fileDescriptor, checksumPolicy):
+    """Write a dataset to a file, computing the size and checksum of the file
+    according to a policy.
+
+    The size and checksum are computed as the file is written if the
+    formatter supports it; otherwise the file is read back afterwards.
+
+    Parameters
+    ----------
+    formatter : `Formatter`
+        Formatter to write the dataset with.
+    inMemoryDataset : `object`
+        The Dataset to store.
+    fileDescriptor : `FileDescriptor`
+        Identifies the file to write.
+    checksumPolicy : `_ChecksumPolicy`
+        How to compute the size and checksum.
+
+    Returns
+    -------
+    path : `str`
+        Path of the new file relative to the datastore root.
+    size : `int` or `None`
+        Size of the file, or `None` for the ``none`` policy.
+    checksum : `str` or `None`
+        Checksum of the file, or `None` unless the policy is ``full`` or
+        ``mmap``.
+    """
+    hasher = None
+    if checksumPolicy.policy in ("full", "mmap"):
+        hasher = _newHasher(checksumPolicy.algorithm)
+    path, size, checksum = formatter.writeWithChecksum(inMemoryDataset, fileDescriptor, hasher)
+    if size is None:
+        # The formatter needs a real path to write to, so could not compute
+        # the size and checksum as it wrote.
+        size, checksum = _checksumFile(fileDescriptor.location.path, checksumPolicy)
+    elif checksumPolicy.policy == "none":
+        size = None
+    return path, size, checksum
+
+
+_WriteJob = namedtuple("_WriteJob", ["inMemoryDataset", "ref", "location", "formatter", "root",
+                                     "predictedFullPath", "checksumPolicy"])
+"""Everything needed to write a single dataset, gathered by
+`PosixDatastore.putMany` before writing.
+"""
+
+
+def _writeDataset(job):
+    """Write a dataset to a file and compute the size and checksum of the
+    result.
+
+    This is defined at module scope so `PosixDatastore.putMany` can run it in
+    worker processes as well as threads.  Exceptions are returned rather than
+    raised, so the caller learns about every file that was written even if
+    some writes fail.
+
+    Parameters
+    ----------
+    job : `_WriteJob`
+        Description of the dataset to write.
+
+    Returns
+    -------
+    result : `tuple` or `Exception`
+        The path of the new file relative to the datastore root, its size,
+        and its checksum; or the exception raised while writing it.
+    """
+    try:
+        storageClass = job.ref.datasetType.storageClass
+        fileDescriptor = FileDescriptor(job.location, storageClass=storageClass)
+        result = _writeAndChecksum(job.formatter, job.inMemoryDataset, fileDescriptor, job.checksumPolicy)
+        assert job.predictedFullPath == os.path.join(job.root, result[0])
+        log.debug("Wrote file to %s", result[0])
+        return result
+    except Exception as err:
+        # The file did not exist before we started, so anything there now is
+        # a partial write of our own.
+        if os.path.exists(job.predictedFullPath):
+            os.remove(job.predictedFullPath)
+        return err
+
+
+_IngestJob = namedtuple("_IngestJob", ["ref", "formatter", "transfer", "srcFullPath", "path", "fullPath",
+                                       "checksumPolicy"])
+"""Everything needed to ingest a single file, gathered by
+`PosixDatastore.ingest` and `PosixDatastore.ingestMany` before any file is
+transferred.
+
+``srcFullPath`` is the absolute path of the file to ingest, while ``path``
+and ``fullPath`` are the path relative to the datastore root and the absolute
+path it will have once transferred (identical to ``srcFullPath`` if
+``transfer`` is `None`).
+"""
+
+
+def _transferFile(job, undo=False):
+    """Transfer a file into a datastore, or undo that transfer.
+
+    Parameters
+    ----------
+    job : `_IngestJob`
+        Description of the file to transfer.
+    undo : `bool`, optional
+        If `True`, reverse a transfer that has already been done.
+    """
+    if job.transfer is None:
+        return
+    if undo:
+        if job.transfer == "move":
+            shutil.move(job.fullPath, job.srcFullPath)
+        else:
+            os.unlink(job.fullPath)
+    elif job.transfer == "move":
+        shutil.move(job.srcFullPath, job.fullPath)
+    elif job.transfer == "copy":
+        shutil.copy(job.srcFullPath, job.fullPath)
+    elif job.transfer == "hardlink":
+        os.link(job.srcFullPath, job.fullPath)
+    elif job.transfer == "symlink":
+        os.symlink(job.srcFullPath, job.fullPath)
+    else:
+        raise NotImplementedError("Transfer type '{}' not supported.".format(job.transfer))
+
+
+def _ingestFile(job):
+    """Transfer a file into a datastore and compute its size and checksum.
+
+    Exceptions are returned rather than raised (after removing anything the
+    failed transfer left behind), so `PosixDatastore.ingestMany` can report
+    failures without stopping the transfers of other files.
+
+    Parameters
+    ----------
+    job : `_IngestJob`
+        Description of the file to ingest.
+
+    Returns
+    -------
+    result : `tuple` or `Exception`
+        The size and checksum of the ingested file, or the exception raised
+        while transferring it.
+    """
+    try:
+        _transferFile(job)
+    except Exception as err:
+        # The destination did not exist before we started, so anything there
+        # now (with the source still in place) is a partial transfer.
+        if os.path.lexists(job.fullPath) and os.path.exists(job.srcFullPath):
+            os.unlink(job.fullPath)
+        return err
+    try:
+        return _checksumFile(job.fullPath, job.checksumPolicy)
+    except Exception as err:
+        _transferFile(job, undo=True)
+        return err
+
+
 class PosixDatastore(Datastore):
     """Basic POSIX filesystem backed Datastore.
 
@@ -163,6 +473,57 @@ class PosixDatastore(Datastore):
                                                value=self.RecordTuple, key="dataset_id",
                                                lengths=lengths, registry=registry)
 
+        # Read the checksum configuration
+        checksumConfig = self.config.get("checksum", {})
+        self._checksumAlgorithm = checksumConfig.get("algorithm", "blake2b")
+        _newHasher(self._checksumAlgorithm)
+        self._checksumBlockSize = int(checksumConfig.get("blockSize", 1 << 20))
+        self._defaultChecksumPolicy = "full"
+        self._checksumPolicies = {}
+        policies = checksumConfig.get("policies")
+        if policies:
+            for key, policy in processLookupConfigs(policies, universe=self.registry.dimensions).items():
+                self._validateChecksumPolicy(policy)
+                if key == LookupKey("default"):
+                    self._defaultChecksumPolicy = policy
+                else:
+                    self._checksumPolicies[key] = policy
+        self._linkChecksumPolicy = checksumConfig.get("linkPolicy") or None
+        if self._linkChecksumPolicy is not None:
+            self._validateChecksumPolicy(self._linkChecksumPolicy)
+
+    @staticmethod
+    def _validateChecksumPolicy(policy):
+        if policy not in _CHECKSUM_POLICIES:
+            raise ValueError(f"Unsupported checksum policy '{policy}'; "
+                             f"must be one of {', '.join(_CHECKSUM_POLICIES)}")
+
+    def _getChecksumPolicy(self, ref, linked=False):
+        """Determine how the file for a dataset should be checksummed.
+
+        Parameters
+        ----------
+        ref : `DatasetRef`
+            Reference to the Dataset.
+        linked : `bool`, optional
+            If `True`, the file is being ingested as a link to an existing
+            file, and the ``linkPolicy`` configuration (if any) takes
+            precedence.
+
+        Returns
+        -------
+        checksumPolicy : `_ChecksumPolicy`
+            The policy, algorithm and block size to use.
+        """
+        policy = self._linkChecksumPolicy if linked else None
+        if policy is None:
+            policy = self._defaultChecksumPolicy
+            for name in ref._lookupNames():
+                if name in self._checksumPolicies:
+                    policy = self._checksumPolicies[name]
+                    break
+        return _ChecksumPolicy(policy, self._checksumAlgorithm, self._checksumBlockSize)
+
     def __str__(self):
         return self.root
 
@@ -181,6 +542,21 @@ class PosixDatastore(Datastore):
                                                 storage_class=info.storageClass.name,
                                                 checksum=info.checksum, file_size=info.size)
 
+    def addStoredFileInfos(self, infos):
+        """Record internal storage information associated with many
+        datasets at once.
+
+        Parameters
+        ----------
+        infos : `dict`
+            Dictionary mapping dataset ID to the `StoredFileInfo` for that
+            dataset.
+        """
+        self.records.setMany({id: self.RecordTuple(formatter=info.formatter, path=info.path,
+                                                   storage_class=info.storageClass.name,
+                                                   checksum=info.checksum, file_size=info.size)
+                              for id, info in infos.items()})
+
     def removeStoredFileInfo(self, ref):
         """Remove information about the file associated with this dataset.
 
@@ -213,6 +589,11 @@ class PosixDatastore(Datastore):
         record = self.records.get(ref.id, None)
         if record is None:
             raise KeyError("Unable to retrieve formatter associated with Dataset {}".format(ref.id))
+        return self._makeStoredFileInfo(record)
+
+    def _makeStoredFileInfo(self, record):
+        """Convert an internal record to a `StoredFileInfo`.
+        """
         # Convert name of StorageClass to instance
         storageClass = self.storageClassFactory.getStorageClass(record.storage_class)
         return StoredFileInfo(record.formatter, record.path, storageClass,
@@ -274,20 +655,77 @@ class PosixDatastore(Datastore):
         except KeyError:
             raise FileNotFoundError("Could not retrieve Dataset {}".format(ref))
 
+        return _readDataset(self._prepareRead(ref, storedFileInfo, parameters))
+
+    def getMany(self, refs, parameters=None, ordered=True):
+        """Load many InMemoryDatasets from the store.
+
+        Internal records for all datasets are retrieved at once, and files
+        are then read by a pool of ``bulkReadWorkers`` worker threads (or
+        processes, if ``bulkReadPool`` is ``process``), so the I/O latency
+        of different files overlaps.
+
+        Parameters
+        ----------
+        refs : iterable of `DatasetRef`
+            References to the required Datasets.
+        parameters : `dict`, optional
+            `StorageClass`-specific parameters applied to every Dataset.
+        ordered : `bool`, optional
+            If `True` (default), yield Datasets in the same order as
+            ``refs``; if `False`, yield them as soon as they are read.
+
+        Yields
+        ------
+        ref : `DatasetRef`
+            Reference to a Dataset.
+        inMemoryDataset : `object`
+            Requested Dataset or slice thereof as an InMemoryDataset.
+
+        Raises
+        ------
+        FileNotFoundError
+            A requested dataset can not be retrieved.  Raised before any
+            files are read if there is no record of the dataset.
+        TypeError
+            Return value from formatter has unexpected type.
+        ValueError
+            Formatter failed to process a dataset.
+        """
+        refs = list(refs)
+        log.debug("Retrieve %d datasets from %s with parameters %s", len(refs), self.name, parameters)
+        records = self.records.getMany(ref.id for ref in refs)
+        jobs = []
+        for ref in refs:
+            record = records.get(ref.id)
+            if record is None:
+                raise FileNotFoundError("Could not retrieve Dataset {}".format(ref))
+            jobs.append(self._prepareRead(ref, self._makeStoredFileInfo(record), parameters))
+        for job, result in parallelMap(_readDataset, jobs, workers=self.config.get("bulkReadWorkers", 0),
+                                       processes=(self.config.get("bulkReadPool", "thread") == "process"),
+                                       ordered=ordered):
+            yield job.ref, result
+
+    def _prepareRead(self, ref, storedFileInfo, parameters):
+        """Gather everything needed to read a dataset.
+
+        Parameters
+        ----------
+        ref : `DatasetRef`
+            Reference to the required Dataset.
+        storedFileInfo : `StoredFileInfo`
+            Stored information about the file holding the Dataset.
+        parameters : `dict`
+            `StorageClass`-specific parameters.
+
+        Returns
+        -------
+        job : `_ReadJob`
+            Description of the read, to be passed to `_readDataset`.
+        """
         # Use the path to determine the location
         location = self.locationFactory.fromPath(storedFileInfo.path)
 
-        # Too expensive to recalculate the checksum on fetch
-        # but we can check size and existence
-        if not os.path.exists(location.path):
-            raise FileNotFoundError("Dataset with Id {} does not seem to exist at"
-                                    " expected location of {}".format(ref.id, location.path))
-        stat = os.stat(location.path)
-        size = stat.st_size
-        if size != storedFileInfo.size:
-            raise RuntimeError("Integrity failure in Datastore. Size of file {} ({}) does not"
-                               " match recorded size of {}".format(location.path, size, storedFileInfo.size))
-
         # We have a write storage class and a read storage class and they
         # can be different for concrete composites.
         readStorageClass = ref.datasetType.storageClass
@@ -296,28 +734,9 @@ class PosixDatastore(Datastore):
         # Check that the supplied parameters are suitable for the type read
         readStorageClass.validateParameters(parameters)
 
-        # Is this a component request?
-        component = ref.datasetType.component()
-
-        formatter = getInstanceOf(storedFileInfo.formatter)
-        formatterParams, assemblerParams = formatter.segregateParameters(parameters)
-        try:
-            result = formatter.read(FileDescriptor(location, readStorageClass=readStorageClass,
-                                                   storageClass=writeStorageClass, parameters=parameters),
-                                    component=component)
-        except Exception as e:
-            raise ValueError("Failure from formatter for Dataset {}: {}".format(ref.id, e))
-
-        # Process any left over parameters
-        if parameters:
-            result = readStorageClass.assembler().handleParameters(result, assemblerParams)
-
-        # Validate the returned data type matches the expected data type
-        pytype = readStorageClass.pytype
-        if pytype and not isinstance(result, pytype):
-            raise TypeError("Got type {} from formatter but expected {}".format(type(result), pytype))
-
-        return result
+        return _ReadJob(ref=ref, location=location, formatter=storedFileInfo.formatter,
+                        readStorageClass=readStorageClass, writeStorageClass=writeStorageClass,
+                        size=storedFileInfo.size, parameters=parameters)
 
     @transactional
     def put(self, inMemoryDataset, ref):
@@ -345,6 +764,113 @@ class PosixDatastore(Datastore):
         allow `ChainedDatastore` to put to multiple datastores without
         requiring that every datastore accepts the dataset.
         """
+        location, formatter, predictedFullPath = self._prepareWrite(inMemoryDataset, ref)
+
+        fileDescriptor = FileDescriptor(location, storageClass=ref.datasetType.storageClass)
+        with self._transaction.undoWith("write", os.remove, predictedFullPath):
+            path, size, checksum = _writeAndChecksum(formatter, inMemoryDataset, fileDescriptor,
+                                                     self._getChecksumPolicy(ref))
+            assert predictedFullPath == os.path.join(self.root, path)
+            log.debug("Wrote file to %s", path)
+
+        fileInfo = StoredFileInfo(formatter, path, ref.datasetType.storageClass,
+                                  size=size, checksum=checksum)
+        self._addStoredFile(ref, fileInfo)
+
+    @transactional
+    def putMany(self, items):
+        """Write many InMemoryDatasets to the store.
+
+        All datasets are checked (and their directories created) before any
+        are written.  Files are then written by a pool of
+        ``bulkWriteWorkers`` worker threads (or processes, if
+        ``bulkWritePool`` is ``process``), and internal records and registry
+        locations for all of them are added in bulk.  If any write fails, all
+        files written by this call are removed when the transaction is rolled
+        back.
+
+        Parameters
+        ----------
+        items : iterable of `tuple`
+            Pairs of the Dataset to store and the `DatasetRef` associated
+            with it.
+
+        Raises
+        ------
+        TypeError
+            A supplied object and its storage class are inconsistent.
+        DatasetTypeNotSupportedError
+            The associated `DatasetType` is not handled by this datastore.
+        FileExistsError
+            A file that would be written already exists, or two datasets
+            would be written to the same file.
+        """
+        jobs = []
+        predictedFullPaths = set()
+        for inMemoryDataset, ref in items:
+            location, formatter, predictedFullPath = self._prepareWrite(inMemoryDataset, ref)
+            if predictedFullPath in predictedFullPaths:
+                raise FileExistsError(f"Cannot write file for ref {ref} as output file "
+                                      f"{predictedFullPath} is also the output file of another dataset")
+            predictedFullPaths.add(predictedFullPath)
+            jobs.append(_WriteJob(inMemoryDataset=inMemoryDataset, ref=ref, location=location,
+                                  formatter=formatter, root=self.root, predictedFullPath=predictedFullPath,
+                                  checksumPolicy=self._getChecksumPolicy(ref)))
+
+        # Wait for every write to finish, even if some fail, so that all
+        # files that were written are removed on rollback.
+        firstError = None
+        refs = []
+        fileInfos = {}
+        for job, result in parallelMap(_writeDataset, jobs, workers=self.config.get("bulkWriteWorkers", 0),
+                                       processes=(self.config.get("bulkWritePool", "thread") == "process")):
+            if isinstance(result, Exception):
+                if firstError is None:
+                    firstError = result
+                continue
+            path, size, checksum = result
+            self._transaction.registerUndo("write", os.remove, job.predictedFullPath)
+            fileInfo = StoredFileInfo(job.formatter, path, job.ref.datasetType.storageClass,
+                                      size=size, checksum=checksum)
+            # Register all components with same information
+            for ref in itertools.chain([job.ref], job.ref.components.values()):
+                refs.append(ref)
+                fileInfos[ref.id] = fileInfo
+        if firstError is not None:
+            raise firstError
+
+        self.registry.addDatasetLocations(refs, self.name)
+        self.addStoredFileInfos(fileInfos)
+
+    def _prepareWrite(self, inMemoryDataset, ref):
+        """Check that a dataset can be written, work out where it will be
+        written, and create the directory that will hold it.
+
+        Parameters
+        ----------
+        inMemoryDataset : `object`
+            The Dataset to store.
+        ref : `DatasetRef`
+            Reference to the associated Dataset.
+
+        Returns
+        -------
+        location : `Location`
+            Location the formatter should write to.
+        formatter : `Formatter`
+            Formatter to write the Dataset with.
+        predictedFullPath : `str`
+            Absolute path of the file that will be written.
+
+        Raises
+        ------
+        TypeError
+            Supplied object and storage class are inconsistent.
+        DatasetTypeNotSupportedError
+            The associated `DatasetType` is not handled by this datastore.
+        FileExistsError
+            The file that would be written already exists.
+        """
         datasetType = ref.datasetType
         storageClass = datasetType.storageClass
 
@@ -379,19 +905,13 @@ class PosixDatastore(Datastore):
             with self._transaction.undoWith("mkdir", os.rmdir, storageDir):
                 safeMakeDir(storageDir)
 
-        # Write the file
         predictedFullPath = os.path.join(self.root, formatter.predictPath(location))
 
         if os.path.exists(predictedFullPath):
             raise FileExistsError(f"Cannot write file for ref {ref} as "
                                   f"output file {predictedFullPath} already exists")
 
-        with self._transaction.undoWith("write", os.remove, predictedFullPath):
-            path = formatter.write(inMemoryDataset, FileDescriptor(location, storageClass=storageClass))
-            assert predictedFullPath == os.path.join(self.root, path)
-            log.debug("Wrote file to %s", path)
-
-        self.ingest(path, ref, formatter=formatter)
+        return location, formatter, predictedFullPath
 
     @transactional
     def ingest(self, path, ref, formatter=None, transfer=None):
@@ -435,7 +955,138 @@ class PosixDatastore(Datastore):
         DatasetTypeNotSupportedError
             The associated `DatasetType` is not handled by this datastore.
         """
+        job = self._prepareIngest(path, ref, formatter, transfer)
+        result = _ingestFile(job)
+        if isinstance(result, Exception):
+            raise result
+        if job.transfer is not None:
+            self._transaction.registerUndo(job.transfer, _transferFile, job, undo=True)
+        size, checksum = result
+
+        # Associate this dataset with the formatter for later read.
+        fileInfo = StoredFileInfo(job.formatter, job.path, ref.datasetType.storageClass,
+                                  size=size, checksum=checksum)
+        self._addStoredFile(ref, fileInfo)
+
+    def _addStoredFile(self, ref, fileInfo):
+        """Record a dataset and its components as stored in this datastore.
+
+        Parameters
+        ----------
+        ref : `DatasetRef`
+            Reference to the Dataset.
+        fileInfo : `StoredFileInfo`
+            Information about the file holding the Dataset (and all of its
+            components).
+        """
+        self.registry.addDatasetLocation(ref, self.name)
+        # TODO: this is only transactional if the DatabaseDict uses
+        #       self.registry internally.  Probably need to add
+        #       transactions to DatabaseDict to do better than that.
+        self.addStoredFileInfo(ref, fileInfo)
+
+        # Register all components with same information
+        for compRef in ref.components.values():
+            self.registry.addDatasetLocation(compRef, self.name)
+            self.addStoredFileInfo(compRef, fileInfo)
+
+    @transactional
+    def ingestMany(self, items, transfer=None, progress=None):
+        # Docstring inherited from Datastore.ingestMany.
+        # Files are checked (and their directories created) up front, then
+        # transferred and checksummed by a pool of ``bulkIngestWorkers``
+        # threads.  Records and registry locations for the files that were
+        # ingested successfully are added in bulk, ``bulkIngestChunkSize``
+        # datasets at a time.
+        if transfer not in (None, "move", "copy", "hardlink", "symlink"):
+            raise NotImplementedError("Transfer type '{}' not supported.".format(transfer))
+        failures = []
+        jobs = []
+        fullPaths = set()
+        for path, ref, formatter in items:
+            try:
+                job = self._prepareIngest(path, ref, formatter, transfer)
+                if job.fullPath in fullPaths:
+                    raise FileExistsError(f"File '{job.fullPath}' is also the destination of another file "
+                                          "in this batch")
+            except Exception as err:
+                log.warning("Cannot ingest %s for %s: %s", path, ref, err)
+                failures.append((path, ref, err))
+                continue
+            fullPaths.add(job.fullPath)
+            jobs.append(job)
+
+        total = len(failures) + len(jobs)
+        done = len(failures)
+        chunkSize = self.config.get("bulkIngestChunkSize", 1000)
+        refs = []
+        fileInfos = {}
+        for job, result in parallelMap(_ingestFile, jobs, workers=self.config.get("bulkIngestWorkers", 0),
+                                       ordered=False):
+            done += 1
+            if isinstance(result, Exception):
+                log.warning("Cannot ingest %s for %s: %s", job.srcFullPath, job.ref, result)
+                failures.append((job.srcFullPath, job.ref, result))
+            else:
+                if job.transfer is not None:
+                    self._transaction.registerUndo(job.transfer, _transferFile, job, undo=True)
+                size, checksum = result
+                fileInfo = StoredFileInfo(job.formatter, job.path, job.ref.datasetType.storageClass,
+                                          size=size, checksum=checksum)
+                # Register all components with same information
+                for ref in itertools.chain([job.ref], job.ref.components.values()):
+                    refs.append(ref)
+                    fileInfos[ref.id] = fileInfo
+                if len(refs) >= chunkSize:
+                    self.registry.addDatasetLocations(refs, self.name)
+                    self.addStoredFileInfos(fileInfos)
+                    refs = []
+                    fileInfos = {}
+            log.debug("Ingested %d of %d files into %s", done, total, self.name)
+            if progress is not None:
+                progress(done, total)
+        self.registry.addDatasetLocations(refs, self.name)
+        self.addStoredFileInfos(fileInfos)
+        return failures
+
+    def _prepareIngest(self, path, ref, formatter, transfer):
+        """Check that a file can be ingested, work out where it will be
+        transferred to, and create the directory that will hold it.
+
+        Parameters
+        ----------
+        path : `str`
+            File path.  Treated as relative to the repository root if not
+            absolute.
+        ref : `DatasetRef`
+            Reference to the associated Dataset.
+        formatter : `Formatter` or `None`
+            Formatter that should be used to retreive the Dataset.  If `None`,
+            the formatter will be constructed according to Datastore
+            configuration.
+        transfer : `str` or `None`
+            Transfer mode; see `ingest`.
+
+        Returns
+        -------
+        job : `_IngestJob`
+            Description of the file to ingest.
 
+        Raises
+        ------
+        RuntimeError
+            Raised if ``transfer is None`` and path is outside the repository
+            root.
+        FileNotFoundError
+            Raised if the file at ``path`` does not exist.
+        FileExistsError
+            Raised if ``transfer is not None`` but a file already exists at the
+            location computed from the template.
+        DatasetTypeNotSupportedError
+            The associated `DatasetType` is not handled by this datastore.
+        NotImplementedError
+            Raised if the given transfer mode is not supported.
+        """
         # Confirm that we can accept this dataset
         if not self.constraints.isAcceptable(ref):
             # Raise rather than use boolean return value.
@@ -459,52 +1110,27 @@ class PosixDatastore(Datastore):
                 path = os.path.relpath(path, absRoot)
             elif path.startswith(os.path.pardir):
                 raise RuntimeError(f"'{path}' is outside repository root '{self.root}'")
-        else:
-            template = self.templates.getTemplate(ref)
-            location = self.locationFactory.fromPath(template.format(ref))
-            newPath = formatter.predictPath(location)
-            newFullPath = os.path.join(self.root, newPath)
-            if os.path.exists(newFullPath):
-                raise FileExistsError("File '{}' already exists".format(newFullPath))
-            storageDir = os.path.dirname(newFullPath)
-            if not os.path.isdir(storageDir):
-                with self._transaction.undoWith("mkdir", os.rmdir, storageDir):
-                    safeMakeDir(storageDir)
-            if transfer == "move":
-                with self._transaction.undoWith("move", shutil.move, newFullPath, fullPath):
-                    shutil.move(fullPath, newFullPath)
-            elif transfer == "copy":
-                with self._transaction.undoWith("copy", os.remove, newFullPath):
-                    shutil.copy(fullPath, newFullPath)
-            elif transfer == "hardlink":
-                with self._transaction.undoWith("hardlink", os.unlink, newFullPath):
-                    os.link(fullPath, newFullPath)
-            elif transfer == "symlink":
-                with self._transaction.undoWith("symlink", os.unlink, newFullPath):
-                    os.symlink(fullPath, newFullPath)
-            else:
-                raise NotImplementedError("Transfer type '{}' not supported.".format(transfer))
-            path = newPath
-            fullPath = newFullPath
-
-        # Create Storage information in the registry
-        checksum = self.computeChecksum(fullPath)
-        stat = os.stat(fullPath)
-        size = stat.st_size
-        self.registry.addDatasetLocation(ref, self.name)
-
-        # Associate this dataset with the formatter for later read.
-        fileInfo = StoredFileInfo(formatter, path, ref.datasetType.storageClass,
-                                  size=size, checksum=checksum)
-        # TODO: this is only transactional if the DatabaseDict uses
-        #       self.registry internally.  Probably need to add
-        #       transactions to DatabaseDict to do better than that.
-        self.addStoredFileInfo(ref, fileInfo)
+            return _IngestJob(ref=ref, formatter=formatter, transfer=None, srcFullPath=fullPath,
+                              path=path, fullPath=fullPath, checksumPolicy=self._getChecksumPolicy(ref))
 
-        # Register all components with same information
-        for compRef in ref.components.values():
-            self.registry.addDatasetLocation(compRef, self.name)
-            self.addStoredFileInfo(compRef, fileInfo)
+        if transfer not in ("move", "copy", "hardlink", "symlink"):
+            raise NotImplementedError("Transfer type '{}' not supported.".format(transfer))
+        template = self.templates.getTemplate(ref)
+        location = self.locationFactory.fromPath(template.format(ref))
+        newPath = formatter.predictPath(location)
+        newFullPath = os.path.join(self.root, newPath)
+        if os.path.exists(newFullPath):
+            raise FileExistsError("File '{}' already exists".format(newFullPath))
+        storageDir = os.path.dirname(newFullPath)
+        if not os.path.isdir(storageDir):
+            with self._transaction.undoWith("mkdir", os.rmdir, storageDir):
+                safeMakeDir(storageDir)
+        # Links do not copy the file's contents, so may use a cheaper
+        # checksum policy.
+        linked = transfer in ("symlink", "hardlink")
+        return _IngestJob(ref=ref, formatter=formatter, transfer=transfer, srcFullPath=fullPath,
+                          path=newPath, fullPath=newFullPath,
+                          checksumPolicy=self._getChecksumPolicy(ref, linked=linked))
 
     def getUri(self, ref, predict=False):
         """URI to the Dataset.
@@ -590,6 +1216,46 @@ class PosixDatastore(Datastore):
             self.registry.removeDatasetLocation(self.name, compRef)
             self.removeStoredFileInfo(compRef)
 
+    def removeMany(self, refs):
+        """Indicate to the Datastore that many Datasets can be removed.
+
+        Datasets that are not present are silently ignored, and internal
+        records are removed even if the file they refer to is already
+        missing.  Composite datasets are removed along with their components.
+
+        .. warning::
+
+            This method does not support transactions; removals are
+            immediate, cannot be undone, and are not guaranteed to
+            be atomic if deleting either the files or the internal
+            database records fails.
+
+        Parameters
+        ----------
+        refs : iterable of `DatasetRef`
+            References to the Datasets to remove.
+        """
+        allRefs = {}
+        for ref in refs:
+            allRefs[ref.id] = ref
+            for compRef in ref.components.values():
+                allRefs[compRef.id] = compRef
+        records = self.records.getMany(allRefs.keys())
+        removedPaths = set()
+        for record in records.values():
+            location = self.locationFactory.fromPath(record.path)
+            if location.path in removedPaths:
+                continue
+            try:
+                os.remove(location.path)
+            except FileNotFoundError:
+                pass
+            removedPaths.add(location.path)
+
+        # Remove rows from registries
+        self.records.deleteMany(records.keys())
+        self.registry.removeDatasetLocations(self.name, [allRefs[id] for id in records.keys()])
+
     def transfer(self, inputDatastore, ref):
         """Retrieve a Dataset from an input `Datastore`,
         and store the result in this `Datastore`.
@@ -657,7 +1323,7 @@ class PosixDatastore(Datastore):
     def getLookupKeys(self):
         # Docstring is inherited from base class
         return self.templates.getLookupKeys() | self.formatterFactory.getLookupKeys() | \
-            self.constraints.getLookupKeys()
+            self.constraints.getLookupKeys() | set(self._checksumPolicies)
 
     def validateKey(self, lookupKey, entity):
         # Docstring is inherited from base class
@@ -669,8 +1335,53 @@ class PosixDatastore(Datastore):
             except FileTemplateValidationError as e:
                 raise DatastoreValidationError(e) from e
 
+    def computeMissingChecksums(self, refs):
+        """Compute and record checksums for datasets stored without one.
+
+        This is intended to be run after (and separately from) bulk writes or
+        ingests that used the ``deferred`` checksum policy, for example from
+        a low-priority background process, so checksumming does not slow the
+        ingest itself.  Files are read by a pool of ``bulkIngestWorkers``
+        threads.
+
+        Parameters
+        ----------
+        refs : iterable of `DatasetRef`
+            Datasets to checksum.  Datasets that are not in this datastore or
+            that already have a checksum are ignored.
+
+        Returns
+        -------
+        count : `int`
+            Number of files checksummed.
+
+        Raises
+        ------
+        RuntimeError
+            Raised if the size of a file does not match its recorded size.
+        """
+        records = self.records.getMany([ref.id for ref in refs])
+        # Components share their parent's file; only read each file once.
+        byPath = {}
+        for datasetId, record in records.items():
+            if record.checksum is None:
+                byPath.setdefault(record.path, []).append(datasetId)
+        checksumPolicy = _ChecksumPolicy("full", self._checksumAlgorithm, self._checksumBlockSize)
+        updated = {}
+        for path, (size, checksum) in parallelMap(
+                lambda path: _checksumFile(os.path.join(self.root, path), checksumPolicy), byPath,
+                workers=self.config.get("bulkIngestWorkers", 0), ordered=False):
+            for datasetId in byPath[path]:
+                record = records[datasetId]
+                if record.file_size is not None and record.file_size != size:
+                    raise RuntimeError("Integrity failure in Datastore. Size of file {} ({}) does not"
+                                       " match recorded size of {}".format(path, size, record.file_size))
+                updated[datasetId] = record._replace(checksum=checksum, file_size=size)
+        self.records.updateMany(updated)
+        return len(byPath)
+
     @staticmethod
-    def computeChecksum(filename, algorithm="blake2b", block_size=8192):
+    def computeChecksum(filename, algorithm="blake2b", block_size=1 << 20, useMmap=False):
         """Compute the checksum of the supplied file.
 
         Parameters
@@ -679,22 +1390,34 @@ class PosixDatastore(Datastore):
             Name of file to calculate checksum from.
         algorithm : `str`, optional
             Name of algorithm to use. Must be one of the algorithms supported
-            by :py:class`hashlib`.
+            by :py:class`hashlib`, or ``crc32`` or ``adler32`` (from
+            :py:mod:`zlib`; much faster, but not cryptographic).
         block_size : `int`
             Number of bytes to read from file at one time.
+        useMmap : `bool`, optional
+            If `True`, memory-map the file and checksum it with a single
+            call instead of reading it in blocks.
 
         Returns
         -------
         hexdigest : `str`
             Hex digest of the file.
         """
-        if algorithm not in hashlib.algorithms_guaranteed:
-            raise NameError("The specified algorithm '{}' is not supported by hashlib".format(algorithm))
-
-        hasher = hashlib.new(algorithm)
+        hasher = _newHasher(algorithm)
 
         with open(filename, "rb") as f:
-            for chunk in iter(lambda: f.read(block_size), b""):
-                hasher.update(chunk)
+            # Empty files cannot be memory-mapped.
+            if useMmap and os.fstat(f.fileno()).st_size > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    hasher.update(mapped)
+            else:
+                # Reuse a single buffer rather than allocating one per block.
+                buffer = bytearray(block_size)
+                view = memoryview(buffer)
+                while True:
+                    nbytes = f.readinto(buffer)
+                    if not nbytes:
+                        break
+                    hasher.update(view[:nbytes])
 
         return hasher.hexdigest()
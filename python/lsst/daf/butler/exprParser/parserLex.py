@@ -28,6 +28,7 @@ __all__ = ["ParserLex", "ParserLexError"]
 #  Imports of standard modules --
 # -------------------------------
 import re
+import threading
 
 # -----------------------------
 #  Imports for other modules --
@@ -38,6 +39,12 @@ from .ply import lex
 #  Local non-exported definitions --
 # ----------------------------------
 
+# Lexers built by lex.lex(), keyed by its keyword arguments; make_lexer
+# returns clones of these.
+_lexers = {}
+
+_lock = threading.Lock()
+
 # ------------------------
 #  Exported definitions --
 # ------------------------
@@ -75,6 +82,10 @@ class ParserLex:
     def make_lexer(cls, reflags=0, **kwargs):
         """Factory for lexers.
 
+        The lexer's regular expressions are compiled only once per process
+        for each class and set of arguments; later calls return a clone of
+        that lexer, with its own input and position.
+
         Returns
         -------
         `ply.lex.Lexer` instance.
@@ -84,7 +95,16 @@ class ParserLex:
         kw = dict(reflags=reflags | re.IGNORECASE | re.VERBOSE)
         kw.update(kwargs)
 
-        return lex.lex(object=cls(), **kw)
+        try:
+            key = (cls, tuple(sorted(kw.items())))
+            hash(key)
+        except TypeError:
+            return lex.lex(object=cls(), **kw)
+        with _lock:
+            lexer = _lexers.get(key)
+            if lexer is None:
+                lexer = _lexers[key] = lex.lex(object=cls(), **kw)
+        return lexer.clone()
 
     # literals = ""
 
@@ -27,6 +27,9 @@ __all__ = ["ParserYacc", "ParserYaccError", "ParseError", "ParserEOFError"]
 # -------------------------------
 #  Imports of standard modules --
 # -------------------------------
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
 
 # -----------------------------
 #  Imports for other modules --
@@ -40,6 +43,19 @@ from .parserLex import ParserLex
 #  Local non-exported definitions --
 # ----------------------------------
 
+# LALR tables built by yacc.yacc(), keyed by the parser class (each subclass
+# may define its own grammar) and the keyword arguments; building them is by
+# far the most expensive part of making a parser.
+_tables = {}
+
+# Trees returned by ParserYacc.parse, keyed by (parser class, expression,
+# tracking).
+_trees = OrderedDict()
+
+_lock = threading.Lock()
+
+_MISSING = object()
+
 # ------------------------
 #  Exported definitions --
 # ------------------------
@@ -100,6 +116,16 @@ class ParserEOFError(ParserYaccError):
 
 class ParserYacc:
     """Class which defines PLY grammar.
+
+    Parser tables are generated only once per process for each set of
+    keyword arguments (which are passed to ``yacc.yacc``), and shared by
+    all instances; each instance still has its own ``yacc.LRParser``, so
+    instances may be used concurrently in different threads.
+    """
+
+    cacheSize = 256
+    """Maximum number of parsed expressions remembered by `parse`
+    (shared by all instances).
     """
 
     def __init__(self, **kwargs):
@@ -107,7 +133,21 @@ class ParserYacc:
         kw = dict(write_tables=0, debug=False)
         kw.update(kwargs)
 
-        self.parser = yacc.yacc(module=self, **kw)
+        try:
+            key = (type(self), tuple(sorted(kw.items())))
+            hash(key)
+        except TypeError:
+            # Unhashable arguments (e.g. a log object); don't share tables.
+            self.parser = yacc.yacc(module=self, **kw)
+            return
+        with _lock:
+            tables = _tables.get(key)
+            if tables is None:
+                parser = yacc.yacc(module=self, **kw)
+                tables = SimpleNamespace(lr_productions=parser.productions, lr_action=parser.action,
+                                         lr_goto=parser.goto, errorfunc=parser.errorfunc)
+                _tables[key] = tables
+        self.parser = yacc.LRParser(tables, tables.errorfunc)
 
     def parse(self, input, lexer=None, debug=False, tracking=False):
         """Parse input expression ad return parsed tree object.
@@ -126,12 +166,31 @@ class ParserYacc:
             Set to True for debugging output.
         tracking : bool, optional
             Set to True for tracking line numbers in parser.
+
+        Notes
+        -----
+        Unless ``lexer`` or ``debug`` is given, trees are cached by
+        expression, so repeated calls with the same expression return the
+        same tree object, which must not be modified.
         """
+        useCache = lexer is None and not debug and self.cacheSize > 0
+        if useCache:
+            key = (type(self), input, tracking)
+            with _lock:
+                tree = _trees.get(key, _MISSING)
+                if tree is not _MISSING:
+                    _trees.move_to_end(key)
+                    return tree
         # make lexer
         if lexer is None:
             lexer = ParserLex.make_lexer()
         tree = self.parser.parse(input=input, lexer=lexer, debug=debug,
                                  tracking=tracking)
+        if useCache:
+            with _lock:
+                _trees[key] = tree
+                while len(_trees) > self.cacheSize:
+                    _trees.popitem(last=False)
         return tree
 
     tokens = ParserLex.tokens[:]
@@ -29,6 +29,36 @@ from abc import abstractmethod
 from lsst.daf.butler import Formatter
 
 
+class _ChecksumStream:
+    """Binary stream that passes everything written to it on to another
+    stream, counting the bytes written and updating a checksum on the way.
+
+    Parameters
+    ----------
+    stream : file-like object
+        Stream to write to.
+    hasher : `object`, optional
+        Object with an ``update`` method (such as a `hashlib` hash object)
+        to pass the data written to.
+    """
+
+    def __init__(self, stream, hasher=None):
+        self._stream = stream
+        self._hasher = hasher
+        self.size = 0
+        """Number of bytes written so far (`int`)."""
+
+    def write(self, data):
+        nbytes = self._stream.write(data)
+        if self._hasher is not None:
+            self._hasher.update(data)
+        self.size += memoryview(data).nbytes
+        return nbytes
+
+    def flush(self):
+        self._stream.flush()
+
+
 class FileFormatter(Formatter):
     """Interface for reading and writing files on a POSIX file system.
     """
@@ -37,6 +67,19 @@ class FileFormatter(Formatter):
     """Default file extension to use for writing files. None means that no
     modifications will be made to the supplied file extension."""
 
+    def __init__(self, *args, **kwargs):
+        if not self._writesFile() and type(self)._writeStream is FileFormatter._writeStream:
+            raise TypeError(f"Can't instantiate {type(self).__name__} without an implementation of "
+                            "_writeFile or _writeStream")
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def _writesFile(cls):
+        """Return `True` if this formatter overrides `_writeFile` and so must
+        be given a path rather than a stream to write to.
+        """
+        return cls._writeFile is not FileFormatter._writeFile
+
     @abstractmethod
     def _readFile(self, path, pytype=None):
         """Read a file from the path in the correct format.
@@ -61,10 +104,12 @@ class FileFormatter(Formatter):
         """
         pass
 
-    @abstractmethod
     def _writeFile(self, inMemoryDataset, fileDescriptor):
         """Write the in memory dataset to file on disk.
 
+        The default implementation opens the file and calls `_writeStream`.
+        Subclasses must override either this method or `_writeStream`.
+
         Parameters
         ----------
         inMemoryDataset : `object`
@@ -77,7 +122,26 @@ class FileFormatter(Formatter):
         Exception
             The file could not be written.
         """
-        pass
+        with open(fileDescriptor.location.path, "wb") as fd:
+            self._writeStream(inMemoryDataset, fd)
+
+    def _writeStream(self, inMemoryDataset, stream):
+        """Write the in memory dataset to a binary stream.
+
+        Parameters
+        ----------
+        inMemoryDataset : `object`
+            Object to serialize.
+        stream : file-like object
+            Stream opened for binary writing.  Only the ``write`` method may
+            be used.
+
+        Raises
+        ------
+        Exception
+            The dataset could not be written.
+        """
+        raise NotImplementedError("Formatter must implement _writeFile or _writeStream")
 
     def _coerceType(self, inMemoryDataset, storageClass, pytype=None):
         """Coerce the supplied inMemoryDataset to type `pytype`.
@@ -171,12 +235,47 @@ class FileFormatter(Formatter):
         path : `str`
             The `URI` where the primary file is stored.
         """
+        return self._write(inMemoryDataset, fileDescriptor)[0]
+
+    def writeWithChecksum(self, inMemoryDataset, fileDescriptor, hasher=None):
+        # Docstring inherited from Formatter.writeWithChecksum.
+        path, size = self._write(inMemoryDataset, fileDescriptor, hasher)
+        checksum = hasher.hexdigest() if hasher is not None and size is not None else None
+        return path, size, checksum
+
+    def _write(self, inMemoryDataset, fileDescriptor, hasher=None):
+        """Write a Python object to a file, through `_writeStream` if the
+        formatter supports it.
+
+        Parameters
+        ----------
+        inMemoryDataset : `object`
+            The Python object to store.
+        fileDescriptor : `FileDescriptor`
+            Identifies the file to write.
+        hasher : `object`, optional
+            Object with an ``update`` method that is passed the contents of
+            the file as they are written.
+
+        Returns
+        -------
+        path : `str`
+            The `URI` where the primary file is stored.
+        size : `int` or `None`
+            Size of the file in bytes, or `None` if the formatter writes
+            through `_writeFile`.
+        """
         # Update the location with the formatter-preferred file extension
         fileDescriptor.location.updateExtension(self.extension)
 
-        self._writeFile(inMemoryDataset, fileDescriptor)
+        if self._writesFile():
+            self._writeFile(inMemoryDataset, fileDescriptor)
+            return fileDescriptor.location.pathInStore, None
 
-        return fileDescriptor.location.pathInStore
+        with open(fileDescriptor.location.path, "wb") as fd:
+            stream = _ChecksumStream(fd, hasher)
+            self._writeStream(inMemoryDataset, stream)
+        return fileDescriptor.location.pathInStore, stream.size
 
     def predictPath(self, location):
         """Return the path that would be returned by write, without actually
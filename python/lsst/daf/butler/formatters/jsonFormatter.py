@@ -57,8 +57,8 @@ class JsonFormatter(FileFormatter):
 
         return data
 
-    def _writeFile(self, inMemoryDataset, fileDescriptor):
-        """Write the in memory dataset to file on disk.
+    def _writeStream(self, inMemoryDataset, stream):
+        """Write the in memory dataset to a binary stream.
 
         Will look for `_asdict()` method to aid JSON serialization, following
         the approach of the simplejson module.
@@ -67,18 +67,17 @@ class JsonFormatter(FileFormatter):
         ----------
         inMemoryDataset : `object`
             Object to serialize.
-        fileDescriptor : `FileDescriptor`
-            Details of the file to be written.
+        stream : file-like object
+            Stream opened for binary writing.
 
         Raises
         ------
         Exception
-            The file could not be written.
+            The dataset could not be written.
         """
-        with open(fileDescriptor.location.path, "w") as fd:
-            if hasattr(inMemoryDataset, "_asdict"):
-                inMemoryDataset = inMemoryDataset._asdict()
-            json.dump(inMemoryDataset, fd)
+        if hasattr(inMemoryDataset, "_asdict"):
+            inMemoryDataset = inMemoryDataset._asdict()
+        stream.write(json.dumps(inMemoryDataset).encode())
 
     def _coerceType(self, inMemoryDataset, storageClass, pytype=None):
         """Coerce the supplied inMemoryDataset to type `pytype`.
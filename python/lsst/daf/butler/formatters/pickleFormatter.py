@@ -61,20 +61,19 @@ class PickleFormatter(FileFormatter):
 
         return data
 
-    def _writeFile(self, inMemoryDataset, fileDescriptor):
-        """Write the in memory dataset to file on disk.
+    def _writeStream(self, inMemoryDataset, stream):
+        """Write the in memory dataset to a binary stream.
 
         Parameters
         ----------
         inMemoryDataset : `object`
             Object to serialize.
-        fileDescriptor : `FileDescriptor`
-            Details of the file to be written.
+        stream : file-like object
+            Stream opened for binary writing.
 
         Raises
         ------
         Exception
-            The file could not be written.
+            The dataset could not be written.
         """
-        with open(fileDescriptor.location.path, "wb") as fd:
-            pickle.dump(inMemoryDataset, fd, protocol=-1)
+        pickle.dump(inMemoryDataset, stream, protocol=-1)
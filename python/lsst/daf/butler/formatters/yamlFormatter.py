@@ -61,8 +61,8 @@ class YamlFormatter(FileFormatter):
 
         return data
 
-    def _writeFile(self, inMemoryDataset, fileDescriptor):
-        """Write the in memory dataset to file on disk.
+    def _writeStream(self, inMemoryDataset, stream):
+        """Write the in memory dataset to a binary stream.
 
         Will look for `_asdict()` method to aid YAML serialization, following
         the approach of the simplejson module.
@@ -71,18 +71,17 @@ class YamlFormatter(FileFormatter):
         ----------
         inMemoryDataset : `object`
             Object to serialize.
-        fileDescriptor : `FileDescriptor`
-            Details of the file to be written.
+        stream : file-like object
+            Stream opened for binary writing.
 
         Raises
         ------
         Exception
-            The file could not be written.
+            The dataset could not be written.
         """
-        with open(fileDescriptor.location.path, "w") as fd:
-            if hasattr(inMemoryDataset, "_asdict"):
-                inMemoryDataset = inMemoryDataset._asdict()
-            yaml.dump(inMemoryDataset, stream=fd)
+        if hasattr(inMemoryDataset, "_asdict"):
+            inMemoryDataset = inMemoryDataset._asdict()
+        yaml.dump(inMemoryDataset, stream=stream, encoding="utf-8")
 
     def _coerceType(self, inMemoryDataset, storageClass, pytype=None):
         """Coerce the supplied inMemoryDataset to type `pytype`.
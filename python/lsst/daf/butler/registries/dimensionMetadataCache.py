@@ -0,0 +1,190 @@
+# This file is part of daf_butler.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+__all__ = ("DimensionMetadataCache",)
+
+import threading
+from collections import OrderedDict
+
+
+class DimensionMetadataCache:
+    """A bounded, least-recently-used cache of dimension metadata rows, with
+    one independent cache per `DimensionElement`.
+
+    Entries are keyed by the values of the element's link fields and hold a
+    `dict` of the metadata columns retrieved so far for that row; columns
+    obtained by later queries are merged into existing entries.  All methods
+    are thread-safe.
+
+    Parameters
+    ----------
+    config : `Config` or `dict`, optional
+        Configuration with the following (optional) keys:
+
+        ``size``
+            Default maximum number of entries held for each element.  A
+            value of zero disables caching.
+        ``elements``
+            Mapping from element name to a maximum number of entries that
+            overrides ``size`` for that element.
+    """
+
+    def __init__(self, config=None):
+        config = config if config is not None else {}
+        self._defaultSize = int(config.get("size", 0))
+        elements = config.get("elements", None)
+        self._sizes = {name: int(size) for name, size in elements.items()} if elements else {}
+        self._entries = {}   # OrderedDict of entries, keyed by element name
+        self._hits = {}
+        self._misses = {}
+        self._lock = threading.Lock()
+
+    def _key(self, element, dataId):
+        return tuple(dataId[name] for name in sorted(element.links()))
+
+    def getSize(self, element):
+        """Return the maximum number of entries cached for an element.
+
+        Parameters
+        ----------
+        element : `DimensionElement`
+            Element to query.
+
+        Returns
+        -------
+        size : `int`
+            Maximum number of entries; zero if caching is disabled.
+        """
+        return self._sizes.get(element.name, self._defaultSize)
+
+    def get(self, element, dataId, columns):
+        """Return cached metadata for a row, if all requested columns are
+        present.
+
+        Parameters
+        ----------
+        element : `DimensionElement`
+            Element the row belongs to.
+        dataId : `dict`
+            Data ID containing (at least) all links of ``element``.
+        columns : iterable of `str`
+            Names of the columns needed by the caller.
+
+        Returns
+        -------
+        metadata : `dict` or `None`
+            A copy of the cached entry (which may contain more columns than
+            were requested), or `None` on a cache miss.
+        """
+        if not self.getSize(element):
+            return None
+        key = self._key(element, dataId)
+        with self._lock:
+            entries = self._entries.get(element.name)
+            entry = entries.get(key) if entries is not None else None
+            if entry is not None and entry.keys() >= frozenset(columns):
+                entries.move_to_end(key)
+                self._hits[element.name] = self._hits.get(element.name, 0) + 1
+                return dict(entry)
+            self._misses[element.name] = self._misses.get(element.name, 0) + 1
+            return None
+
+    def update(self, element, dataId, metadata):
+        """Add metadata for a row to the cache, merging it with any columns
+        already cached and evicting the least-recently-used entries if the
+        element's size limit is exceeded.
+
+        Parameters
+        ----------
+        element : `DimensionElement`
+            Element the row belongs to.
+        dataId : `dict`
+            Data ID containing (at least) all links of ``element``.
+        metadata : `dict`
+            Mapping of column name to value.
+
+        Returns
+        -------
+        entry : `dict`
+            A copy of the updated cache entry (or ``metadata`` itself if
+            caching is disabled for ``element``).
+        """
+        size = self.getSize(element)
+        if not size:
+            return metadata
+        key = self._key(element, dataId)
+        with self._lock:
+            entries = self._entries.setdefault(element.name, OrderedDict())
+            entry = entries.get(key)
+            if entry is None:
+                entry = entries[key] = dict(metadata)
+            else:
+                entry.update(metadata)
+                entries.move_to_end(key)
+            while len(entries) > size:
+                entries.popitem(last=False)
+            return dict(entry)
+
+    def invalidate(self, element, dataId):
+        """Remove any cached metadata for a row.
+
+        Parameters
+        ----------
+        element : `DimensionElement`
+            Element the row belongs to.
+        dataId : `dict`
+            Data ID containing (at least) all links of ``element``.
+        """
+        key = self._key(element, dataId)
+        with self._lock:
+            entries = self._entries.get(element.name)
+            if entries:
+                entries.pop(key, None)
+
+    def clear(self):
+        """Remove all cached entries (statistics are preserved).
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def getStatistics(self):
+        """Return cache statistics.
+
+        Returns
+        -------
+        statistics : `dict`
+            Dictionary keyed by element name, with `dict` values containing
+            ``hits``, ``misses``, and ``size`` (the current number of
+            entries) keys.
+        """
+        with self._lock:
+            names = self._hits.keys() | self._misses.keys() | self._entries.keys()
+            return {name: {"hits": self._hits.get(name, 0),
+                           "misses": self._misses.get(name, 0),
+                           "size": len(self._entries.get(name, ()))}
+                    for name in names}
+
+    def resetStatistics(self):
+        """Reset hit and miss counters to zero.
+        """
+        with self._lock:
+            self._hits.clear()
+            self._misses.clear()
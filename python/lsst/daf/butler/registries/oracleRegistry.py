@@ -22,6 +22,7 @@
 __all__ = ("OracleRegistry", )
 
 from sqlalchemy import create_engine
+from sqlalchemy.sql import text
 
 
 from lsst.daf.butler.core.config import Config
@@ -79,4 +80,17 @@ class OracleRegistry(SqlRegistry):
                          butlerRoot=butlerRoot)
 
     def _createEngine(self):
+        if self.threadSafe:
+            return create_engine(self.config["db"], **self._getPoolOptions())
         return create_engine(self.config["db"], pool_size=1)
+
+    def _reserveExecutionIds(self, count):
+        # Docstring inherited from SqlRegistry._reserveExecutionIds.
+        # Execution IDs are drawn from a sequence (see `SchemaBuilder`), which
+        # can hand out many values in a single query.
+        sequence = self._schema.tables["execution"].c.execution_id.default
+        results = self._connection.execute(
+            text(f"SELECT {sequence.name}.NEXTVAL FROM dual CONNECT BY LEVEL <= :count"),
+            count=count
+        )
+        return [row[0] for row in results]
@@ -0,0 +1,166 @@
+# This file is part of daf_butler.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+__all__ = ("QueryInstrumentation",)
+
+import logging
+import threading
+import time
+import weakref
+from collections import deque
+
+from sqlalchemy import event
+
+_LOG = logging.getLogger(__name__)
+
+
+class QueryInstrumentation:
+    """Per-statement timing and row counts for the SQL executed through a
+    `sqlalchemy.engine.Engine`, with a log of slow statements.
+
+    Statistics are keyed by the SQL string sent to the database, which
+    contains placeholders rather than values for bound parameters, so each
+    key corresponds to one statement "shape".  All methods are thread-safe.
+
+    Parameters
+    ----------
+    config : `Config` or `dict`, optional
+        Configuration with the following (optional) keys:
+
+        ``slowQueryThreshold``
+            Statements that take at least this many seconds are logged (at
+            WARNING level) and added to the slow-query log.  A negative value
+            disables the slow-query log.
+        ``slowQueryLogSize``
+            Maximum number of (most recent) entries kept in the slow-query
+            log.
+    """
+
+    def __init__(self, config=None):
+        config = config if config is not None else {}
+        self.slowQueryThreshold = float(config.get("slowQueryThreshold", -1.0))
+        self._statements = {}
+        self._slowQueries = deque(maxlen=int(config.get("slowQueryLogSize", 100)))
+        self._lock = threading.Lock()
+        # Keyed on the execution context, so the start time of a statement
+        # that fails is discarded along with its context.
+        self._startTimes = weakref.WeakKeyDictionary()
+
+    def attach(self, engine):
+        """Start recording statements executed by an engine.
+
+        Parameters
+        ----------
+        engine : `sqlalchemy.engine.Engine`
+            Engine to instrument.  Should be called before any connections
+            are made with it.
+        """
+        event.listen(engine, "before_cursor_execute", self._beforeCursorExecute)
+        event.listen(engine, "after_cursor_execute", self._afterCursorExecute)
+
+    def _beforeCursorExecute(self, connection, cursor, statement, parameters, context, executemany):
+        if context is None:
+            return
+        with self._lock:
+            self._startTimes[context] = time.perf_counter()
+
+    def _afterCursorExecute(self, connection, cursor, statement, parameters, context, executemany):
+        if context is None:
+            return
+        with self._lock:
+            start = self._startTimes.pop(context, None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        rows = 0
+        if context.isinsert or context.isupdate or context.isdelete:
+            rows = max(cursor.rowcount, 0)
+        with self._lock:
+            entry = self._statements.get(statement)
+            if entry is None:
+                entry = self._statements[statement] = {"count": 0, "totalTime": 0.0, "maxTime": 0.0,
+                                                       "rows": 0}
+            entry["count"] += 1
+            entry["totalTime"] += elapsed
+            entry["maxTime"] = max(entry["maxTime"], elapsed)
+            entry["rows"] += rows
+            if 0 <= self.slowQueryThreshold <= elapsed:
+                if executemany:
+                    parameters = f"<{len(parameters)} parameter sets>"
+                self._slowQueries.append({"statement": statement, "parameters": parameters,
+                                          "time": elapsed})
+        if 0 <= self.slowQueryThreshold <= elapsed:
+            _LOG.warning("Slow query (%.3fs): %s", elapsed, statement)
+
+    def addRows(self, statement, rows):
+        """Record rows fetched from the result of a statement.
+
+        Rows returned by a statement are only known once they are fetched,
+        so this is called by `SqlRegistry` as it reads results in chunks.
+
+        Parameters
+        ----------
+        statement : `str`
+            SQL string of the statement, as sent to the database.
+        rows : `int`
+            Number of rows fetched.
+        """
+        with self._lock:
+            entry = self._statements.get(statement)
+            if entry is not None:
+                entry["rows"] += rows
+
+    def getStatistics(self):
+        """Return per-statement statistics.
+
+        Returns
+        -------
+        statistics : `dict`
+            Dictionary keyed by SQL string, with `dict` values containing
+            ``count`` (number of executions), ``totalTime`` and ``maxTime``
+            (in seconds), and ``rows`` (rows modified by INSERT, UPDATE and
+            DELETE statements, or fetched from results read in chunks by
+            `SqlRegistry.query` and `QueryBuilder.execute`) keys.  Rows are
+            only counted once they are fetched, so results that are not fully
+            consumed count fewer rows.
+        """
+        with self._lock:
+            return {statement: dict(entry) for statement, entry in self._statements.items()}
+
+    def getSlowQueries(self):
+        """Return the slow-query log.
+
+        Returns
+        -------
+        slowQueries : `list` of `dict`
+            The most recent slow statements, oldest first, as dictionaries
+            with ``statement``, ``parameters``, and ``time`` (in seconds)
+            keys.
+        """
+        with self._lock:
+            return list(self._slowQueries)
+
+    def reset(self):
+        """Remove all statistics and clear the slow-query log.
+        """
+        with self._lock:
+            self._statements.clear()
+            self._slowQueries.clear()
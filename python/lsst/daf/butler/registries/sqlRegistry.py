@@ -23,14 +23,22 @@ __all__ = ("SqlRegistryConfig", "SqlRegistry")
 
 import itertools
 import contextlib
+import functools
+import threading
 import warnings
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
 from sqlalchemy import create_engine, text, func
 from sqlalchemy.pool import NullPool
-from sqlalchemy.sql import select, and_, bindparam, union
+from sqlalchemy.sql import select, and_, or_, union, bindparam, literal
 from sqlalchemy.exc import IntegrityError, SADeprecationWarning
+from sqlalchemy.util import LRUCache
 
-from ..core.utils import transactional
+from lsst.sphgeom import Region
+from lsst.utils import doImport
+
+from ..core.utils import transactional, chunked
 
 from ..core.datasets import DatasetType, DatasetRef
 from ..core.registry import (RegistryConfig, Registry, disableWhenLimited,
@@ -44,9 +52,37 @@ from ..core.storageClass import StorageClassFactory
 from ..core.config import Config
 from ..core.dimensions import DataId, Dimension
 from .sqlRegistryDatabaseDict import SqlRegistryDatabaseDict
+from .dimensionMetadataCache import DimensionMetadataCache
+from .queryInstrumentation import QueryInstrumentation
 from ..sql import MultipleDatasetQueryBuilder
 
 
+_workerPixelizations = {}  # pixelization objects in envelope worker processes
+
+
+def _computeSkyPixEnvelope(pixelization, encodedRegion):
+    """Return the skypix envelope ranges of an encoded region.
+
+    This runs in worker processes for
+    `SqlRegistry._computeSkyPixEnvelopes`, so its arguments are picklable
+    stand-ins for the pixelization (a ``(cls, level)`` tuple) and region.
+    """
+    instance = _workerPixelizations.get(pixelization)
+    if instance is None:
+        cls, level = pixelization
+        instance = _workerPixelizations[pixelization] = doImport(cls)(level=level)
+    return list(instance.envelope(Region.decode(encodedRegion)).ranges())
+
+
+def _expandComponents(refs):
+    """Yield the given DatasetRefs along with all of their (nested)
+    components.
+    """
+    for ref in refs:
+        yield ref
+        yield from _expandComponents(ref.components.values())
+
+
 class SqlRegistryConfig(RegistryConfig):
     pass
 
@@ -71,19 +107,35 @@ class SqlRegistry(Registry):
     absolute path. Can be None if no defaults specified.
     """
 
+    _BULK_CHUNK_SIZE = 500
+    """Maximum number of values bound to a single ``IN`` expression by bulk
+    operations (some databases, notably SQLite, limit the number of parameters
+    in a single statement).
+    """
+
     def __init__(self, registryConfig, schemaConfig, dimensionConfig, create=False, butlerRoot=None):
         registryConfig = SqlRegistryConfig(registryConfig)
         super().__init__(registryConfig, dimensionConfig=dimensionConfig)
         self.storageClasses = StorageClassFactory()
         self._schema = self._createSchema(schemaConfig)
-        self._datasetTypes = {}
+        self._datasetTypes = {}   # DatasetType objects, keyed by name
+        self._datasetTypesLoaded = False  # whether all DatasetTypes are in the cache
+        self._cacheLock = threading.RLock()  # guards updates to the DatasetType cache
         self._engine = self._createEngine()
-        self._connection = self._createConnection(self._engine)
+        instrumentationConfig = self.config.get("instrumentation")
+        if instrumentationConfig is not None and instrumentationConfig.get("enabled", False):
+            self._instrumentation = QueryInstrumentation(instrumentationConfig)
+            self._instrumentation.attach(self._engine)
+        else:
+            self._instrumentation = None
+        self._threadLocal = threading.local()  # per-thread connections, if threadSafe
+        self._sharedConnection = None if self.threadSafe else self._createConnection(self._engine)
         self._cachedRuns = {}   # Run objects, keyed by id or collection
-        # TODO: Hard-coding of instrument and skymap as the dimensions to cache
-        # here is a bit ugly; should be fixed on DM-17023.
-        self._cachedInstrumentEntries = {}
-        self._cachedSkyMapEntries = {}
+        self._metadataCache = DimensionMetadataCache(self.config.get("metadataCache"))
+        self._queryStatistics = Counter()
+        self._statements = {}  # parameterized statements, see _getCachedStatement
+        self._compiledCache = LRUCache(self.config.get("compiledCacheSize", 500))
+        self._statisticsLock = threading.Lock()  # guards _queryStatistics
         if create:
             # In our tables we have columns that make use of sqlalchemy
             # Sequence objects. There is currently a bug in sqlalchmey
@@ -98,6 +150,54 @@ class SqlRegistry(Registry):
     def __str__(self):
         return self.config["db"]
 
+    @property
+    def threadSafe(self):
+        """If `True`, this `Registry` may be used concurrently by multiple
+        threads, each with its own database connection and transaction state
+        (`bool`).
+        """
+        return self.config.get("threadSafe", False)
+
+    @property
+    def _connection(self):
+        """The `sqlalchemy.Connection` used by the calling thread.
+
+        Unless `threadSafe` is `True`, this is the same connection for all
+        threads.  Otherwise a connection is obtained from the engine's pool
+        the first time each thread accesses it, and held until the thread
+        exits or calls `releaseConnection`.
+        """
+        if self._sharedConnection is not None:
+            return self._sharedConnection
+        connection = getattr(self._threadLocal, "connection", None)
+        if connection is None:
+            connection = self._createConnection(self._engine)
+            self._threadLocal.connection = connection
+        return connection
+
+    def releaseConnection(self):
+        """Return the calling thread's database connection to the pool.
+
+        Does nothing unless `threadSafe` is `True`.  The pool holds at most
+        ``poolSize + poolOverflow`` (from configuration) connections, and a
+        thread that uses this `Registry` holds one until it exits, so
+        long-lived threads (e.g. in a thread pool) should call this when
+        they are done with the `Registry`.  The thread will obtain a new
+        connection if it uses the `Registry` again.
+
+        Raises
+        ------
+        RuntimeError
+            Raised if the calling thread is in a transaction.
+        """
+        connection = getattr(self._threadLocal, "connection", None)
+        if connection is None:
+            return
+        if connection.in_transaction():
+            raise RuntimeError("Cannot release a connection within a transaction.")
+        del self._threadLocal.connection
+        connection.close()
+
     @contextlib.contextmanager
     def transaction(self):
         """Context manager that implements SQL transactions.
@@ -113,6 +213,13 @@ class SqlRegistry(Registry):
             trans.commit()
         except BaseException:
             trans.rollback()
+            # Cached DatasetTypes may have been registered within the
+            # transaction we just rolled back.
+            with self._cacheLock:
+                self._datasetTypes.clear()
+                self._datasetTypesLoaded = False
+            # Likewise for dimension metadata added or modified within it.
+            self._metadataCache.clear()
             raise
 
     def _createSchema(self, schemaConfig):
@@ -128,7 +235,8 @@ class SqlRegistry(Registry):
         in order to construct the SQLAlchemy representation of the expected
         schema.
         """
-        return Schema(config=schemaConfig, limited=self.limited)
+        return Schema(config=schemaConfig, limited=self.limited,
+                      skypixRanges=self.config["skypix"].get("ranges", False))
 
     def _createEngine(self):
         """Create and return a `sqlalchemy.Engine` for this `Registry`.
@@ -139,16 +247,39 @@ class SqlRegistry(Registry):
         with a pool of connections used by different parts of an application.
         Because our `Registry` instances don't know what database they'll
         connect to until they are constructed, that is impossible for us, so
-        the engine is connected with the `Registry` instance.  In addition,
-        we do not expect concurrent usage of the same `Registry`, and hence
-        don't gain anything from connection pooling.  As a result, the default
-        implementation of this function uses `sqlalchemy.pool.NullPool` to
-        associate just a single connection with the engine.  Unless they
-        have a very good reason not to, subclasses that override this method
-        should do the same.
+        the engine is connected with the `Registry` instance.  Unless
+        `threadSafe` is `True`, we do not expect concurrent usage of the same
+        `Registry`, and hence don't gain anything from connection pooling.  As
+        a result, the default implementation of this function uses
+        `sqlalchemy.pool.NullPool` to associate just a single connection with
+        the engine in that case, and otherwise a pool configured by
+        `_getPoolOptions`, with one connection checked out by each thread
+        that uses the `Registry`.  Unless they have a very good reason not
+        to, subclasses that override this method should do the same.
         """
+        if self.threadSafe:
+            return create_engine(self.config["db"], **self._getPoolOptions())
         return create_engine(self.config["db"], poolclass=NullPool)
 
+    def _getPoolOptions(self):
+        """Return the `sqlalchemy.create_engine` keyword arguments that
+        configure the connection pool used if `threadSafe` is `True`.
+
+        The pool keeps up to ``poolSize`` idle connections, and opens up to
+        ``poolOverflow`` more (no limit if -1) when all of those are
+        checked out; beyond that, threads wait up to ``poolTimeout`` seconds
+        for another thread to release its connection (see
+        `releaseConnection`) before an exception is raised.
+
+        Returns
+        -------
+        options : `dict`
+            Keyword arguments for `sqlalchemy.create_engine`.
+        """
+        return dict(pool_size=self.config.get("poolSize", 5),
+                    max_overflow=self.config.get("poolOverflow", 10),
+                    pool_timeout=self.config.get("poolTimeout", 30))
+
     def _createConnection(self, engine):
         """Create and return a `sqlalchemy.Connection` for this `Registry`.
 
@@ -241,22 +372,96 @@ class SqlRegistry(Registry):
         ref : `DatasetRef`.
             A new `DatasetRef` instance.
         """
-        if datasetType is None:
-            datasetType = self.getDatasetType(row["dataset_type_name"])
-        run = self.getRun(id=row.run_id)
-        datasetRefHash = row["dataset_ref_hash"]
-        if dataId is None:
-            dataId = DataId({link: row[self._schema.tables["dataset"].c[link]]
-                             for link in datasetType.dimensions.links()},
-                            dimensions=datasetType.dimensions,
-                            universe=self.dimensions)
-        # Get components (if present)
-        components = {}
-        if datasetType.storageClass.isComposite():
-            datasetCompositionTable = self._schema.tables["dataset_composition"]
-            datasetTable = self._schema.tables["dataset"]
-            columns = list(datasetTable.c)
-            columns.append(datasetCompositionTable.c.component_name)
+        ref, = self._makeDatasetRefsFromRows([row], datasetType=datasetType,
+                                             dataIds=None if dataId is None else [dataId])
+        return ref
+
+    def _makeDatasetRefsFromRows(self, rows, datasetType=None, dataIds=None):
+        """Construct DatasetRefs from the results of a query on the Dataset
+        table.
+
+        Components of composite datasets are retrieved for all rows at once
+        (or, if the ``lazyComponents`` configuration option is `True`, only
+        when they are first accessed).
+
+        Parameters
+        ----------
+        rows : sequence of `sqlalchemy.engine.RowProxy`
+            Rows of a query that contain all columns from the `Dataset` table.
+            May include additional fields (which will be ignored).
+        datasetType : `DatasetType`, optional
+            `DatasetType` associated with all of these datasets.  Will be
+            retrieved for each row if not provided.  If provided, the caller
+            guarantees that it is already consistent with what would have
+            been retrieved from the database.
+        dataIds : sequence of `DataId`, optional
+            `DataId` objects associated with each row, in the same order.  Will
+            be constructed from the rows if not provided.  If provided, the
+            caller guarantees that they are already consistent with what would
+            have been retrieved from the database.
+
+        Returns
+        -------
+        refs : `list` of `DatasetRef`
+            New `DatasetRef` instances, in the same order as ``rows``.
+        """
+        datasetTable = self._schema.tables["dataset"]
+        refs = []
+        composites = {}
+        for i, row in enumerate(rows):
+            rowDatasetType = datasetType
+            if rowDatasetType is None:
+                rowDatasetType = self.getDatasetType(row["dataset_type_name"])
+            if dataIds is not None:
+                dataId = dataIds[i]
+            else:
+                dataId = DataId({link: row[datasetTable.c[link]]
+                                 for link in rowDatasetType.dimensions.links()},
+                                dimensions=rowDatasetType.dimensions,
+                                universe=self.dimensions)
+            ref = DatasetRef(datasetType=rowDatasetType, dataId=dataId, id=row["dataset_id"],
+                             run=self.getRun(id=row["run_id"]), hash=row["dataset_ref_hash"])
+            refs.append(ref)
+            if rowDatasetType.storageClass.isComposite():
+                composites[ref.id] = ref
+        if composites:
+            if self.config.get("lazyComponents", False):
+                for ref in composites.values():
+                    ref._deferComponents(functools.partial(self._fetchComponents, {ref.id: ref}, ref.id))
+            else:
+                self._fetchComponents(composites)
+        return refs
+
+    def _fetchComponents(self, parents, parentId=None):
+        """Retrieve the component datasets of several composite datasets at
+        once.
+
+        Parameters
+        ----------
+        parents : `dict`
+            Dictionary mapping dataset ID to a `DatasetRef` for a composite
+            dataset.  The ``components`` of these refs will be populated
+            unless they have been deferred.
+        parentId : `int`, optional
+            If not `None`, the ID of the parent whose components should be
+            returned.
+
+        Returns
+        -------
+        components : `dict`
+            If ``parentId`` is not `None`, a dictionary mapping component name
+            to `DatasetRef` for the given parent.  Otherwise, a dictionary
+            mapping parent dataset ID to such a dictionary.
+        """
+        datasetCompositionTable = self._schema.tables["dataset_composition"]
+        datasetTable = self._schema.tables["dataset"]
+        columns = list(datasetTable.c)
+        columns.append(datasetCompositionTable.c.component_name)
+        columns.append(datasetCompositionTable.c.parent_dataset_id)
+        # Group component rows by parent DatasetType and component name, so
+        # we can recurse with one call for each component DatasetType.
+        rowsByComponentType = {}
+        for chunk in chunked(parents.keys(), self._BULK_CHUNK_SIZE):
             results = self._connection.execute(
                 select(
                     columns
@@ -266,27 +471,41 @@ class SqlRegistry(Registry):
                         datasetTable.c.dataset_id == datasetCompositionTable.c.component_dataset_id
                     )
                 ).where(
-                    datasetCompositionTable.c.parent_dataset_id == row["dataset_id"]
+                    datasetCompositionTable.c.parent_dataset_id.in_(chunk)
                 )
             ).fetchall()
             for result in results:
-                componentName = result["component_name"]
-                componentDatasetType = DatasetType(
-                    DatasetType.nameWithComponent(datasetType.name, componentName),
-                    dimensions=datasetType.dimensions,
-                    storageClass=datasetType.storageClass.components[componentName]
-                )
-                components[componentName] = self._makeDatasetRefFromRow(result, dataId=dataId,
-                                                                        datasetType=componentDatasetType)
-            if not components.keys() <= datasetType.storageClass.components.keys():
+                parent = parents[result["parent_dataset_id"]]
+                key = (parent.datasetType.name, result["component_name"])
+                rowsByComponentType.setdefault(key, []).append(result)
+        components = {id: {} for id in parents.keys()}
+        for (parentTypeName, componentName), results in rowsByComponentType.items():
+            parentDatasetType = parents[results[0]["parent_dataset_id"]].datasetType
+            storageClass = parentDatasetType.storageClass
+            if componentName not in storageClass.components:
                 raise RuntimeError(
                     f"Inconsistency detected between dataset and storage class definitions: "
-                    f"{datasetType.storageClass.name} has components "
-                    f"{set(datasetType.storageClass.components.keys())}, "
-                    f"but dataset has components {set(components.keys())}"
+                    f"{storageClass.name} has components "
+                    f"{set(storageClass.components.keys())}, "
+                    f"but dataset has component {componentName}"
                 )
-        return DatasetRef(datasetType=datasetType, dataId=dataId, id=row["dataset_id"], run=run,
-                          hash=datasetRefHash, components=components)
+            componentDatasetType = DatasetType(
+                DatasetType.nameWithComponent(parentTypeName, componentName),
+                dimensions=parentDatasetType.dimensions,
+                storageClass=storageClass.components[componentName]
+            )
+            componentRefs = self._makeDatasetRefsFromRows(
+                results,
+                datasetType=componentDatasetType,
+                dataIds=[parents[result["parent_dataset_id"]].dataId for result in results]
+            )
+            for result, componentRef in zip(results, componentRefs):
+                components[result["parent_dataset_id"]][componentName] = componentRef
+        if parentId is not None:
+            return components[parentId]
+        for id, parent in parents.items():
+            parent._components.update(components[id])
+        return components
 
     def getAllCollections(self):
         # Docstring inherited from Registry.getAllCollections
@@ -301,26 +520,64 @@ class SqlRegistry(Registry):
         if not isinstance(datasetType, DatasetType):
             datasetType = self.getDatasetType(datasetType)
         dataId = DataId(dataId, dimensions=datasetType.dimensions, universe=self.dimensions, **kwds)
-        datasetTable = self._schema.tables["dataset"]
-        datasetCollectionTable = self._schema.tables["dataset_collection"]
-        dataIdExpression = and_(self._schema.tables["dataset"].c[name] == dataId[name]
-                                for name in dataId.dimensions().links())
-        result = self._connection.execute(
-            datasetTable.select().select_from(
+        links = tuple(sorted(dataId.dimensions().links()))
+
+        def makeStatement():
+            datasetTable = self._schema.tables["dataset"]
+            datasetCollectionTable = self._schema.tables["dataset_collection"]
+            return datasetTable.select().select_from(
                 datasetTable.join(datasetCollectionTable)
             ).where(
                 and_(
-                    datasetTable.c.dataset_type_name == datasetType.name,
-                    datasetCollectionTable.c.collection == collection,
-                    dataIdExpression
+                    datasetTable.c.dataset_type_name == bindparam("dataset_type_name"),
+                    datasetCollectionTable.c.collection == bindparam("collection"),
+                    *[datasetTable.c[name] == bindparam(f"link_{name}") for name in links]
                 )
             )
+
+        result = self._executeCompiled(
+            self._getCachedStatement(("find", links), makeStatement),
+            dataset_type_name=datasetType.name,
+            collection=collection,
+            **{f"link_{name}": dataId[name] for name in links}
         ).fetchone()
         # TODO update dimension values and add Run, Quantum and assembler?
         if result is None:
             return None
         return self._makeDatasetRefFromRow(result, datasetType=datasetType, dataId=dataId)
 
+    def findMany(self, collection, datasetType, dataIds):
+        # Docstring inherited from Registry.findMany
+        if not isinstance(datasetType, DatasetType):
+            datasetType = self.getDatasetType(datasetType)
+        # Rather than matching on all of the dimension link columns, we match
+        # on dataset_ref_hash, which is a function of just the DatasetType
+        # name and the data ID and is unique within a collection.  That lets
+        # us resolve many data IDs with a single IN expression per chunk.
+        dataIdsByHash = {}
+        for dataId in dataIds:
+            dataId = DataId(dataId, dimensions=datasetType.dimensions, universe=self.dimensions)
+            dataIdsByHash[DatasetRef(datasetType, dataId).hash] = dataId
+        datasetTable = self._schema.tables["dataset"]
+        datasetCollectionTable = self._schema.tables["dataset_collection"]
+        result = {}
+        for chunk in chunked(dataIdsByHash.keys(), self._BULK_CHUNK_SIZE):
+            rows = self._connection.execute(
+                datasetTable.select().select_from(
+                    datasetTable.join(datasetCollectionTable)
+                ).where(
+                    and_(
+                        datasetTable.c.dataset_type_name == datasetType.name,
+                        datasetCollectionTable.c.collection == collection,
+                        datasetCollectionTable.c.dataset_ref_hash.in_(chunk)
+                    )
+                )
+            ).fetchall()
+            rowDataIds = [dataIdsByHash[row["dataset_ref_hash"]] for row in rows]
+            refs = self._makeDatasetRefsFromRows(rows, datasetType=datasetType, dataIds=rowDataIds)
+            result.update(zip(rowDataIds, refs))
+        return result
+
     def query(self, sql, **params):
         """Execute a SQL SELECT statement directly.
 
@@ -346,8 +603,99 @@ class SqlRegistry(Registry):
         """
         # TODO: make this guard against non-SELECT queries.
         t = text(sql)
-        for row in self._connection.execute(t, **params):
-            yield dict(row)
+        for rows in self._executeInChunks(t, **params):
+            for row in rows:
+                yield dict(row)
+
+    def _getCachedStatement(self, key, factory):
+        """Return a parameterized statement that is constructed only once for
+        this `Registry`.
+
+        Reusing the same statement object (with `sqlalchemy.sql.bindparam`
+        placeholders for values) allows `_executeCompiled` to reuse its
+        compiled form as well.
+
+        Parameters
+        ----------
+        key : `tuple`
+            Hashable key that identifies the statement.
+        factory : callable
+            Callable with no arguments that constructs the statement if it has
+            not already been constructed.
+
+        Returns
+        -------
+        statement : `sqlalchemy.sql.Executable`
+            The cached statement.
+        """
+        statement = self._statements.get(key)
+        if statement is None:
+            statement = self._statements.setdefault(key, factory())
+        return statement
+
+    def _executeCompiled(self, statement, **params):
+        """Execute a statement, using (and populating) a cache of compiled
+        statements.
+
+        The cache is keyed on statement identity, so this only saves time for
+        statements that are executed repeatedly, such as those returned by
+        `_getCachedStatement`.  Its size is set by the ``compiledCacheSize``
+        configuration option.
+
+        Parameters
+        ----------
+        statement : `sqlalchemy.sql.Executable`
+            Statement to execute.
+        **params
+            Parameter name-value pairs for the statement.
+
+        Returns
+        -------
+        result : `sqlalchemy.engine.ResultProxy`
+            Result of the statement.
+        """
+        connection = self._connection.execution_options(compiled_cache=self._compiledCache)
+        return connection.execute(statement, **params)
+
+    def _executeInChunks(self, statement, chunkSize=None, **params):
+        """Execute a SELECT statement, yielding result rows in chunks.
+
+        If the ``streamResults`` configuration option is `True`, the query is
+        executed with a server-side cursor (on databases that support them),
+        so the client holds at most ``chunkSize`` rows at a time rather than
+        the full result set.
+
+        Parameters
+        ----------
+        statement : `sqlalchemy.sql.Select` or `sqlalchemy.sql.TextClause`
+            Statement to execute.
+        chunkSize : `int`, optional
+            Maximum number of rows per chunk.  Defaults to the
+            ``fetchChunkSize`` configuration option.
+        **params
+            Parameter name-value pairs for the statement.
+
+        Yields
+        ------
+        rows : `list` of `sqlalchemy.engine.RowProxy`
+            The next (non-empty) chunk of result rows.
+        """
+        if chunkSize is None:
+            chunkSize = self.config.get("fetchChunkSize", 1000)
+        connection = self._connection
+        if self.config.get("streamResults", False):
+            connection = connection.execution_options(stream_results=True)
+        results = connection.execute(statement, **params)
+        try:
+            while True:
+                rows = results.fetchmany(chunkSize)
+                if not rows:
+                    break
+                if self._instrumentation is not None:
+                    self._instrumentation.addRows(results.context.statement, len(rows))
+                yield rows
+        finally:
+            results.close()
 
     @transactional
     def registerDatasetType(self, datasetType):
@@ -382,6 +730,7 @@ class SqlRegistry(Registry):
                           "dimension_name": dimensionName}
                          for dimensionName in datasetType.dimensions.names]
                     )
+                self._datasetTypes[datasetType.name] = datasetType
                 # Also register component DatasetTypes (if any).
                 for compName, compStorageClass in datasetType.storageClass.components.items():
                     compType = DatasetType(datasetType.componentTypeName(compName),
@@ -398,37 +747,92 @@ class SqlRegistry(Registry):
 
     def getAllDatasetTypes(self):
         # Docstring inherited from Registry.getAllDatasetTypes.
-        datasetTypeTable = self._schema.tables["dataset_type"]
-
-        # Get all the registered names
-        result = self._connection.execute(select([datasetTypeTable.c.dataset_type_name])).fetchall()
-        if result is None:
-            return frozenset()
-
-        datasetTypeNames = [r[0] for r in result]
-        return frozenset(self.getDatasetType(name) for name in datasetTypeNames)
+        # Always reload, in case other clients have registered new ones.
+        return frozenset(self._loadDatasetTypes(strict=True).values())
 
     def getDatasetType(self, name):
         # Docstring inherited from Registry.getDatasetType.
-        datasetTypeTable = self._schema.tables["dataset_type"]
-        datasetTypeDimensionsTable = self._schema.tables["dataset_type_dimensions"]
-        # Get StorageClass from DatasetType table
-        result = self._connection.execute(select([datasetTypeTable.c.storage_class]).where(
-            datasetTypeTable.c.dataset_type_name == name)).fetchone()
-
-        if result is None:
-            raise KeyError("Could not find entry for datasetType {}".format(name))
-
-        storageClass = self.storageClasses.getStorageClass(result["storage_class"])
-        # Get Dimensions (if any) from DatasetTypeDimensions table
-        result = self._connection.execute(select([datasetTypeDimensionsTable.c.dimension_name]).where(
-            datasetTypeDimensionsTable.c.dataset_type_name == name)).fetchall()
-        dimensions = self.dimensions.extract((r[0] for r in result) if result else ())
-        datasetType = DatasetType(name=name,
-                                  storageClass=storageClass,
-                                  dimensions=dimensions)
+        datasetType = self._datasetTypes.get(name)
+        if datasetType is None and not self._datasetTypesLoaded:
+            self._loadDatasetTypes()
+            datasetType = self._datasetTypes.get(name)
+        if datasetType is None:
+            # Not in the cache, but it may have been registered by another
+            # client since the cache was populated (or have a StorageClass
+            # we could not load in bulk, in which case this will raise).
+            self._loadDatasetTypes(name=name, strict=True)
+            datasetType = self._datasetTypes.get(name)
+            if datasetType is None:
+                raise KeyError("Could not find entry for datasetType {}".format(name))
         return datasetType
 
+    def _loadDatasetTypes(self, name=None, strict=False):
+        """Populate the DatasetType cache with a single query on the
+        dataset_type and dataset_type_dimensions tables.
+
+        Parameters
+        ----------
+        name : `str`, optional
+            If not `None`, load only the `DatasetType` with this name.
+            Otherwise load all `DatasetType` definitions.
+        strict : `bool`
+            If `True`, raise if the `StorageClass` of a `DatasetType` is not
+            known.  If `False`, such DatasetTypes are silently left out of
+            the cache (and will be loaded individually, in strict mode, if
+            requested by name).
+
+        Returns
+        -------
+        datasetTypes : `dict`
+            The `DatasetType` objects loaded, keyed by name.
+        """
+        def makeStatement():
+            datasetTypeTable = self._schema.tables["dataset_type"]
+            datasetTypeDimensionsTable = self._schema.tables["dataset_type_dimensions"]
+            query = select(
+                [datasetTypeTable.c.dataset_type_name,
+                 datasetTypeTable.c.storage_class,
+                 datasetTypeDimensionsTable.c.dimension_name]
+            ).select_from(
+                datasetTypeTable.outerjoin(
+                    datasetTypeDimensionsTable,
+                    datasetTypeTable.c.dataset_type_name == datasetTypeDimensionsTable.c.dataset_type_name
+                )
+            )
+            if name is not None:
+                query = query.where(datasetTypeTable.c.dataset_type_name == bindparam("name"))
+            return query
+
+        statement = self._getCachedStatement(("loadDatasetTypes", name is not None), makeStatement)
+        params = {"name": name} if name is not None else {}
+        storageClassNames = {}
+        dimensionNames = {}
+        for row in self._executeCompiled(statement, **params):
+            storageClassNames[row["dataset_type_name"]] = row["storage_class"]
+            names = dimensionNames.setdefault(row["dataset_type_name"], [])
+            if row["dimension_name"] is not None:
+                names.append(row["dimension_name"])
+        loaded = {}
+        for datasetTypeName, storageClassName in storageClassNames.items():
+            try:
+                storageClass = self.storageClasses.getStorageClass(storageClassName)
+            except KeyError:
+                if strict:
+                    raise
+                continue
+            loaded[datasetTypeName] = DatasetType(
+                name=datasetTypeName,
+                storageClass=storageClass,
+                dimensions=self.dimensions.extract(dimensionNames[datasetTypeName])
+            )
+        # Update the cache in one step, so other threads never see a partially
+        # populated cache marked as complete.
+        with self._cacheLock:
+            self._datasetTypes.update(loaded)
+            if name is None:
+                self._datasetTypesLoaded = True
+        return loaded
+
     @transactional
     def addDataset(self, datasetType, dataId, run, producer=None, recursive=False, **kwds):
         # Docstring inherited from Registry.addDataset
@@ -452,11 +856,11 @@ class SqlRegistry(Registry):
         # want.
         datasetTable = self._schema.tables["dataset"]
         datasetRef = DatasetRef(datasetType=datasetType, dataId=dataId, run=run)
-        # TODO add producer
+        quantumId = producer.id if producer is not None else None
         result = self._connection.execute(datasetTable.insert().values(dataset_type_name=datasetType.name,
                                                                        run_id=run.id,
                                                                        dataset_ref_hash=datasetRef.hash,
-                                                                       quantum_id=None,
+                                                                       quantum_id=quantumId,
                                                                        **links))
         datasetRef._id = result.inserted_primary_key[0]
         # If the result is reported as a list of a number, unpack the list
@@ -475,11 +879,96 @@ class SqlRegistry(Registry):
                 self.attachComponent(component, datasetRef, compRef)
         return datasetRef
 
+    @transactional
+    def addDatasets(self, datasetType, dataIds, run, producer=None, recursive=False, **kwds):
+        # Docstring inherited from Registry.addDatasets
+
+        if not isinstance(datasetType, DatasetType):
+            datasetType = self.getDatasetType(datasetType)
+
+        dataIds = [DataId(dataId, dimensions=datasetType.dimensions, universe=self.dimensions, **kwds)
+                   for dataId in dataIds]
+        if not dataIds:
+            return []
+        if not self.limited:
+            self.expandDataIds(dataIds)
+
+        refs = [DatasetRef(datasetType=datasetType, dataId=dataId, run=run) for dataId in dataIds]
+        if len({ref.hash for ref in refs}) != len(refs):
+            raise ConflictingDefinitionError(
+                f"Duplicate data IDs given for new datasets of type {datasetType.name}."
+            )
+
+        # Insert all Dataset rows with a single executemany call.
+        datasetTable = self._schema.tables["dataset"]
+        quantumId = producer.id if producer is not None else None
+        self._connection.execute(
+            datasetTable.insert(),
+            [dict(dataset_type_name=datasetType.name, run_id=run.id, dataset_ref_hash=ref.hash,
+                  quantum_id=quantumId, **ref.dataId.implied())
+             for ref in refs]
+        )
+
+        # Most DBAPI drivers do not report autoincrement primary keys for
+        # executemany inserts, so read them back using the (run, hash)
+        # combinations we just inserted.  Any older datasets with the same
+        # hash in this run (i.e. ones that have since been disassociated from
+        # the run collection) will have smaller IDs than the new ones.
+        refsByHash = {ref.hash: ref for ref in refs}
+        for chunk in chunked(refsByHash.keys(), self._BULK_CHUNK_SIZE):
+            results = self._connection.execute(
+                select(
+                    [datasetTable.c.dataset_id, datasetTable.c.dataset_ref_hash]
+                ).where(
+                    and_(datasetTable.c.run_id == run.id,
+                         datasetTable.c.dataset_ref_hash.in_(chunk))
+                ).order_by(
+                    datasetTable.c.dataset_id
+                )
+            )
+            for row in results:
+                refsByHash[row["dataset_ref_hash"]]._id = row["dataset_id"]
+
+        # A dataset is always initially associated with its Run collection.
+        # The datasets are all new, so any failure here is a true conflict.
+        datasetCollectionTable = self._schema.tables["dataset_collection"]
+        try:
+            self._connection.execute(
+                datasetCollectionTable.insert(),
+                [{"dataset_id": ref.id, "dataset_ref_hash": ref.hash, "collection": run.collection}
+                 for ref in refs]
+            )
+        except IntegrityError as err:
+            raise ConflictingDefinitionError(
+                f"One or more datasets of type {datasetType.name} already exist in collection "
+                f"{run.collection}."
+            ) from err
+
+        if recursive:
+            datasetCompositionTable = self._schema.tables["dataset_composition"]
+            for component in datasetType.storageClass.components:
+                compTypeName = datasetType.componentTypeName(component)
+                compDatasetType = self.getDatasetType(compTypeName)
+                compRefs = self.addDatasets(compDatasetType, dataIds, run=run, producer=producer,
+                                            recursive=True)
+                self._connection.execute(
+                    datasetCompositionTable.insert(),
+                    [dict(component_name=component, parent_dataset_id=ref.id,
+                          component_dataset_id=compRef.id)
+                     for ref, compRef in zip(refs, compRefs)]
+                )
+                for ref, compRef in zip(refs, compRefs):
+                    ref._components[component] = compRef
+        return refs
+
     def getDataset(self, id, datasetType=None, dataId=None):
         # Docstring inherited from Registry.getDataset
-        datasetTable = self._schema.tables["dataset"]
-        result = self._connection.execute(
-            select([datasetTable]).where(datasetTable.c.dataset_id == id)).fetchone()
+        def makeStatement():
+            datasetTable = self._schema.tables["dataset"]
+            return select([datasetTable]).where(datasetTable.c.dataset_id == bindparam("dataset_id"))
+
+        result = self._executeCompiled(self._getCachedStatement(("getDataset",), makeStatement),
+                                       dataset_id=id).fetchone()
         if result is None:
             return None
         return self._makeDatasetRefFromRow(result, datasetType=datasetType, dataId=dataId)
@@ -487,53 +976,78 @@ class SqlRegistry(Registry):
     @transactional
     def removeDataset(self, ref):
         # Docstring inherited from Registry.removeDataset.
-        if not ref.id:
-            raise AmbiguousDatasetError(f"Cannot remove dataset {ref} without ID.")
+        self.removeDatasets([ref])
 
-        # Remove component datasets.  We assume ``ref.components`` is already
-        # correctly populated, and rely on ON DELETE CASCADE to remove entries
-        # from DatasetComposition.
-        for componentRef in ref.components.values():
-            self.removeDataset(componentRef)
+    @transactional
+    def removeDatasets(self, refs):
+        # Docstring inherited from Registry.removeDatasets.
+
+        # Remove component datasets along with their parents.  We assume
+        # ``ref.components`` is already correctly populated, and rely on ON
+        # DELETE CASCADE to remove entries from DatasetComposition.
+        datasetIds = set()
+        for ref in _expandComponents(refs):
+            if not ref.id:
+                raise AmbiguousDatasetError(f"Cannot remove dataset {ref} without ID.")
+            datasetIds.add(ref.id)
 
         datasetTable = self._schema.tables["dataset"]
-
-        # Remove related quanta.  We actually delete from Execution, because
-        # Quantum's primary key (quantum_id) is also a foreign key to
-        # Execution.execution_id.  We then rely on ON DELETE CASCADE to remove
-        # the Quantum record as well as any related records in
-        # DatasetConsumers.  Note that we permit a Quantum to be deleted
-        # without removing the Datasets it refers to, but do not allow a
-        # Dataset to be deleting without removing the Quanta that refer to
-        # them.  A Dataset is still quite usable without provenance, but
-        # provenance is worthless if it's inaccurate.
         executionTable = self._schema.tables["execution"]
         datasetConsumersTable = self._schema.tables["dataset_consumers"]
-        selectProducer = select(
-            [datasetTable.c.quantum_id]
-        ).where(
-            datasetTable.c.dataset_id == ref.id
-        )
-        selectConsumers = select(
-            [datasetConsumersTable.c.quantum_id]
-        ).where(
-            datasetConsumersTable.c.dataset_id == ref.id
-        )
-        self._connection.execute(
-            executionTable.delete().where(
-                executionTable.c.execution_id.in_(union(selectProducer, selectConsumers))
+        for chunk in chunked(datasetIds, self._BULK_CHUNK_SIZE):
+            # Remove related quanta.  We actually delete from Execution,
+            # because Quantum's primary key (quantum_id) is also a foreign key
+            # to Execution.execution_id.  We then rely on ON DELETE CASCADE to
+            # remove the Quantum record as well as any related records in
+            # DatasetConsumers.  Note that we permit a Quantum to be deleted
+            # without removing the Datasets it refers to, but do not allow a
+            # Dataset to be deleting without removing the Quanta that refer to
+            # them.  A Dataset is still quite usable without provenance, but
+            # provenance is worthless if it's inaccurate.
+            selectProducers = select(
+                [datasetTable.c.quantum_id]
+            ).where(
+                datasetTable.c.dataset_id.in_(chunk)
+            )
+            selectConsumers = select(
+                [datasetConsumersTable.c.quantum_id]
+            ).where(
+                datasetConsumersTable.c.dataset_id.in_(chunk)
             )
-        )
-
-        # Remove the Dataset record itself.  We rely on ON DELETE CASCADE to
-        # remove from DatasetCollection, and assume foreign key violations
-        # come from DatasetLocation (everything else should have an ON DELETE).
-        try:
             self._connection.execute(
-                datasetTable.delete().where(datasetTable.c.dataset_id == ref.id)
+                executionTable.delete().where(
+                    executionTable.c.execution_id.in_(union(selectProducers, selectConsumers))
+                )
             )
-        except IntegrityError as err:
-            raise OrphanedRecordError(f"Dataset {ref} is still present in one or more Datastores.") from err
+
+            # Remove the Dataset records themselves.  We rely on ON DELETE
+            # CASCADE to remove from DatasetCollection, and assume foreign key
+            # violations come from DatasetLocation (everything else should
+            # have an ON DELETE).
+            try:
+                self._connection.execute(
+                    datasetTable.delete().where(datasetTable.c.dataset_id.in_(chunk))
+                )
+            except IntegrityError as err:
+                raise OrphanedRecordError("One or more of the datasets to be removed are still present "
+                                          "in one or more Datastores.") from err
+
+    def getDatasetsInCollection(self, collection):
+        # Docstring inherited from Registry.getDatasetsInCollection.
+        datasetTable = self._schema.tables["dataset"]
+        datasetCollectionTable = self._schema.tables["dataset_collection"]
+        datasetCompositionTable = self._schema.tables["dataset_composition"]
+        query = select(
+            [datasetTable]
+        ).select_from(
+            datasetTable.join(datasetCollectionTable,
+                              datasetTable.c.dataset_id == datasetCollectionTable.c.dataset_id)
+        ).where(
+            and_(datasetCollectionTable.c.collection == collection,
+                 datasetTable.c.dataset_id.notin_(
+                     select([datasetCompositionTable.c.component_dataset_id])))
+        )
+        return self._makeDatasetRefsFromRows(self._connection.execute(query).fetchall())
 
     @transactional
     def attachComponent(self, name, parent, component):
@@ -555,48 +1069,94 @@ class SqlRegistry(Registry):
     def associate(self, collection, refs):
         # Docstring inherited from Registry.associate.
 
-        # Most SqlRegistry subclass implementations should replace this
-        # implementation with special "UPSERT" or "MERGE" syntax.  This
-        # implementation is only concurrency-safe for databases that implement
-        # transactions with database- or table-wide locks (e.g. SQLite).
+        # This is a set-based implementation: we flatten the component
+        # closure of the given refs up front, look for existing entries in
+        # the collection with one query per chunk, and then insert only the
+        # new entries with a single executemany call.  Entries for the same
+        # datasets added concurrently by another writer are not conflicts:
+        # SQLite skips them with INSERT OR IGNORE (its database-wide locks
+        # mean the pre-check can't have missed a conflicting entry), and
+        # other databases look for them again after an IntegrityError.
 
         datasetCollectionTable = self._schema.tables["dataset_collection"]
-        insertQuery = datasetCollectionTable.insert()
-        checkQuery = select([datasetCollectionTable.c.dataset_id], whereclause=and_(
-            datasetCollectionTable.c.collection == collection,
-            datasetCollectionTable.c.dataset_ref_hash == bindparam("hash")))
 
-        for ref in refs:
+        def makeConflictError(ref):
+            return ConflictingDefinitionError(
+                "A dataset of type {} with id: {} already exists in collection {}".format(
+                    ref.datasetType, ref.dataId, collection
+                )
+            )
+
+        refsByHash = {}
+        for ref in _expandComponents(refs):
             if ref.id is None:
                 raise AmbiguousDatasetError(f"Cannot associate dataset {ref} without ID.")
+            if refsByHash.setdefault(ref.hash, ref).id != ref.id:
+                raise makeConflictError(ref)
+
+        def removeExisting():
+            # Did any of these clash with a completely duplicate entry
+            # (because that dataset is already in this collection)?  Or is
+            # there already a different dataset with the same DatasetType and
+            # data ID in this collection?  Only the latter is an error.
+            for chunk in chunked(list(refsByHash.keys()), self._BULK_CHUNK_SIZE):
+                results = self._connection.execute(
+                    select(
+                        [datasetCollectionTable.c.dataset_id, datasetCollectionTable.c.dataset_ref_hash]
+                    ).where(
+                        and_(datasetCollectionTable.c.collection == collection,
+                             datasetCollectionTable.c.dataset_ref_hash.in_(chunk))
+                    )
+                )
+                for row in results:
+                    ref = refsByHash.pop(row["dataset_ref_hash"])
+                    if row["dataset_id"] != ref.id:
+                        raise makeConflictError(ref)
 
+        def makeRows():
+            return [{"dataset_id": ref.id, "dataset_ref_hash": ref.hash, "collection": collection}
+                    for ref in refsByHash.values()]
+
+        removeExisting()
+        if not refsByHash:
+            return
+        if self._connection.dialect.name == "sqlite":
+            self._connection.execute(datasetCollectionTable.insert().prefix_with("OR IGNORE"), makeRows())
+            return
+        try:
+            # Use a savepoint so a failure does not roll back any enclosing
+            # transaction.
+            with self._connection.begin_nested():
+                self._connection.execute(datasetCollectionTable.insert(), makeRows())
+                return
+        except IntegrityError as err:
+            remaining = len(refsByHash)
+            removeExisting()
+            if len(refsByHash) == remaining:
+                # The failure wasn't caused by concurrently-added entries.
+                raise ConflictingDefinitionError(
+                    f"Could not add datasets to collection {collection}."
+                ) from err
+        if refsByHash:
             try:
-                self._connection.execute(insertQuery, {"dataset_id": ref.id, "dataset_ref_hash": ref.hash,
-                                                       "collection": collection})
-            except IntegrityError:
-                # Did we clash with a completely duplicate entry (because this
-                # dataset is already in this collection)?  Or is there already
-                # a different dataset with the same DatasetType and data ID in
-                # this collection?  Only the latter is an error.
-                row = self._connection.execute(checkQuery, hash=ref.hash).fetchone()
-                if row.dataset_id != ref.id:
-                    raise ConflictingDefinitionError(
-                        "A dataset of type {} with id: {} already exists in collection {}".format(
-                            ref.datasetType, ref.dataId, collection
-                        )
-                    )
-            self.associate(collection, ref.components.values())
+                self._connection.execute(datasetCollectionTable.insert(), makeRows())
+            except IntegrityError as err:
+                raise ConflictingDefinitionError(
+                    f"Conflicting datasets were concurrently added to collection {collection}."
+                ) from err
 
     @transactional
     def disassociate(self, collection, refs):
         # Docstring inherited from Registry.disassociate.
         datasetCollectionTable = self._schema.tables["dataset_collection"]
-        for ref in refs:
+        datasetIds = set()
+        for ref in _expandComponents(refs):
             if ref.id is None:
                 raise AmbiguousDatasetError(f"Cannot disassociate dataset {ref} without ID.")
-            self.disassociate(collection, ref.components.values())
+            datasetIds.add(ref.id)
+        for chunk in chunked(datasetIds, self._BULK_CHUNK_SIZE):
             self._connection.execute(datasetCollectionTable.delete().where(
-                and_(datasetCollectionTable.c.dataset_id == ref.id,
+                and_(datasetCollectionTable.c.dataset_id.in_(chunk),
                      datasetCollectionTable.c.collection == collection)))
 
     @transactional
@@ -609,6 +1169,18 @@ class SqlRegistry(Registry):
                       datastore_name=datastoreName)
         self._connection.execute(datasetStorageTable.insert().values(**values))
 
+    @transactional
+    def addDatasetLocations(self, refs, datastoreName):
+        # Docstring inherited from Registry.addDatasetLocations.
+        rows = []
+        for ref in refs:
+            if ref.id is None:
+                raise AmbiguousDatasetError(f"Cannot add location for dataset {ref} without ID.")
+            rows.append(dict(dataset_id=ref.id, datastore_name=datastoreName))
+        if rows:
+            datasetStorageTable = self._schema.tables["dataset_storage"]
+            self._connection.execute(datasetStorageTable.insert(), rows)
+
     def getDatasetLocations(self, ref):
         # Docstring inherited from Registry.getDatasetLocation.
         if ref.id is None:
@@ -628,6 +1200,20 @@ class SqlRegistry(Registry):
             and_(datasetStorageTable.c.dataset_id == ref.id,
                  datasetStorageTable.c.datastore_name == datastoreName)))
 
+    @transactional
+    def removeDatasetLocations(self, datastoreName, refs):
+        # Docstring inherited from Registry.removeDatasetLocations.
+        datasetStorageTable = self._schema.tables["dataset_storage"]
+        datasetIds = set()
+        for ref in refs:
+            if ref.id is None:
+                raise AmbiguousDatasetError(f"Cannot remove location for dataset {ref} without ID.")
+            datasetIds.add(ref.id)
+        for chunk in chunked(datasetIds, self._BULK_CHUNK_SIZE):
+            self._connection.execute(datasetStorageTable.delete().where(
+                and_(datasetStorageTable.c.dataset_id.in_(chunk),
+                     datasetStorageTable.c.datastore_name == datastoreName)))
+
     @transactional
     def addExecution(self, execution):
         # Docstring inherited from Registry.addExecution
@@ -703,37 +1289,37 @@ class SqlRegistry(Registry):
 
     def getRun(self, id=None, collection=None):
         # Docstring inherited from Registry.getRun
-        executionTable = self._schema.tables["execution"]
-        runTable = self._schema.tables["run"]
+
+        def makeStatement(column):
+            executionTable = self._schema.tables["execution"]
+            runTable = self._schema.tables["run"]
+            return select([executionTable.c.execution_id,
+                           executionTable.c.start_time,
+                           executionTable.c.end_time,
+                           executionTable.c.host,
+                           runTable.c.collection,
+                           runTable.c.environment_id,
+                           runTable.c.pipeline_id]).select_from(
+                runTable.join(executionTable)).where(
+                runTable.c[column] == bindparam("value"))
+
         run = None
         # Retrieve by id
         if (id is not None) and (collection is None):
             run = self._cachedRuns.get(id)
             if run is not None:
                 return run
-            result = self._connection.execute(select([executionTable.c.execution_id,
-                                                      executionTable.c.start_time,
-                                                      executionTable.c.end_time,
-                                                      executionTable.c.host,
-                                                      runTable.c.collection,
-                                                      runTable.c.environment_id,
-                                                      runTable.c.pipeline_id]).select_from(
-                runTable.join(executionTable)).where(
-                runTable.c.execution_id == id)).fetchone()
+            statement = self._getCachedStatement(("getRun", "execution_id"),
+                                                 lambda: makeStatement("execution_id"))
+            result = self._executeCompiled(statement, value=id).fetchone()
         # Retrieve by collection
         elif (collection is not None) and (id is None):
             run = self._cachedRuns.get(collection, None)
             if run is not None:
                 return run
-            result = self._connection.execute(select([executionTable.c.execution_id,
-                                                      executionTable.c.start_time,
-                                                      executionTable.c.end_time,
-                                                      executionTable.c.host,
-                                                      runTable.c.collection,
-                                                      runTable.c.environment_id,
-                                                      runTable.c.pipeline_id]).select_from(
-                runTable.join(executionTable)).where(
-                runTable.c.collection == collection)).fetchone()
+            statement = self._getCachedStatement(("getRun", "collection"),
+                                                 lambda: makeStatement("collection"))
+            result = self._executeCompiled(statement, value=collection).fetchone()
         else:
             raise ValueError("Either collection or id must be given")
         if result is not None:
@@ -748,57 +1334,131 @@ class SqlRegistry(Registry):
             self._cachedRuns[run.collection] = run
         return run
 
+    def _reserveExecutionIds(self, count):
+        """Reserve IDs for new Execution rows, so they can be inserted with
+        a single ``executemany`` call.
+
+        Parameters
+        ----------
+        count : `int`
+            Number of IDs to reserve.
+
+        Returns
+        -------
+        ids : `list` of `int`, or `None`
+            New IDs that are guaranteed not to be used by any other
+            Execution, or `None` if this cannot be done safely for this
+            database, in which case Executions are inserted one at a time.
+            The base class implementation always returns `None`.
+        """
+        return None
+
+    def _addExecutions(self, executions):
+        """Insert many Executions, setting the ``id`` of any that do not
+        already have one.
+
+        Parameters
+        ----------
+        executions : `list` of `Execution`
+            Instances to add to the `Registry`.
+        """
+        new = [execution for execution in executions if execution.id is None]
+        ids = self._reserveExecutionIds(len(new)) if new else []
+        if ids is None:
+            for execution in executions:
+                self.addExecution(execution)
+            return
+        for execution, id in zip(new, ids):
+            execution._id = id
+        executionTable = self._schema.tables["execution"]
+        self._connection.execute(
+            executionTable.insert(),
+            [dict(execution_id=execution.id, start_time=execution.startTime, end_time=execution.endTime,
+                  host=execution.host)
+             for execution in executions]
+        )
+
     @transactional
     def addQuantum(self, quantum):
         # Docstring inherited from Registry.addQuantum.
+        self.addQuanta([quantum])
+
+    @transactional
+    def addQuanta(self, quanta):
+        # Docstring inherited from Registry.addQuanta.
+        quanta = list(quanta)
+        if not quanta:
+            return
         quantumTable = self._schema.tables["quantum"]
         datasetConsumersTable = self._schema.tables["dataset_consumers"]
         # First add the Execution part
-        self.addExecution(quantum)
+        self._addExecutions(quanta)
         # Then the Quantum specific part
-        self._connection.execute(quantumTable.insert().values(execution_id=quantum.id,
-                                                              task=quantum.task,
-                                                              run_id=quantum.run.id))
+        self._connection.execute(
+            quantumTable.insert(),
+            [dict(execution_id=quantum.id, task=quantum.task, run_id=quantum.run.id)
+             for quantum in quanta]
+        )
         # Attach dataset consumers
         # We use itertools.chain here because quantum.predictedInputs is a
         # dict of ``name : [DatasetRef, ...]`` and we need to flatten it
         # for inserting.
-        flatInputs = itertools.chain.from_iterable(quantum.predictedInputs.values())
-        self._connection.execute(datasetConsumersTable.insert(),
-                                 [{"quantum_id": quantum.id, "dataset_id": ref.id, "actual": False}
-                                     for ref in flatInputs])
+        rows = [{"quantum_id": quantum.id, "dataset_id": ref.id, "actual": False}
+                for quantum in quanta
+                for ref in itertools.chain.from_iterable(quantum.predictedInputs.values())]
+        if rows:
+            self._connection.execute(datasetConsumersTable.insert(), rows)
 
     def getQuantum(self, id):
         # Docstring inherited from Registry.getQuantum.
+        return self.getQuanta([id]).get(id)
+
+    def getQuanta(self, ids):
+        # Docstring inherited from Registry.getQuanta.
         executionTable = self._schema.tables["execution"]
         quantumTable = self._schema.tables["quantum"]
-        result = self._connection.execute(
-            select([quantumTable.c.task,
-                    quantumTable.c.run_id,
-                    executionTable.c.start_time,
-                    executionTable.c.end_time,
-                    executionTable.c.host]).select_from(quantumTable.join(executionTable)).where(
-                quantumTable.c.execution_id == id)).fetchone()
-        if result is not None:
-            run = self.getRun(id=result["run_id"])
-            quantum = Quantum(task=result["task"],
-                              run=run,
-                              startTime=result["start_time"],
-                              endTime=result["end_time"],
-                              host=result["host"],
-                              id=id)
-            # Add predicted and actual inputs to quantum
-            datasetConsumersTable = self._schema.tables["dataset_consumers"]
-            for result in self._connection.execute(select([datasetConsumersTable.c.dataset_id,
-                                                           datasetConsumersTable.c.actual]).where(
-                    datasetConsumersTable.c.quantum_id == id)):
-                ref = self.getDataset(result["dataset_id"])
-                quantum.addPredictedInput(ref)
-                if result["actual"]:
-                    quantum._markInputUsed(ref)
-            return quantum
-        else:
-            return None
+        datasetTable = self._schema.tables["dataset"]
+        datasetConsumersTable = self._schema.tables["dataset_consumers"]
+        quanta = {}
+        consumers = []
+        for chunk in chunked(set(ids), self._BULK_CHUNK_SIZE):
+            for result in self._connection.execute(
+                    select([quantumTable.c.execution_id,
+                            quantumTable.c.task,
+                            quantumTable.c.run_id,
+                            executionTable.c.start_time,
+                            executionTable.c.end_time,
+                            executionTable.c.host]).select_from(quantumTable.join(executionTable)).where(
+                        quantumTable.c.execution_id.in_(chunk))):
+                quanta[result["execution_id"]] = Quantum(task=result["task"],
+                                                         run=self.getRun(id=result["run_id"]),
+                                                         startTime=result["start_time"],
+                                                         endTime=result["end_time"],
+                                                         host=result["host"],
+                                                         id=result["execution_id"])
+            consumers.extend(self._connection.execute(
+                select([datasetConsumersTable.c.quantum_id,
+                        datasetConsumersTable.c.dataset_id,
+                        datasetConsumersTable.c.actual]).where(
+                    datasetConsumersTable.c.quantum_id.in_(chunk))).fetchall())
+
+        # Retrieve all predicted and actual inputs at once, so components and
+        # runs are resolved in bulk and datasets shared by several quanta are
+        # only retrieved once.
+        refs = {}
+        for chunk in chunked({row["dataset_id"] for row in consumers}, self._BULK_CHUNK_SIZE):
+            rows = self._connection.execute(
+                select([datasetTable]).where(datasetTable.c.dataset_id.in_(chunk))
+            ).fetchall()
+            for ref in self._makeDatasetRefsFromRows(rows):
+                refs[ref.id] = ref
+        for row in consumers:
+            quantum = quanta[row["quantum_id"]]
+            ref = refs[row["dataset_id"]]
+            quantum.addPredictedInput(ref)
+            if row["actual"]:
+                quantum._markInputUsed(ref)
+        return quanta
 
     @transactional
     def markInputUsed(self, quantum, ref):
@@ -811,6 +1471,83 @@ class SqlRegistry(Registry):
             raise KeyError("{} is not a predicted consumer for {}".format(ref, quantum))
         quantum._markInputUsed(ref)
 
+    def _makeProvenanceQuery(self, ref, depth, upstream):
+        """Return a query for the datasets reachable from a dataset by
+        following provenance links in one direction.
+
+        The traversal is a single recursive common table expression, so the
+        whole graph is walked by the database in one round-trip.
+
+        Parameters
+        ----------
+        ref : `DatasetRef`
+            Dataset to start from.
+        depth : `int` or `None`
+            Maximum number of Quanta to follow.
+        upstream : `bool`
+            If `True`, follow links from datasets to the inputs of their
+            producers; if `False`, follow links from datasets to the outputs
+            of their consumers.
+
+        Returns
+        -------
+        query : `sqlalchemy.sql.Select`
+            Query for all columns of the `Dataset` table.
+        """
+        if ref.id is None:
+            raise AmbiguousDatasetError(f"Cannot query provenance of dataset {ref} without ID.")
+        datasetTable = self._schema.tables["dataset"]
+        datasetConsumersTable = self._schema.tables["dataset_consumers"]
+
+        def makeStep():
+            # Return a join that relates one dataset to the next along with
+            # the dataset ID columns at either end of it.  New aliases are
+            # needed for each use, as the tables appear in both the initial
+            # and the recursive part of the CTE.
+            dataset = datasetTable.alias()
+            consumers = datasetConsumersTable.alias()
+            if upstream:
+                return (dataset.join(consumers, consumers.c.quantum_id == dataset.c.quantum_id),
+                        dataset.c.dataset_id, consumers.c.dataset_id)
+            return (consumers.join(dataset, dataset.c.quantum_id == consumers.c.quantum_id),
+                    consumers.c.dataset_id, dataset.c.dataset_id)
+
+        # Only track the depth of each dataset when it is needed; without it,
+        # UNION removes duplicates as soon as they are found, which keeps the
+        # recursion from revisiting shared parts of the graph.
+        join, source, target = makeStep()
+        columns = [target.label("dataset_id")]
+        if depth is not None:
+            columns.append(literal(1).label("depth"))
+        provenance = select(columns).select_from(join).where(source == ref.id).cte("provenance",
+                                                                                   recursive=True)
+        previous = provenance.alias("previous")
+        join, source, target = makeStep()
+        columns = [target]
+        if depth is not None:
+            columns.append(previous.c.depth + 1)
+        recursion = select(columns).select_from(previous.join(join, source == previous.c.dataset_id))
+        if depth is not None:
+            recursion = recursion.where(previous.c.depth < depth)
+        provenance = provenance.union(recursion)
+        return select([datasetTable]).where(datasetTable.c.dataset_id.in_(select([provenance.c.dataset_id])))
+
+    def _iterDatasetRefs(self, query):
+        """Yield DatasetRefs from a query on the Dataset table, constructing
+        them from one fetched chunk of rows (see `_executeInChunks`) at a time
+        so that large results are never held in memory all at once.
+        """
+        for rows in self._executeInChunks(query):
+            yield from self._makeDatasetRefsFromRows(rows)
+
+    def getUpstreamDatasets(self, ref, depth=None):
+        # Docstring inherited from Registry.getUpstreamDatasets.
+        return self._iterDatasetRefs(self._makeProvenanceQuery(ref, depth, upstream=True))
+
+    def getDownstreamDatasets(self, ref, depth=None):
+        # Docstring inherited from Registry.getDownstreamDatasets.
+        return self._iterDatasetRefs(self._makeProvenanceQuery(ref, depth, upstream=False))
+
     @disableWhenLimited
     @transactional
     def addDimensionEntry(self, dimension, dataId=None, entry=None, **kwds):
@@ -829,6 +1566,7 @@ class SqlRegistry(Registry):
         except IntegrityError:
             # TODO check for conflict, not just existence.
             raise ConflictingDefinitionError(f"Existing definition for {dimension.name} entry with {dataId}.")
+        self._metadataCache.invalidate(dimension, dataId)
         if dataId.region is not None:
             self.setDimensionRegion(dataId)
         return dataId
@@ -858,13 +1596,6 @@ class SqlRegistry(Registry):
             )
         else:
             skypixJoin = None
-        skypixParams = []
-        if skypixJoin is not None:
-            for dataId in dataIdList:
-                if dataId.region is not None:
-                    for begin, end in self.pixelization.envelope(dataId.region).ranges():
-                        for skypix in range(begin, end):
-                            skypixParams.append(dict(dataId, skypix=skypix))
         try:
             self._connection.execute(table.insert(), *[dataId.fields(dimension, region=True) for dataId in
                                                        dataIdList])
@@ -872,10 +1603,51 @@ class SqlRegistry(Registry):
         except IntegrityError:
             # TODO check for conflict, not just existence.
             raise ConflictingDefinitionError(f"Existing definition for {dimension.name} entry.")
+        for dataId in dataIdList:
+            self._metadataCache.invalidate(dimension, dataId)
         if skypixJoin is not None:
-            self._connection.execute(self._schema.tables[skypixJoin.name].insert(), *skypixParams)
+            skypixTable = self._schema.tables[skypixJoin.name]
+            chunkSize = self.config.get("skypixInsertChunkSize", 10000)
+            dataIdsWithRegions = [dataId for dataId in dataIdList if dataId.region is not None]
+            envelopes = self._computeSkyPixEnvelopes([dataId.region for dataId in dataIdsWithRegions])
+            skypixParams = []
+            for dataId, ranges in zip(dataIdsWithRegions, envelopes):
+                skypixParams.extend(self._makeSkyPixJoinRows(dataId, ranges))
+                if len(skypixParams) >= chunkSize:
+                    self._connection.execute(skypixTable.insert(), skypixParams)
+                    skypixParams = []
+            if skypixParams:
+                self._connection.execute(skypixTable.insert(), skypixParams)
         return dataIdList
 
+    def _computeSkyPixEnvelopes(self, regions):
+        """Compute the skypix envelopes of many regions.
+
+        If the ``envelopeProcesses`` configuration option is greater than
+        one, envelopes are computed in a pool of that many worker processes.
+
+        Parameters
+        ----------
+        regions : `list` of `lsst.sphgeom.Region`
+            Regions to compute envelopes for.
+
+        Yields
+        ------
+        ranges : `list` of `tuple`
+            The ``(begin, end)`` skypix ranges overlapping each region, in the
+            same order as ``regions``.
+        """
+        processes = self.config.get("envelopeProcesses", 0)
+        if not processes or processes <= 1 or len(regions) <= 1:
+            for region in regions:
+                yield self.pixelization.envelope(region).ranges()
+            return
+        pixelization = (self.config["skypix", "cls"], self.config["skypix", "level"])
+        chunkSize = max(1, len(regions) // (4*processes))
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            yield from executor.map(_computeSkyPixEnvelope, itertools.repeat(pixelization),
+                                    [region.encode() for region in regions], chunksize=chunkSize)
+
     @disableWhenLimited
     def findDimensionEntries(self, dimension):
         # Docstring inherited from Registry.findDimensionEntries
@@ -936,6 +1708,8 @@ class SqlRegistry(Registry):
                     **dataId
                 )
             )
+        # Any other cached columns are still valid, so just replace the region.
+        self._metadataCache.update(holder, dataId, {"region": dataId.region})
         # Update the join table between this Dimension and skypix, if it isn't
         # itself a view.
         join = dataId.dimensions().union(["skypix"]).joins().findIf(
@@ -951,16 +1725,37 @@ class SqlRegistry(Registry):
                           for name in holder.links()))
                 )
             )
-        parameters = []
-        for begin, end in self.pixelization.envelope(dataId.region).ranges():
-            for skypix in range(begin, end):
-                parameters.append(dict(dataId, skypix=skypix))
-        self._connection.execute(self._schema.tables[join.name].insert(), parameters)
+        self._connection.execute(self._schema.tables[join.name].insert(), self._makeSkyPixJoinRows(dataId))
         return dataId
 
+    def _makeSkyPixJoinRows(self, dataId, ranges=None):
+        """Return the rows to insert into a skypix join table for a data ID.
+
+        Parameters
+        ----------
+        dataId : `DataId`
+            Data ID with a region.
+        ranges : iterable of `tuple`, optional
+            The ``(begin, end)`` ranges of the skypix envelope of the region,
+            if already computed.
+
+        Returns
+        -------
+        rows : `list` of `dict`
+            One row for each skypix that overlaps the region or, if the
+            schema uses skypix ranges, one row for each ``[skypix_begin,
+            skypix_end)`` range of them.
+        """
+        if ranges is None:
+            ranges = self.pixelization.envelope(dataId.region).ranges()
+        if self._schema.skypixRanges:
+            return [dict(dataId, skypix_begin=begin, skypix_end=end) for begin, end in ranges]
+        return [dict(dataId, skypix=skypix) for begin, end in ranges for skypix in range(begin, end)]
+
     @disableWhenLimited
     def selectMultipleDatasetTypes(self, originInfo, expression=None, required=(), optional=(),
-                                   prerequisite=(), perDatasetTypeDimensions=(), expandDataIds=True):
+                                   prerequisite=(), perDatasetTypeDimensions=(), expandDataIds=True,
+                                   columnar=False):
         # Docstring inherited from Registry.selectDimensions
         def standardize(dsType):
             if not isinstance(dsType, DatasetType):
@@ -978,41 +1773,142 @@ class SqlRegistry(Registry):
             optional=optional,
             prerequisite=prerequisite,
             perDatasetTypeDimensions=perDatasetTypeDimensions,
-            defer=self.config["deferDatasetIdQueries"]
+            defer=self.config["deferDatasetIdQueries"] and not columnar
         )
 
         if expression is not None:
             builder.whereParsedExpression(expression)
 
+        if columnar:
+            return builder.executeColumnar()
         return builder.execute(expandDataIds=expandDataIds)
 
     @disableWhenLimited
     def _queryMetadata(self, element, dataId, columns):
         # Docstring inherited from Registry._queryMetadata.
-        # TODO: Hard-coding of instrument and skymap as the dimensions to cache
-        # here is a bit ugly; should be fixed on DM-17023.
-        if element.name == "instrument":
-            result = self._cachedInstrumentEntries.get(dataId["instrument"])
-            if result is not None and frozenset(columns).issubset(result.keys()):
-                return result
-        elif element.name == "skymap":
-            result = self._cachedSkyMapEntries.get(dataId["skymap"])
-            if result is not None and frozenset(columns).issubset(result.keys()):
-                return result
-        table = self._schema.tables[element.name]
-        cols = [table.c[col] for col in columns]
-        row = self._connection.execute(
-            select(cols)
-            .where(
-                and_(table.c[name] == value for name, value in dataId.items()
-                     if name in element.links())
-            )
-        ).fetchone()
-        if row is None:
-            raise LookupError(f"{element.name} entry for {dataId} not found.")
-        result = {c.name: row[c.name] for c in cols}
-        if element.name == "instrument":
-            self._cachedInstrumentEntries.setdefault(dataId["instrument"], {}).update(result)
-        elif element.name == "skymap":
-            self._cachedSkyMapEntries.setdefault(dataId["skymap"], {}).update(result)
-        return result
+        return self._queryMetadataMany(element, [dataId], columns)[0]
+
+    @disableWhenLimited
+    def _queryMetadataMany(self, element, dataIds, columns):
+        # Docstring inherited from Registry._queryMetadataMany.
+        links = sorted(element.links())
+        entries = [self._metadataCache.get(element, dataId, columns) for dataId in dataIds]
+        # Data IDs we have to query for, keyed by their link values; this also
+        # removes duplicates.
+        missing = {}
+        for dataId, entry in zip(dataIds, entries):
+            if entry is None:
+                missing.setdefault(tuple(dataId[link] for link in links), dataId)
+        fetched = {}
+        if missing:
+            table = self._schema.tables[element.name]
+            cols = [table.c[col] for col in columns]
+            # Each key binds one parameter per link.
+            for chunk in chunked(missing.items(), max(1, self._BULK_CHUNK_SIZE // len(links))):
+                if len(links) == 1:
+                    where = table.c[links[0]].in_([key[0] for key, _ in chunk])
+                else:
+                    where = or_(*[and_(*[table.c[link] == value for link, value in zip(links, key)])
+                                  for key, _ in chunk])
+                rows = self._connection.execute(
+                    select(cols + [table.c[link] for link in links]).where(where)
+                )
+                for row in rows:
+                    key = tuple(row[link] for link in links)
+                    dataId = missing.get(key)
+                    if dataId is not None:
+                        fetched[key] = self._metadataCache.update(element, dataId,
+                                                                  {c.name: row[c.name] for c in cols})
+        results = []
+        for dataId, entry in zip(dataIds, entries):
+            if entry is None:
+                entry = fetched.get(tuple(dataId[link] for link in links))
+                if entry is None:
+                    raise LookupError(f"{element.name} entry for {dataId} not found.")
+            # Return a new dict holding just the requested columns, so
+            # callers can't modify cache entries.
+            results.append({column: entry[column] for column in columns})
+        return results
+
+    def getMetadataCacheStatistics(self):
+        """Return hit/miss statistics for the dimension metadata cache used
+        by `expandDataId`.
+
+        Returns
+        -------
+        statistics : `dict`
+            Dictionary keyed by `DimensionElement` name, with `dict` values
+            containing ``hits``, ``misses``, and ``size`` (the current number
+            of cached entries) keys.
+        """
+        return self._metadataCache.getStatistics()
+
+    def resetMetadataCacheStatistics(self):
+        """Reset the dimension metadata cache hit/miss counters to zero.
+        """
+        self._metadataCache.resetStatistics()
+
+    def _recordQueryStatistics(self, **counts):
+        """Add to the counters reported by `getQueryStatistics`.
+
+        Parameters
+        ----------
+        counts
+            Amounts to add to each named counter.
+        """
+        with self._statisticsLock:
+            self._queryStatistics.update(counts)
+
+    def getQueryStatistics(self):
+        """Return statistics accumulated by queries executed through
+        `QueryBuilder` (including `selectDimensions` and
+        `selectMultipleDatasetTypes`).
+
+        Returns
+        -------
+        statistics : `dict`
+            Dictionary of counters, including:
+
+            ``rows``
+                Total number of rows returned by the database.
+            ``rowsFilteredByRegion``
+                Number of those rows rejected because they included
+                disjoint regions.
+            ``regionCacheHits``, ``regionCacheMisses``
+                Number of regions obtained from (or added to) the decoded
+                region caches.
+
+            If the ``instrumentation.enabled`` configuration option is
+            `True`, this also has a ``statements`` key, whose value is a
+            `dict` of statistics for every SQL statement executed by the
+            registry (see `QueryInstrumentation.getStatistics`).
+        """
+        with self._statisticsLock:
+            statistics = dict(self._queryStatistics)
+        if self._instrumentation is not None:
+            statistics["statements"] = self._instrumentation.getStatistics()
+        return statistics
+
+    def getSlowQueries(self):
+        """Return the most recent statements that took longer than the
+        ``instrumentation.slowQueryThreshold`` configuration option.
+
+        Returns
+        -------
+        slowQueries : `list` of `dict`
+            Slow statements, oldest first, as dictionaries with
+            ``statement``, ``parameters``, and ``time`` (in seconds) keys.
+            Always empty unless ``instrumentation.enabled`` is `True`.
+        """
+        if self._instrumentation is None:
+            return []
+        return self._instrumentation.getSlowQueries()
+
+    def resetQueryStatistics(self):
+        """Reset all counters reported by `getQueryStatistics` to zero, and
+        clear the log returned by `getSlowQueries`.
+        """
+        with self._statisticsLock:
+            self._queryStatistics.clear()
+        if self._instrumentation is not None:
+            self._instrumentation.reset()
@@ -30,6 +30,7 @@ from sqlalchemy.sql import select, bindparam, func
 from sqlalchemy.exc import IntegrityError, StatementError
 
 from lsst.daf.butler import DatabaseDict
+from lsst.daf.butler.core.utils import chunked
 
 
 class SqlRegistryDatabaseDict(DatabaseDict):
@@ -103,6 +104,9 @@ class SqlRegistryDatabaseDict(DatabaseDict):
         self._getSql = select(valueColumns).where(keyColumn == bindparam("key"))
         self._updateSql = self._table.update().where(keyColumn == bindparam("key"))
         self._delSql = self._table.delete().where(keyColumn == bindparam("key"))
+        self._getManySql = select([keyColumn] + valueColumns).where(
+            keyColumn.in_(bindparam("keys", expanding=True)))
+        self._delManySql = self._table.delete().where(keyColumn.in_(bindparam("keys", expanding=True)))
         self._keysSql = select([keyColumn])
         self._lenSql = select([func.count(keyColumn)])
 
@@ -152,6 +156,67 @@ class SqlRegistryDatabaseDict(DatabaseDict):
             if result.rowcount == 0:
                 raise KeyError("{} not found".format(key))
 
+    def getMany(self, keys):
+        # Docstring inherited from DatabaseDict.getMany.
+        result = {}
+        with self.registry._connection.begin():
+            for chunk in chunked(keys, self.registry._BULK_CHUNK_SIZE):
+                for row in self.registry._connection.execute(self._getManySql, keys=chunk).fetchall():
+                    result[row[0]] = self._value._make(row[1:])
+        return result
+
+    def setMany(self, items):
+        # Docstring inherited from DatabaseDict.setMany.
+        rows = []
+        for key, value in items.items():
+            assert isinstance(value, self._value)
+            row = value._asdict()
+            row[self._key] = key
+            rows.append(row)
+        if not rows:
+            return
+        # Try a single bulk insert first, as we expect all keys to be new in
+        # the most common usage pattern.  Use a savepoint so a failure does
+        # not roll back any enclosing transaction.
+        try:
+            with self.registry._connection.begin_nested():
+                self.registry._connection.execute(self._table.insert(), rows)
+                return
+        except IntegrityError as e:
+            if "CHECK constraint failed" in str(e):
+                raise ValueError(f"{e}") from e
+        except StatementError as err:
+            raise TypeError("Bad data types in value: {}".format(err))
+        # Some keys already exist; fall back to inserting or updating each
+        # entry individually.
+        super().setMany(items)
+
+    def updateMany(self, items):
+        # Docstring inherited from DatabaseDict.updateMany.
+        rows = []
+        for key, value in items.items():
+            assert isinstance(value, self._value)
+            row = value._asdict()
+            row["key"] = key
+            rows.append(row)
+        if not rows:
+            return
+        with self.registry._connection.begin():
+            try:
+                self.registry._connection.execute(self._updateSql, rows)
+            except IntegrityError as e:
+                if "CHECK constraint failed" in str(e):
+                    raise ValueError(f"{e}") from e
+                raise
+            except StatementError as err:
+                raise TypeError("Bad data types in value: {}".format(err))
+
+    def deleteMany(self, keys):
+        # Docstring inherited from DatabaseDict.deleteMany.
+        with self.registry._connection.begin():
+            for chunk in chunked(keys, self.registry._BULK_CHUNK_SIZE):
+                self.registry._connection.execute(self._delManySql, keys=chunk)
+
     def __iter__(self):
         with self.registry._connection.begin():
             for row in self.registry._connection.execute(self._keysSql).fetchall():
@@ -25,7 +25,8 @@ from contextlib import closing
 
 from sqlalchemy import event
 from sqlalchemy import create_engine
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, QueuePool
+from sqlalchemy.sql import select, func
 
 from sqlite3 import Connection as SQLite3Connection
 
@@ -107,8 +108,29 @@ class SqliteRegistry(SqlRegistry):
         super().__init__(registryConfig, schemaConfig, dimensionConfig, create, butlerRoot=butlerRoot)
 
     def _createEngine(self):
-        engine = create_engine(self.config["db"], poolclass=NullPool,
-                               connect_args={"check_same_thread": False})
+        if self.threadSafe:
+            # Each connection to an in-memory database is a new, empty
+            # database, so those cannot be shared via per-thread connections.
+            if ":memory:" in self.config["db"]:
+                raise ValueError("Thread-safe mode is not supported for in-memory SQLite databases.")
+            engine = create_engine(self.config["db"], poolclass=QueuePool, **self._getPoolOptions(),
+                                   connect_args={"check_same_thread": False})
+        else:
+            engine = create_engine(self.config["db"], poolclass=NullPool,
+                                   connect_args={"check_same_thread": False})
         event.listen(engine, "connect", _onSqlite3Connect)
         event.listen(engine, "begin", _onSqlite3Begin)
         return engine
+
+    def _reserveExecutionIds(self, count):
+        # Docstring inherited from SqlRegistry._reserveExecutionIds.
+        # Our transactions begin with BEGIN IMMEDIATE, which holds the
+        # database write lock until commit, so no other connection can insert
+        # Executions with these IDs first.  This is also how SQLite assigns
+        # INTEGER PRIMARY KEY values itself.
+        if not self._connection.in_transaction():
+            return None
+        executionTable = self._schema.tables["execution"]
+        maxId = self._connection.execute(select([func.max(executionTable.c.execution_id)])).scalar()
+        start = (maxId or 0) + 1
+        return list(range(start, start + count))
@@ -19,15 +19,17 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-__all__ = ("MultipleDatasetQueryBuilder", "MultipleDatasetQueryRow", "DatasetNecessityEnum")
+__all__ = ("MultipleDatasetQueryBuilder", "MultipleDatasetQueryRow", "MultipleDatasetQueryColumns",
+           "DatasetNecessityEnum")
 
 import itertools
 import logging
 from abc import ABCMeta, abstractmethod
 from enum import Enum, auto
-from sqlalchemy.sql import and_
+import numpy as np
+from sqlalchemy.sql import and_, or_, bindparam
 
-from ..core import DimensionSet, DatasetRef
+from ..core import DimensionSet, DatasetRef, DataId
 from .queryBuilder import QueryBuilder
 from .singleDatasetQueryBuilder import SingleDatasetQueryBuilder
 
@@ -86,6 +88,190 @@ class MultipleDatasetQueryRow:
             self.dataId, ', '.join(str(ref) for ref in self.datasetRefs.values()))
 
 
+class MultipleDatasetQueryColumns:
+    r"""A chunk of `MultipleDatasetQueryBuilder` results in columnar form.
+
+    Instances hold the dimension link values and dataset IDs of many result
+    rows in a single NumPy structured array, and construct `DataId`,
+    `DatasetRef`, and `MultipleDatasetQueryRow` objects only on request.
+
+    Parameters
+    ----------
+    registry : `SqlRegistry`
+        Registry instance the query was run against.
+    array : `numpy.ndarray`
+        Structured array, as returned by
+        `ResultColumnsManager.makeStructuredArray`.
+    datasetTypes : iterable of `DatasetType`
+        The dataset types the query searched for.
+    """
+
+    __slots__ = ("_registry", "_array", "_datasetTypes")
+
+    def __init__(self, registry, array, datasetTypes):
+        self._registry = registry
+        self._array = array
+        self._datasetTypes = {datasetType.name: datasetType for datasetType in datasetTypes}
+
+    def __len__(self):
+        return len(self._array)
+
+    @property
+    def array(self):
+        """Structured array of link values and dataset IDs
+        (`numpy.ndarray`).
+
+        Field names are dimension link names for common dimensions,
+        ``"<DatasetType name>.<link>"`` for per-DatasetType dimensions, and
+        ``"<DatasetType name>.dataset_id"`` for dataset IDs (which are ``-1``
+        where no dataset was found).
+        """
+        return self._array
+
+    @property
+    def datasetTypes(self):
+        """The dataset types the query searched for (`~collections.abc.Set`
+        of `DatasetType`).
+        """
+        return frozenset(self._datasetTypes.values())
+
+    def getLinks(self, link, datasetType=None):
+        """Return the values of a dimension link for all rows.
+
+        Parameters
+        ----------
+        link : `str`
+            Name of the link.
+        datasetType : `DatasetType` or `str`, optional
+            If not `None`, return the per-DatasetType value of the link for
+            this `DatasetType`, if there is one.
+
+        Returns
+        -------
+        values : `numpy.ndarray`
+            Link values, one for each row.
+        """
+        if datasetType is not None:
+            name = f"{getattr(datasetType, 'name', datasetType)}.{link}"
+            if name in self._array.dtype.names:
+                return self._array[name]
+        return self._array[link]
+
+    def getDatasetIds(self, datasetType):
+        """Return the dataset IDs for a `DatasetType` for all rows.
+
+        Parameters
+        ----------
+        datasetType : `DatasetType` or `str`
+            Dataset type (or name thereof).
+
+        Returns
+        -------
+        ids : `numpy.ndarray`
+            Integer dataset IDs, with ``-1`` for rows where no dataset was
+            found.
+        """
+        return self._array[f"{getattr(datasetType, 'name', datasetType)}.dataset_id"]
+
+    def _getLinkValues(self, index, datasetType=None):
+        record = self._array[index]
+        result = {}
+        prefix = f"{datasetType.name}." if datasetType is not None else None
+        for name in self._array.dtype.names:
+            if "." not in name:
+                link = name
+            elif prefix is not None and name.startswith(prefix) and name != prefix + "dataset_id":
+                link = name[len(prefix):]
+            else:
+                continue
+            value = record[name]
+            result[link] = value.item() if isinstance(value, np.generic) else value
+        return result
+
+    def makeDataId(self, index, datasetType=None, expandDataId=False):
+        """Construct a `DataId` for a single row.
+
+        Parameters
+        ----------
+        index : `int`
+            Index of the row.
+        datasetType : `DatasetType`, optional
+            If provided, the `DatasetType` this data ID will describe, as in
+            `ResultColumnsManager.ManagedRow.makeDataId`.
+        expandDataId : `bool`
+            If `True`, query the `Registry` to further expand the data ID
+            to include additional information.
+
+        Returns
+        -------
+        dataId : `DataId`
+            A new `DataId` instance.  Regions are not included unless
+            ``expandDataId`` is `True`.
+        """
+        links = self._getLinkValues(index, datasetType)
+        if datasetType is None:
+            dataId = DataId(links, universe=self._registry.dimensions)
+        else:
+            dataId = DataId(links, dimensions=datasetType.dimensions)
+        if expandDataId:
+            self._registry.expandDataId(dataId, region=True)
+        return dataId
+
+    def makeDatasetRef(self, index, datasetType, expandDataId=False):
+        """Construct a `DatasetRef` for a single row.
+
+        Parameters
+        ----------
+        index : `int`
+            Index of the row.
+        datasetType : `DatasetType` or `str`
+            The `DatasetType` (or name thereof) the returned `DatasetRef`
+            will identify.
+        expandDataId : `bool`
+            If `True`, query the `Registry` to further expand the data ID
+            to include additional information.
+
+        Returns
+        -------
+        ref : `DatasetRef`
+            New `DatasetRef` instance, with ``id`` `None` if no dataset was
+            found.
+        """
+        datasetType = self._datasetTypes[getattr(datasetType, "name", datasetType)]
+        dataId = self.makeDataId(index, datasetType=datasetType, expandDataId=expandDataId)
+        datasetId = int(self.getDatasetIds(datasetType)[index])
+        if datasetId < 0:
+            return DatasetRef(datasetType, dataId)
+        return self._registry.getDataset(id=datasetId, dataId=dataId, datasetType=datasetType)
+
+    def makeRow(self, index, expandDataIds=False):
+        r"""Construct a `MultipleDatasetQueryRow` for a single row.
+
+        Parameters
+        ----------
+        index : `int`
+            Index of the row.
+        expandDataIds : `bool`
+            If `True`, query the `Registry` to further expand the data IDs
+            of the `DatasetRef`\ s to include additional information.
+
+        Returns
+        -------
+        row : `MultipleDatasetQueryRow`
+            Object containing the `DataId`\ s and `DatasetRef`\ s for the
+            row.
+        """
+        return MultipleDatasetQueryRow(
+            self.makeDataId(index),
+            {datasetType: self.makeDatasetRef(index, datasetType, expandDataId=expandDataIds)
+             for datasetType in self._datasetTypes.values()}
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.makeRow(index)
+
+
 class DatasetNecessityEnum(Enum):
     """Enum for describing different kinds of dataset subqueries in a
     `MultipleDatasetQueryBuilder.`
@@ -223,17 +409,81 @@ class _DeferredQueryData(_SubqueryData):
         super().__init__(necessity=necessity, links=links)
         self.builder = builder
         self.perDatasetTypeLinks = perDatasetTypeLinks
+        self._prefetched = {}
+        self._findWhereSql = None
 
-    __slots__ = ("builder", "perDatasetTypeLinks")
+    __slots__ = ("builder", "perDatasetTypeLinks", "_prefetched", "_findWhereSql")
+
+    def prefetch(self, managedRows, resultColumns, *, expandDataIds=True):
+        """Run the deferred query for all of the given rows of the parent
+        query at once.
+
+        The results are held until `makeDatasetRef` is called for those rows
+        (via `getDatasetRef`), which will then not need to query the
+        database.
+
+        Parameters
+        ----------
+        managedRows : `list` of `ResultColumnsManager.ManagedRow`
+            Rows of the parent query.
+        resultColumns : `ResultColumnsManager`
+            Manager for the columns of the parent query, used to expand data
+            IDs.
+        expandDataIds : `bool`
+            If `True`, query the `Registry` to further expand the data IDs of
+            the datasets found to include additional information.
+        """
+        links = list(self.links)
+        keys = {tuple(managed.dimensionLinks[link] for link in links) for managed in managedRows}
+        keys.difference_update(self._cache.keys())
+        keys.difference_update(self._prefetched.keys())
+        if not keys:
+            return
+        columns = [self.builder.findSelectableForLink(link).columns[link] for link in links]
+        # Each key binds one parameter per link.
+        chunkSize = max(1, self.builder.registry._BULK_CHUNK_SIZE // len(links))
+        keys = list(keys)
+        for start in range(0, len(keys), chunkSize):
+            chunk = keys[start:start + chunkSize]
+            if len(links) == 1:
+                whereSql = columns[0].in_([key[0] for key in chunk])
+            else:
+                whereSql = or_(*[and_(*[column == value for column, value in zip(columns, key)])
+                                 for key in chunk])
+            query = self.builder.build(whereSql=whereSql)
+            for rows in self.builder.registry._executeInChunks(query):
+                for row in rows:
+                    managed = self.builder.resultColumns.manageRow(row)
+                    if managed.areRegionsDisjoint():
+                        continue
+                    key = tuple(managed.dimensionLinks[link] for link in links)
+                    if self._prefetched.get(key) is not None:
+                        # Like executeOne, just use the first match.
+                        continue
+                    ref = self.builder.convertResultRow(managed, expandDataId=False)
+                    if expandDataIds:
+                        resultColumns.expandDataId(ref.dataId)
+                    self._prefetched[key] = ref
+            for key in chunk:
+                self._prefetched.setdefault(key, None)
 
     def makeDatasetRef(self, datasetType, dataId, managed, *, expandDataIds=True):
         # Docstring inherited from `_SubqueryData.makeDatasetRef`.
-        expr = []
-        for link in self.links:
-            selectable = self.builder.findSelectableForLink(link)
-            column = selectable.columns[link]
-            expr.append(column == dataId[link])
-        ref = self.builder.executeOne(whereSql=and_(*expr))
+        key = tuple(dataId[link] for link in self.links)
+        if key in self._prefetched:
+            ref = self._prefetched.pop(key)
+        else:
+            if self._findWhereSql is None:
+                # Built once, so the builder can reuse the same query.
+                self._findWhereSql = and_(*[self.builder.findSelectableForLink(link).columns[link] ==
+                                            bindparam(f"link_{link}") for link in self.links])
+            ref = self.builder.executeOne(whereSql=self._findWhereSql,
+                                          params={f"link_{link}": dataId[link] for link in self.links},
+                                          expandDataId=False)
+            if ref is not None and expandDataIds:
+                # Let the parent query expand this along with its other data
+                # IDs.
+                managed.expandDataId(ref.dataId)
         if ref is None:
             if self.necessity is DatasetNecessityEnum.PREREQUISITE:
                 raise LookupError(f"Deferred search failed for prerequisite dataset "
@@ -469,6 +719,66 @@ class MultipleDatasetQueryBuilder(QueryBuilder):
                     break
         return result
 
+    def executeColumnar(self, whereSql=None, *, chunkSize=None):
+        """Build and execute the query, iterating over chunks of results in
+        columnar form.
+
+        Parameters
+        ----------
+        whereSql
+            An additional SQLAlchemy boolean column expression to include
+            in the query.  Unlike the `whereSqlExpression` method, this
+            does not modify the builder itself.
+        chunkSize : `int`, optional
+            Maximum number of result rows in each chunk.  Defaults to the
+            ``fetchChunkSize`` registry configuration option.
+
+        Yields
+        ------
+        columns : `MultipleDatasetQueryColumns`
+            Link values and dataset IDs for a (non-empty) chunk of rows.
+
+        Raises
+        ------
+        ValueError
+            Raised if any dataset searches were deferred; in columnar mode all
+            dataset IDs must be included in the main query.
+        LookupError
+            Raised (during iteration) if a prerequisite dataset is not found.
+
+        Notes
+        -----
+        As in `execute`, rows that include disjoint regions are filtered out.
+        """
+        if self._deferrals:
+            raise ValueError("Columnar results do not support deferred dataset searches.")
+        query = self.build(whereSql=whereSql)
+        for rows in self.registry._executeInChunks(query, chunkSize=chunkSize):
+            total = len(rows)
+            if self.resultColumns.hasRegions:
+                rows = [row for row in rows if not self.resultColumns.manageRow(row).areRegionsDisjoint()]
+            self.registry._recordQueryStatistics(rows=total, rowsFilteredByRegion=total - len(rows),
+                                                 **self.resultColumns.popStatistics())
+            if not rows:
+                continue
+            columns = MultipleDatasetQueryColumns(self.registry, self.resultColumns.makeStructuredArray(rows),
+                                                  self._subqueries.keys())
+            for datasetType, data in self._subqueries.items():
+                if data.necessity is DatasetNecessityEnum.PREREQUISITE:
+                    missing = np.flatnonzero(columns.getDatasetIds(datasetType) < 0)
+                    if len(missing):
+                        raise LookupError(f"Search failed for prerequisite dataset {datasetType.name} "
+                                          f"associated with data ID {columns.makeDataId(missing[0])}.")
+            yield columns
+
+    def prepareResultRows(self, managedRows, *, expandDataIds=True):
+        # Docstring inherited from QueryBuilder.prepareResultRows.
+        # Resolve deferred dataset searches for the full chunk of rows with
+        # one query per DatasetType (per chunk of IN parameters), instead of
+        # one query per row.
+        for data in self._deferrals.values():
+            data.prefetch(managedRows, self.resultColumns, expandDataIds=expandDataIds)
+
     def convertResultRow(self, managed, *, expandDataIds=True):
         r"""Convert a result row for this query to a `MultipleDatasetQueryRow`.
 
@@ -89,7 +89,9 @@ class _ClauseVisitor(TreeVisitor):
             column = table
             selectable = self.queryBuilder.findSelectableForLink(column)
             if selectable is None:
-                raise ValueError(f"No table or clause providing link '{column}' in this query.")
+                raise self.queryBuilder._makeMissingLinkError(
+                    f"No table or clause providing link '{column}' in this query.", column
+                )
         try:
             return selectable.columns[column]
         except KeyError as err:
@@ -145,13 +147,19 @@ class QueryBuilder(ABC):
         Expression to use as the initial WHERE clause.
     """
 
+    MAX_BUILT_QUERIES = 16
+    """Maximum number of queries remembered by `build` for reuse.
+    """
+
     def __init__(self, registry, *, fromClause=None, whereClause=None):
         self.registry = registry
         self._resultColumns = ResultColumnsManager(self.registry)
         self._fromClause = fromClause
         self._whereClause = whereClause
         self._selectablesForDimensionElements = {}
+        self._skyPixRangeSelectables = []
         self._elementsCache = None
+        self._builtQueries = {}  # see build
 
     @classmethod
     def fromDimensions(cls, registry, dimensions, addResultColumns=True):
@@ -224,15 +232,38 @@ class QueryBuilder(ABC):
         isOuter : `bool`
             If `True`, perform a LEFT OUTER JOIN instead of a regular (INNER)
             JOIN.
+
+        Notes
+        -----
+        If the registry schema stores skypix join tables as ranges (see the
+        ``skypix.ranges`` registry configuration option), a selectable with
+        a "skypix" link but ``skypix_begin`` and ``skypix_end`` columns
+        instead of a ``skypix`` column is joined to other selectables'
+        ``skypix`` columns by range containment.  Two range selectables are
+        not joined to each other directly; the spatial join views relate
+        them by range overlap.
         """
+        isRange = "skypix" in links and "skypix" not in selectable.columns
         if self.fromClause is None:
             self._fromClause = selectable
+            if isRange:
+                self._skyPixRangeSelectables.append(selectable)
             return
         joinOn = []
         for link in links:
+            if isRange and link == "skypix":
+                pixels = self.findSelectableForLink(link)
+                if pixels is not None:
+                    joinOn.append(self._makeSkyPixRangeCondition(selectable, pixels))
+                continue
             selectableAlreadyIncluded = self.findSelectableForLink(link)
             if selectableAlreadyIncluded is not None:
                 joinOn.append(selectableAlreadyIncluded.columns[link] == selectable.columns[link])
+            elif link == "skypix":
+                joinOn.extend(self._makeSkyPixRangeCondition(ranges, selectable)
+                              for ranges in self._skyPixRangeSelectables)
+        if isRange:
+            self._skyPixRangeSelectables.append(selectable)
         if joinOn:
             self._fromClause = self.fromClause.join(selectable, and_(*joinOn), isouter=isOuter)
         else:
@@ -244,6 +275,14 @@ class QueryBuilder(ABC):
             self._fromClause = self.fromClause.join(selectable, literal(True) == literal(True),
                                                     isouter=isOuter)
 
+    @staticmethod
+    def _makeSkyPixRangeCondition(ranges, pixels):
+        """Return an expression that is true when the skypix value in one
+        selectable is in the ``[skypix_begin, skypix_end)`` range of another.
+        """
+        return and_(ranges.columns.skypix_begin <= pixels.columns.skypix,
+                    pixels.columns.skypix < ranges.columns.skypix_end)
+
     def whereSqlExpression(self, sqlExpression, op=and_):
         """Add a SQL expression to the query's WHERE clause.
 
@@ -290,9 +329,35 @@ class QueryBuilder(ABC):
         """
         selectable = self.findSelectableForLink(link)
         if selectable is None:
-            raise ValueError(f"No table involving link {link} in query.")
+            raise self._makeMissingLinkError(f"No table involving link {link} in query.", link)
         self.resultColumns.addDimensionLink(selectable, link)
 
+    def _makeMissingLinkError(self, message, link):
+        """Return the exception to raise when no selectable in the query
+        provides a dimension link.
+
+        Parameters
+        ----------
+        message : `str`
+            Description of the problem.
+        link : `str`
+            Dimension link name (i.e. data ID key) that was not found.
+
+        Returns
+        -------
+        error : `ValueError`
+            Exception with ``message``, extended to explain the
+            ``skypix.ranges`` registry configuration option if ``link`` is
+            "skypix" and only range-encoded skypix join tables are in the
+            query.
+        """
+        if link == "skypix" and self._skyPixRangeSelectables:
+            message += (" Skypix join tables hold ranges of skypix values rather than individual values"
+                        " when the skypix.ranges registry configuration option is set, so queries for"
+                        " skypix values must obtain them from another table (e.g. a dataset's"
+                        " dimensions).")
+        return ValueError(message)
+
     def build(self, whereSql=None):
         """Return the full SELECT query.
 
@@ -309,7 +374,22 @@ class QueryBuilder(ABC):
             Completed query that combines the FROM clause represented by
             `fromClause`, the WHERE clause represented by `whereClause`,
             and the SELECT clause managed by `resultColumns`.
+
+        Notes
+        -----
+        Repeated calls with the same ``whereSql`` object (or `None`) return
+        the same query object as long as the builder has not been modified
+        in between, which lets the registry reuse its compiled form.
+        ``whereSql`` may contain `sqlalchemy.sql.bindparam` placeholders,
+        whose values can be passed to `executeOne`.
         """
+        clauses = (self._fromClause, self._whereClause, whereSql)
+        nColumns = len(self.resultColumns)
+        cached = self._builtQueries.get(id(whereSql))
+        if cached is not None:
+            cachedClauses, cachedNColumns, query = cached
+            if cachedNColumns == nColumns and all(a is b for a, b in zip(cachedClauses, clauses)):
+                return query
         query = self.resultColumns.selectFrom(self.fromClause)
         if self._whereClause is not None:
             query = query.where(self._whereClause)
@@ -324,9 +404,12 @@ class QueryBuilder(ABC):
                 # list as if it were a string.
                 compiled = str(query)
             _LOG.debug("building query: %s", compiled)
+        if len(self._builtQueries) >= self.MAX_BUILT_QUERIES:
+            self._builtQueries.clear()
+        self._builtQueries[id(whereSql)] = (clauses, nColumns, query)
         return query
 
-    def execute(self, whereSql=None, **kwds):
+    def execute(self, whereSql=None, *, chunkSize=None, **kwds):
         """Build and execute the query, iterating over result rows.
 
         Parameters
@@ -335,6 +418,9 @@ class QueryBuilder(ABC):
             An additional SQLAlchemy boolean column expression to include
             in the query.  Unlike the `whereSqlExpression` method, this
             does not modify the builder itself.
+        chunkSize : `int`, optional
+            Number of result rows to fetch and convert at a time.  Defaults
+            to the ``fetchChunkSize`` registry configuration option.
         kwds
             Additional keyword arguments forwarded to `convertResultRow`.
 
@@ -346,22 +432,33 @@ class QueryBuilder(ABC):
         Notes
         -----
         Query rows that include disjoint regions are automatically filtered
-        out.
+        out; the number of rows filtered is recorded in
+        `SqlRegistry.getQueryStatistics`.
+
+        Rows are fetched and converted in chunks, with the data IDs for all
+        rows in a chunk expanded together; results are streamed (see
+        `SqlRegistry._executeInChunks`), so memory use is bounded by the
+        chunk size rather than the size of the full result set.
         """
         query = self.build(whereSql=whereSql)
-        results = self.registry._connection.execute(query)
         total = 0
         count = 0
-        for row in results:
-            total += 1
-            managed = self.resultColumns.manageRow(row=row)
-            if managed.areRegionsDisjoint():
-                continue
-            count += 1
-            yield self.convertResultRow(managed, **kwds)
+        for rows in self.registry._executeInChunks(query, chunkSize=chunkSize):
+            total += len(rows)
+            managedRows = [managed for managed in map(self.resultColumns.manageRow, rows)
+                           if not managed.areRegionsDisjoint()]
+            count += len(managedRows)
+            self.registry._recordQueryStatistics(rows=len(rows),
+                                                 rowsFilteredByRegion=len(rows) - len(managedRows),
+                                                 **self.resultColumns.popStatistics())
+            # Data IDs are expanded for a full chunk of rows at once.
+            with self.resultColumns.deferDataIdExpansion():
+                self.prepareResultRows(managedRows, **kwds)
+                converted = [self.convertResultRow(managed, **kwds) for managed in managedRows]
+            yield from converted
         _LOG.debug("Total %d rows in result set, %d after region filtering", total, count)
 
-    def executeOne(self, whereSql=None, **kwds):
+    def executeOne(self, whereSql=None, *, params=None, **kwds):
         """Build and execute the query, returning a single result row.
 
         Parameters
@@ -370,6 +467,11 @@ class QueryBuilder(ABC):
             An additional SQLAlchemy boolean column expression to include
             in the query.  Unlike the `whereSqlExpression` method, this
             does not modify the builder itself.
+        params : `dict`, optional
+            Values for any `sqlalchemy.sql.bindparam` placeholders in
+            ``whereSql``.  Passing the same ``whereSql`` object with different
+            ``params`` avoids building and compiling a new query for each
+            call.
         kwds
             Additional keyword arguments forwarded to `convertResultRow`.
 
@@ -385,13 +487,19 @@ class QueryBuilder(ABC):
         in `None` being returned.
         """
         query = self.build(whereSql=whereSql)
-        results = self.registry._connection.execute(query)
-        for row in results:
-            managed = self.resultColumns.manageRow(row)
-            if managed is None or managed.areRegionsDisjoint():
-                continue
-            return self.convertResultRow(managed, **kwds)
-        return None
+        results = self.registry._executeCompiled(query, **(params or {}))
+        try:
+            for row in results:
+                managed = self.resultColumns.manageRow(row)
+                if managed is None or managed.areRegionsDisjoint():
+                    self.registry._recordQueryStatistics(rows=1, rowsFilteredByRegion=1)
+                    continue
+                self.registry._recordQueryStatistics(rows=1)
+                return self.convertResultRow(managed, **kwds)
+            return None
+        finally:
+            results.close()
+            self.registry._recordQueryStatistics(**self.resultColumns.popStatistics())
 
     def getIncludedDimensionElements(self):
         """Return the set of all `DimensionElement` objects explicitly
@@ -494,7 +602,8 @@ class QueryBuilder(ABC):
         """
         for element in self.registry.dimensions.withLink(link):
             selectable = self._selectablesForDimensionElements.get(element)
-            if selectable is not None:
+            # Range-encoded skypix join tables have no skypix column.
+            if selectable is not None and link in selectable.columns:
                 return selectable
         return None
 
@@ -516,6 +625,25 @@ class QueryBuilder(ABC):
             return None
         return self._selectablesForDimensionElements[element]
 
+    def prepareResultRows(self, managedRows, **kwds):
+        """Prepare to convert a chunk of query result rows.
+
+        This method is a customization point for `execute` that is called
+        with each chunk of rows before `convertResultRow` is called on them,
+        allowing subclasses to perform any follow-up queries they need for
+        all rows in the chunk at once.  The default implementation does
+        nothing.
+
+        Parameters
+        ----------
+        managedRows : `list` of `ResultColumnsManager.ManagedRow`
+            Intermediate row objects that will be converted.
+        kwds :
+            Additional keyword arguments defined by subclasses (the same ones
+            that will be passed to `convertResultRow`).
+        """
+        pass
+
     @abstractmethod
     def convertResultRow(self, managed, **kwds):
         """Convert a query result row to the type appropriate for this
@@ -21,14 +21,18 @@
 
 __all__ = ("ResultColumnsManager",)
 
+import contextlib
 import logging
 import itertools
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
-from sqlalchemy.sql import select
+import numpy as np
+from sqlalchemy import LargeBinary
+from sqlalchemy.sql import select, type_coerce
 
 from lsst.sphgeom import DISJOINT
 from .. import DatasetRef, DataId
+from ..core.schema import Base64Region
 
 
 _LOG = logging.getLogger(__name__)
@@ -43,6 +47,11 @@ class ResultColumnsManager:
         Registry instance the query is being run against.
     """
 
+    REGION_CACHE_SIZE = 10000
+    """Maximum number of decoded regions (with their bounding circles) cached
+    by each manager.
+    """
+
     def __init__(self, registry):
         self.registry = registry
         self._columns = []
@@ -51,6 +60,11 @@ class ResultColumnsManager:
         self._indicesForRegions = {}
         self._indicesForDatasetIds = {}
         self._needSkyPixRegion = False
+        self._deferredDataIds = None
+        self._regionDecoders = {}   # column types that decode still-encoded regions, keyed by holder
+        self._regionKeyIndices = {}   # indices of holder links used as region cache keys
+        self._regionCache = OrderedDict()
+        self._statistics = {"regionCacheHits": 0, "regionCacheMisses": 0}
 
     def logState(self):
         """Log the state of ``self`` at debug level.
@@ -116,6 +130,11 @@ class ResultColumnsManager:
             return
         else:
             column = selectable.columns.region
+            if isinstance(column.type, Base64Region):
+                # Select the still-encoded value, so each distinct region only
+                # needs to be decoded once (see `getRegion`).
+                self._regionDecoders[holder] = column.type
+                column = type_coerce(column, LargeBinary)
             self._indicesForRegions[holder] = len(self._columns)
             self._columns.append(column)
 
@@ -137,6 +156,9 @@ class ResultColumnsManager:
         self._indicesForDatasetIds[datasetType] = len(self._columns)
         self._columns.append(column)
 
+    def __len__(self):
+        return len(self._columns)
+
     def selectFrom(self, fromClause):
         """Return a select query that extracts the managed columns from the
         given from clause.
@@ -156,6 +178,153 @@ class ResultColumnsManager:
             raise RuntimeError("skypix region added to query without associated link.")
         return select(self._columns).select_from(fromClause)
 
+    @contextlib.contextmanager
+    def deferDataIdExpansion(self):
+        """Return a context manager within which data ID expansion requested
+        by `ManagedRow` objects is deferred until exit, when all of those data
+        IDs are expanded together via `Registry.expandDataIds`.
+
+        `DataId` objects are expanded in-place, so objects that hold them
+        (e.g. `DatasetRef` instances) constructed within the block will see
+        the expanded values after it exits.  Nested calls have no effect.
+        """
+        if self._deferredDataIds is not None:
+            yield
+            return
+        self._deferredDataIds = []
+        try:
+            yield
+            if self._deferredDataIds:
+                self.registry.expandDataIds(self._deferredDataIds)
+        finally:
+            self._deferredDataIds = None
+
+    def expandDataId(self, dataId):
+        """Expand a data ID via the `Registry`, or schedule it to be expanded
+        when the innermost `deferDataIdExpansion` block exits.
+
+        Parameters
+        ----------
+        dataId : `DataId`
+            Data ID to expand in-place.
+        """
+        if self._deferredDataIds is None:
+            self.registry.expandDataId(dataId)
+        else:
+            self._deferredDataIds.append(dataId)
+
+    @property
+    def hasRegions(self):
+        """Whether any regions are included in the result rows (`bool`).
+
+        If `False`, `ManagedRow.areRegionsDisjoint` is always `False`, and
+        hence need not be called.
+        """
+        return bool(self._indicesForRegions) or "skypix" in self._indicesForDimensionLinks
+
+    def makeStructuredArray(self, rows):
+        """Convert raw result rows to a NumPy structured array holding their
+        dimension link values and dataset IDs.
+
+        Parameters
+        ----------
+        rows : sequence of `sqlalchemy.engine.RowProxy`
+            Direct SQLAlchemy row result objects.
+
+        Returns
+        -------
+        array : `numpy.ndarray`
+            Structured array with one element for each row.  Fields are
+            named after the dimension links for common dimension links,
+            ``"<DatasetType name>.<link>"`` for per-DatasetType dimension
+            links, and ``"<DatasetType name>.dataset_id"`` for dataset IDs.
+            Dataset ID fields have an integer dtype, with NULL IDs replaced by
+            ``-1``; the dtypes of other fields are inferred from their values.
+        """
+        fields = [(link, index) for link, index in self._indicesForDimensionLinks.items()]
+        for datasetType, indices in self._indicesForPerDatasetTypeDimensionLinks.items():
+            fields.extend((f"{datasetType.name}.{link}", index) for link, index in indices.items())
+        columns = [np.array([row[index] for row in rows]) for _, index in fields]
+        for datasetType, index in self._indicesForDatasetIds.items():
+            fields.append((f"{datasetType.name}.dataset_id", index))
+            columns.append(np.array([-1 if row[index] is None else row[index] for row in rows],
+                                    dtype=np.int64))
+        names = [name for name, _ in fields]
+        array = np.empty(len(rows), dtype=[(name, column.dtype) for name, column in zip(names, columns)])
+        for name, column in zip(names, columns):
+            array[name] = column
+        return array
+
+    def getRegion(self, holder, row):
+        """Return the (cached) region for a `DimensionElement` in a result
+        row, along with its bounding circle.
+
+        Decoded regions are cached by the link values that identify them (or
+        by their encoded value, if those links are not in the result
+        columns), as the same regions typically appear in many rows.
+
+        Parameters
+        ----------
+        holder : `DimensionElement`
+            Element the region is associated with.  Must either have been
+            passed to `addRegion` or be the "skypix" dimension.
+        row : `sqlalchemy.engine.RowProxy`
+            Direct SQLAlchemy row result object.
+
+        Returns
+        -------
+        region : `lsst.sphgeom.Region`
+            The region, or `None` if it is NULL in this row.
+        boundingCircle : `lsst.sphgeom.Circle`
+            The bounding circle of the region, or `None` if it is NULL.
+        """
+        if holder.name == "skypix":
+            value = row[self._indicesForDimensionLinks["skypix"]]
+            key = (holder.name, value)
+        else:
+            value = row[self._indicesForRegions[holder]]
+            if value is None:
+                return None, None
+            keyIndices = self._regionKeyIndices.get(holder)
+            if keyIndices is None:
+                keyIndices = [self._indicesForDimensionLinks.get(link) for link in sorted(holder.links())]
+                if None in keyIndices:
+                    keyIndices = ()
+                self._regionKeyIndices[holder] = keyIndices
+            if keyIndices:
+                key = (holder.name, tuple(row[index] for index in keyIndices))
+            else:
+                key = (holder.name, value)
+        entry = self._regionCache.get(key)
+        if entry is not None:
+            self._regionCache.move_to_end(key)
+            self._statistics["regionCacheHits"] += 1
+            return entry
+        self._statistics["regionCacheMisses"] += 1
+        if holder.name == "skypix":
+            region = self.registry.pixelization.pixel(value)
+        else:
+            decoder = self._regionDecoders.get(holder)
+            region = decoder.process_result_value(value, None) if decoder is not None else value
+        entry = (region, region.getBoundingCircle())
+        self._regionCache[key] = entry
+        if len(self._regionCache) > self.REGION_CACHE_SIZE:
+            self._regionCache.popitem(last=False)
+        return entry
+
+    def popStatistics(self):
+        """Return and reset the region cache statistics for this manager.
+
+        Returns
+        -------
+        statistics : `dict`
+            Dictionary with ``regionCacheHits`` and ``regionCacheMisses``
+            keys.
+        """
+        statistics = self._statistics
+        self._statistics = dict.fromkeys(statistics.keys(), 0)
+        return statistics
+
     def manageRow(self, row):
         """Return an object that manages raw query result row.
 
@@ -187,11 +356,12 @@ class ResultColumnsManager:
             Direct SQLAlchemy row result object.
         """
 
-        __slots__ = ("registry", "_dimensionLinks", "_perDatasetTypeDimensionLinks", "_regions",
-                     "_datasetIds")
+        __slots__ = ("registry", "_manager", "_dimensionLinks", "_perDatasetTypeDimensionLinks",
+                     "_regions", "_datasetIds")
 
         def __init__(self, manager, row):
             self.registry = manager.registry
+            self._manager = manager
             self._dimensionLinks = {
                 link: row[index] for link, index in manager._indicesForDimensionLinks.items()
             }
@@ -199,15 +369,23 @@ class ResultColumnsManager:
                 datasetType: {link: row[index] for link, index in indices.items()}
                 for datasetType, indices in manager._indicesForPerDatasetTypeDimensionLinks.items()
             }
+            # Values are (region, bounding circle) tuples.
             self._regions = {
-                holder: row[index] for holder, index in manager._indicesForRegions.items()
+                holder: manager.getRegion(holder, row) for holder in manager._indicesForRegions
             }
             self._datasetIds = {
                 datasetType: row[index] for datasetType, index in manager._indicesForDatasetIds.items()
             }
-            skypix = self._dimensionLinks.get("skypix", None)
-            if skypix is not None:
-                self._regions[self.registry.dimensions["skypix"]] = self.registry.pixelization.pixel(skypix)
+            if self._dimensionLinks.get("skypix", None) is not None:
+                skypix = self.registry.dimensions["skypix"]
+                self._regions[skypix] = manager.getRegion(skypix, row)
+
+        @property
+        def dimensionLinks(self):
+            """Values of the common (non-per-DatasetType) dimension links in
+            this row, keyed by link name (`dict`).
+            """
+            return self._dimensionLinks
 
         def areRegionsDisjoint(self):
             """Test whether the regions in this result row are disjoint.
@@ -218,8 +396,10 @@ class ResultColumnsManager:
                 `True` if any region in the result row is disjoint with any
                 other region in the result row.
             """
-            for reg1, reg2 in itertools.combinations(self._regions.values(), 2):
-                if reg1.relate(reg2) == DISJOINT:
+            entries = [entry for entry in self._regions.values() if entry[0] is not None]
+            for (reg1, circle1), (reg2, circle2) in itertools.combinations(entries, 2):
+                # Disjoint bounding circles are a cheap sufficient condition.
+                if circle1.isDisjointFrom(circle2) or reg1.relate(reg2) == DISJOINT:
                     return True
             return False
 
@@ -236,7 +416,8 @@ class ResultColumnsManager:
                 cover all common dimensions in the graph.
             expandDataId : `bool`
                 If `True` (default), query the `Registry` to further expand
-                the data ID to include additional information.
+                the data ID to include additional information (possibly
+                deferred; see `ResultColumnsManager.deferDataIdExpansion`).
             kwds
                 Additional keyword arguments passed to the `DataId`
                 constructor.
@@ -255,11 +436,22 @@ class ResultColumnsManager:
             if result.region is None:
                 holder = result.dimensions().getRegionHolder()
                 if holder is not None:
-                    result.region = self._regions.get(holder)
+                    result.region = self._regions.get(holder, (None, None))[0]
             if expandDataId:
-                self.registry.expandDataId(result)
+                self._manager.expandDataId(result)
             return result
 
+        def expandDataId(self, dataId):
+            """Expand a data ID associated with this row in-place, deferring
+            the expansion if the managing `ResultColumnsManager` is doing so.
+
+            Parameters
+            ----------
+            dataId : `DataId`
+                Data ID to expand.
+            """
+            self._manager.expandDataId(dataId)
+
         def makeDatasetRef(self, datasetType, *, expandDataId=True, **kwds):
             """Construct a `DatasetRef` from the result row.
 
@@ -24,6 +24,25 @@ from contextlib import contextmanager
 from lsst.daf.butler import DimensionUniverse
 
 
+class DummyDatabaseDict(dict):
+    """Dictionary with the bulk methods of `DatabaseDict`, for Datastore test
+    purposes.
+    """
+
+    def getMany(self, keys):
+        return {key: self[key] for key in keys if key in self}
+
+    def setMany(self, items):
+        self.update(items)
+
+    def updateMany(self, items):
+        self.update((key, value) for key, value in items.items() if key in self)
+
+    def deleteMany(self, keys):
+        for key in keys:
+            self.pop(key, None)
+
+
 class DummyRegistry:
     """Dummy Registry, for Datastore test purposes.
 
@@ -47,14 +66,22 @@ class DummyRegistry:
         if incrementCounter:
             self._counter += 1
 
+    def addDatasetLocations(self, refs, datastoreName):
+        for ref in refs:
+            self.addDatasetLocation(ref, datastoreName)
+
     def getDatasetLocations(self, ref):
         return self._entries[ref.id].copy()
 
     def removeDatasetLocation(self, datastoreName, ref):
         self._entries[ref.id].remove(datastoreName)
 
+    def removeDatasetLocations(self, datastoreName, refs):
+        for ref in refs:
+            self.removeDatasetLocation(datastoreName, ref)
+
     def makeDatabaseDict(self, table, types, key, value, lengths=None):
-        return dict()
+        return DummyDatabaseDict()
 
     @contextmanager
     def transaction(self):
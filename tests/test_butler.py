@@ -27,6 +27,7 @@ import unittest
 import tempfile
 import shutil
 import pickle
+import urllib.parse
 
 from lsst.daf.butler.core.safeFileIo import safeMakeDir
 from lsst.daf.butler import Butler, Config, ButlerConfig
@@ -350,6 +351,142 @@ class ButlerTests:
         with self.assertRaises(FileNotFoundError):
             butler.getDirect(ref)
 
+    def testPrune(self):
+        butler = Butler(self.tmpConfigFile)
+        storageClass = self.storageClassFactory.getStorageClass("StructuredData")
+        dimensions = butler.registry.dimensions.extract(["instrument", "visit"])
+        datasetType = self.addDatasetType("test_metric", dimensions, storageClass, butler.registry)
+        butler.registry.addDimensionEntry("instrument", {"instrument": "DummyCam"})
+        butler.registry.addDimensionEntry("physical_filter", {"instrument": "DummyCam",
+                                                              "physical_filter": "d-r"})
+        metric = makeExampleMetrics()
+        refs = []
+        for visit in range(5):
+            butler.registry.addDimensionEntry("visit", {"instrument": "DummyCam", "visit": visit,
+                                                        "physical_filter": "d-r"})
+            refs.append(butler.put(metric, datasetType, {"instrument": "DummyCam", "visit": visit}))
+
+        with self.assertRaises(ValueError):
+            butler.prune(refs, delete=False, remember=False)
+
+        # Remove some datasets from the collection only.
+        butler.prune(refs[:2], delete=False)
+        for ref in refs[:2]:
+            self.assertIsNone(butler.registry.find(butler.collection, datasetType, ref.dataId))
+            self.assertEqual(metric, butler.getDirect(ref))
+
+        # Delete one of those from the Datastore, too.
+        butler.prune(refs[:1])
+        with self.assertRaises(FileNotFoundError):
+            butler.getDirect(refs[0])
+        self.assertEqual(butler.registry.getDataset(refs[0].id), refs[0])
+
+        # Remove everything left in the collection completely, reporting
+        # progress.
+        progress = []
+        pruned = butler.prune(remember=False, chunkSize=2,
+                              progress=lambda done, total: progress.append((done, total)))
+        self.assertCountEqual(pruned, refs[2:])
+        self.assertEqual(progress, [(2, 3), (3, 3)])
+        for ref in refs[2:]:
+            self.assertIsNone(butler.registry.getDataset(ref.id))
+            with self.assertRaises(FileNotFoundError):
+                butler.getDirect(ref)
+        self.assertEqual(butler.registry.getDatasetsInCollection(butler.collection), [])
+
+    def testGetMany(self):
+        butler = Butler(self.tmpConfigFile)
+        dimensions = butler.registry.dimensions.extract(["instrument", "visit"])
+        butler.registry.addDimensionEntry("instrument", {"instrument": "DummyCamComp"})
+        butler.registry.addDimensionEntry("physical_filter", {"instrument": "DummyCamComp",
+                                                              "physical_filter": "d-r"})
+        for visit in range(4):
+            butler.registry.addDimensionEntry("visit", {"instrument": "DummyCamComp", "visit": visit,
+                                                        "physical_filter": "d-r"})
+        metrics = {}
+        refs = []
+        for datasetTypeName, storageClassName in (("test_metric", "StructuredData"),
+                                                  ("test_metric_comp", "StructuredComposite")):
+            storageClass = self.storageClassFactory.getStorageClass(storageClassName)
+            datasetType = self.addDatasetType(datasetTypeName, dimensions, storageClass, butler.registry)
+            for visit in range(4):
+                metric = makeExampleMetrics()
+                metric.summary["visit"] = visit
+                ref = butler.put(metric, datasetType, {"instrument": "DummyCamComp", "visit": visit})
+                metrics[ref.id] = metric
+                refs.append(ref)
+
+        results = list(butler.getMany(refs))
+        self.assertEqual([ref for ref, _ in results], refs)
+        for ref, metric in results:
+            self.assertEqual(metric, metrics[ref.id])
+
+        results = list(butler.getMany(reversed(refs), ordered=False))
+        self.assertCountEqual([ref for ref, _ in results], refs)
+        for ref, metric in results:
+            self.assertEqual(metric, metrics[ref.id])
+
+        # Refs without IDs are looked up in the collection.
+        unresolved = [DatasetRef(ref.datasetType, ref.dataId) for ref in refs]
+        self.assertEqual([ref for ref, _ in butler.getMany(unresolved)], refs)
+        with self.assertRaises(LookupError):
+            list(butler.getMany([DatasetRef(refs[0].datasetType,
+                                            {"instrument": "DummyCamComp", "visit": 100})]))
+
+        # Parameters are applied to every dataset.
+        stop = 4
+        for ref, sliced in butler.getMany(refs, parameters={"slice": slice(stop)}):
+            self.assertEqual(sliced.data, metrics[ref.id].data[:stop])
+
+    def testPutMany(self):
+        butler = Butler(self.tmpConfigFile)
+        dimensions = butler.registry.dimensions.extract(["instrument", "visit"])
+        butler.registry.addDimensionEntry("instrument", {"instrument": "DummyCamComp"})
+        butler.registry.addDimensionEntry("physical_filter", {"instrument": "DummyCamComp",
+                                                              "physical_filter": "d-r"})
+        for visit in range(4):
+            butler.registry.addDimensionEntry("visit", {"instrument": "DummyCamComp", "visit": visit,
+                                                        "physical_filter": "d-r"})
+        items = []
+        for datasetTypeName, storageClassName in (("test_metric", "StructuredData"),
+                                                  ("test_metric_comp", "StructuredComposite")):
+            storageClass = self.storageClassFactory.getStorageClass(storageClassName)
+            self.addDatasetType(datasetTypeName, dimensions, storageClass, butler.registry)
+            for visit in range(2):
+                metric = makeExampleMetrics()
+                metric.summary["visit"] = visit
+                items.append((metric, datasetTypeName, {"instrument": "DummyCamComp", "visit": visit}))
+
+        refs = butler.putMany(items)
+        self.assertEqual(len(refs), len(items))
+        for ref, (metric, datasetTypeName, dataId) in zip(refs, items):
+            self.assertIsInstance(ref, DatasetRef)
+            self.assertEqual(ref.datasetType.name, datasetTypeName)
+            self.assertEqual(butler.get(datasetTypeName, dataId), metric)
+            self.assertGetComponents(butler, ref, ("summary", "data", "output"), metric)
+
+        # Refs that already have IDs cannot be stored again.
+        with self.assertRaises(ValueError):
+            butler.putMany([(items[0][0], refs[0], None)])
+
+        # A failure rolls back every dataset, including the files written.
+        dataIds = [{"instrument": "DummyCamComp", "visit": visit} for visit in (2, 3)]
+        uris = []
+        with self.assertRaises(TransactionTestError):
+            with butler.transaction():
+                newRefs = butler.putMany([(makeExampleMetrics(), "test_metric", dataId)
+                                          for dataId in dataIds])
+                for ref in newRefs:
+                    self.assertTrue(butler.datastore.exists(ref))
+                    uris.append(butler.getUri(ref))
+                raise TransactionTestError("This should roll back both datasets")
+        for ref, dataId in zip(newRefs, dataIds):
+            self.assertIsNone(butler.registry.find(butler.collection, "test_metric", dataId))
+            self.assertFalse(butler.datastore.exists(ref))
+        for uri in uris:
+            if uri.startswith("file:"):
+                self.assertFalse(os.path.exists(urllib.parse.urlparse(uri).path))
+
     def testMakeRepo(self):
         """Test that we can write butler configuration to a new repository via
         the Butler.makeRepo interface and then instantiate a butler from the
@@ -20,6 +20,8 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import zlib
+import hashlib
 import unittest
 import shutil
 import yaml
@@ -266,6 +268,67 @@ class DatastoreTests(DatastoreTestsBase):
         with self.assertRaises(FileNotFoundError):
             datastore.remove(ref)
 
+    def testGetMany(self):
+        datastore = self.makeDatastore()
+        dimensions = self.universe.extract(("visit", "physical_filter"))
+        sc = self.storageClassFactory.getStorageClass("StructuredData")
+        metrics = {}
+        refs = []
+        for visit in range(700, 706):
+            dataId = {"instrument": "dummy", "visit": visit, "physical_filter": "U"}
+            ref = self.makeDatasetRef("metric", dimensions, sc, dataId)
+            metric = makeExampleMetrics()
+            metric.summary["visit"] = visit
+            datastore.put(metric, ref)
+            metrics[ref.id] = metric
+            refs.append(ref)
+
+        results = list(datastore.getMany(refs))
+        self.assertEqual([ref for ref, _ in results], refs)
+        for ref, metric in results:
+            self.assertEqual(metric, metrics[ref.id])
+
+        results = list(datastore.getMany(refs, ordered=False))
+        self.assertCountEqual([ref for ref, _ in results], refs)
+        for ref, metric in results:
+            self.assertEqual(metric, metrics[ref.id])
+
+        for ref, output in datastore.getMany(refs, parameters={"slice": slice(2)}):
+            self.assertEqual(output.data, metrics[ref.id].data[:2])
+
+        ref = self.makeDatasetRef("metric", dimensions, sc, dataId, id=10000)
+        with self.assertRaises(FileNotFoundError):
+            list(datastore.getMany(refs + [ref]))
+
+    def testPutMany(self):
+        datastore = self.makeDatastore()
+        dimensions = self.universe.extract(("visit", "physical_filter"))
+        sc = self.storageClassFactory.getStorageClass("StructuredData")
+        items = []
+        for visit in range(710, 716):
+            dataId = {"instrument": "dummy", "visit": visit, "physical_filter": "U"}
+            ref = self.makeDatasetRef("metric", dimensions, sc, dataId)
+            metric = makeExampleMetrics()
+            metric.summary["visit"] = visit
+            items.append((metric, ref))
+
+        datastore.putMany(items[:3])
+        for metric, ref in items[:3]:
+            self.assertTrue(datastore.exists(ref))
+            self.assertEqual(datastore.get(ref), metric)
+
+        # Datasets written in a rolled-back transaction should not exist
+        with self.assertRaises(TransactionTestError):
+            with datastore.transaction():
+                datastore.putMany(items[3:])
+                for metric, ref in items[3:]:
+                    self.assertTrue(datastore.exists(ref))
+                raise TransactionTestError("This should roll back the transaction")
+        for metric, ref in items[3:]:
+            self.assertFalse(datastore.exists(ref))
+        for metric, ref in items[:3]:
+            self.assertEqual(datastore.get(ref), metric)
+
     def testTransfer(self):
         metrics = makeExampleMetrics()
 
@@ -441,6 +504,47 @@ class DatastoreTests(DatastoreTestsBase):
                 else:
                     self.runIngestTest(failNotImplemented)
 
+    def testIngestManyTransfer(self):
+        """Test ingesting many files at once, some of which fail.
+        """
+        storageClass = self.storageClassFactory.getStorageClass("StructuredData")
+        dimensions = self.universe.extract(("visit", "physical_filter"))
+        for mode in ("copy", "move", "hardlink", "symlink"):
+            with self.subTest(mode=mode):
+                datastore = self.makeDatastore(mode)
+                with tempfile.TemporaryDirectory() as tmpDir:
+                    items = []
+                    metrics = {}
+                    for visit in range(4):
+                        dataId = {"instrument": "dummy", "visit": visit, "physical_filter": "V"}
+                        ref = self.makeDatasetRef("metric", dimensions, storageClass, dataId)
+                        path = os.path.join(tmpDir, f"metric{visit}.yaml")
+                        metric = makeExampleMetrics()
+                        metric.summary["visit"] = visit
+                        if visit != 2:
+                            with open(path, "w") as fd:
+                                yaml.dump(metric._asdict(), stream=fd)
+                        items.append((path, ref, None))
+                        metrics[ref.id] = metric
+
+                    if mode not in self.ingestTransferModes:
+                        with self.assertRaises(NotImplementedError):
+                            datastore.ingestMany(items, transfer=mode)
+                        continue
+
+                    progress = []
+                    failures = datastore.ingestMany(items, transfer=mode,
+                                                    progress=lambda done, total: progress.append(done))
+                    self.assertEqual(len(failures), 1)
+                    path, ref, err = failures[0]
+                    self.assertIs(ref, items[2][1])
+                    self.assertIsInstance(err, FileNotFoundError)
+                    self.assertFalse(datastore.exists(ref))
+                    self.assertEqual(progress[-1], len(items))
+                    for path, ref, _ in items:
+                        if ref is not items[2][1]:
+                            self.assertEqual(datastore.get(ref), metrics[ref.id])
+
 
 class PosixDatastoreTestCase(DatastoreTests, unittest.TestCase):
     """PosixDatastore specialization"""
@@ -457,6 +561,74 @@ class PosixDatastoreTestCase(DatastoreTests, unittest.TestCase):
         super().setUp()
 
 
+class PosixDatastoreChecksumTestCase(DatastoreTestsBase, unittest.TestCase):
+    """Tests of PosixDatastore checksum policies"""
+    configFile = os.path.join(TESTDIR, "config/basic/butler.yaml")
+
+    def setUp(self):
+        # Override the working directory before calling the base class
+        self.root = tempfile.mkdtemp(dir=TESTDIR)
+        super().setUp()
+
+    def testComputeChecksum(self):
+        data = os.urandom(100000)
+        with lsst.utils.tests.getTempFilePath(".dat") as path:
+            with open(path, "wb") as fd:
+                fd.write(data)
+            computeChecksum = self.datastoreType.computeChecksum
+            expected = hashlib.blake2b(data).hexdigest()
+            self.assertEqual(computeChecksum(path), expected)
+            self.assertEqual(computeChecksum(path, block_size=1000), expected)
+            self.assertEqual(computeChecksum(path, useMmap=True), expected)
+            self.assertEqual(computeChecksum(path, algorithm="crc32"), f"{zlib.crc32(data):08x}")
+            self.assertEqual(computeChecksum(path, algorithm="adler32", useMmap=True),
+                             f"{zlib.adler32(data):08x}")
+            with self.assertRaises(NameError):
+                computeChecksum(path, algorithm="not-an-algorithm")
+
+    def testPolicies(self):
+        self.config["checksum", "algorithm"] = "crc32"
+        self.config["checksum", "policies", "metric"] = "deferred"
+        self.config["checksum", "policies", "metric2"] = "none"
+        datastore = self.makeDatastore()
+        metrics = makeExampleMetrics()
+        storageClass = self.storageClassFactory.getStorageClass("StructuredData")
+        dimensions = self.universe.extract(("visit", "physical_filter"))
+        refs = {}
+        for visit, datasetTypeName in enumerate(("metric", "metric2", "metric3")):
+            dataId = {"instrument": "dummy", "visit": visit, "physical_filter": "V"}
+            ref = self.makeDatasetRef(datasetTypeName, dimensions, storageClass, dataId)
+            datastore.put(metrics, ref)
+            self.assertEqual(datastore.get(ref), metrics)
+            refs[datasetTypeName] = ref
+
+        def getRecord(datasetTypeName):
+            record = datastore.records[refs[datasetTypeName].id]
+            return record, os.path.join(datastore.root, record.path)
+
+        record, path = getRecord("metric")
+        self.assertIsNone(record.checksum)
+        self.assertEqual(record.file_size, os.stat(path).st_size)
+        record, path = getRecord("metric2")
+        self.assertIsNone(record.checksum)
+        self.assertIsNone(record.file_size)
+        record, path = getRecord("metric3")
+        self.assertEqual(record.checksum, datastore.computeChecksum(path, algorithm="crc32"))
+
+        # Missing checksums can be added later.
+        self.assertEqual(datastore.computeMissingChecksums(refs.values()), 2)
+        for datasetTypeName in refs:
+            record, path = getRecord(datasetTypeName)
+            self.assertEqual(record.checksum, datastore.computeChecksum(path, algorithm="crc32"))
+            self.assertEqual(record.file_size, os.stat(path).st_size)
+        self.assertEqual(datastore.computeMissingChecksums(refs.values()), 0)
+
+    def testBadPolicy(self):
+        self.config["checksum", "policies", "default"] = "sometimes"
+        with self.assertRaises(ValueError):
+            self.makeDatastore()
+
+
 class InMemoryDatastoreTestCase(DatastoreTests, unittest.TestCase):
     """PosixDatastore specialization"""
     configFile = os.path.join(TESTDIR, "config/basic/inMemoryDatastore.yaml")
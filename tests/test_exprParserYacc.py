@@ -325,6 +325,44 @@ class ParserLexTestCase(unittest.TestCase):
         self.assertEqual(result, "B(B(IN(ID(x) (N(1), N(2))) AND !IN(ID(y) (N(1.1), N(.25), N(1e2))))"
                          " OR IN(ID(z) (S(a), S(b))))")
 
+    def testCache(self):
+        """Test for sharing of parser tables and parsed trees"""
+
+        parser1 = ParserYacc()
+        parser2 = ParserYacc()
+        self.assertIsNot(parser1.parser, parser2.parser)
+        self.assertIs(parser1.parser.action, parser2.parser.action)
+
+        tree = parser1.parse("a = 1 AND b IN (2, 3)")
+        self.assertIs(parser2.parse("a = 1 AND b IN (2, 3)"), tree)
+        self.assertIsNot(parser2.parse("a = 1 AND b IN (2, 4)"), tree)
+        self.assertEqual(str(tree), "a = 1 AND b IN (2, 3)")
+
+        # errors are not cached
+        for i in range(2):
+            with self.assertRaises(ParseError):
+                parser1.parse("a = = 1")
+
+    def testCacheSubclass(self):
+        """Test that parser subclasses do not share tables or trees with
+        their base class"""
+
+        class UpperParser(ParserYacc):
+            # yacc takes the first rule defined as the start symbol by
+            # default, which would be this one.
+            start = "input"
+
+            def p_literal_str(self, p):
+                """ literal : STRING_LITERAL
+                """
+                p[0] = exprTree.StringLiteral(p[1].upper())
+
+        visitor = _Visitor()
+        for parsers in ((ParserYacc(), UpperParser()), (UpperParser(), ParserYacc())):
+            for parser in parsers:
+                expected = "B(ID(a) = S(B))" if isinstance(parser, UpperParser) else "B(ID(a) = S(b))"
+                self.assertEqual(parser.parse("a = 'b'").visit(visitor), expected)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -23,10 +23,19 @@
 """
 
 import os.path
+import shutil
+import pickle
+import hashlib
+import tempfile
 import unittest
 
 from datasetsHelper import DatasetTestHelper
 from lsst.daf.butler import Formatter, FormatterFactory, StorageClass, DatasetType, Config, DimensionUniverse
+from lsst.daf.butler import FileDescriptor, LocationFactory
+from lsst.daf.butler.formatters.fileFormatter import FileFormatter
+from lsst.daf.butler.formatters.yamlFormatter import YamlFormatter
+from lsst.daf.butler.formatters.jsonFormatter import JsonFormatter
+from lsst.daf.butler.formatters.pickleFormatter import PickleFormatter
 
 TESTDIR = os.path.abspath(os.path.dirname(__file__))
 
@@ -124,5 +133,82 @@ class FormatterFactoryTestCase(unittest.TestCase, DatasetTestHelper):
         self.assertIn("YamlFormatter", refPvixNotHscDims_fmt.name())
 
 
+class PathPickleFormatter(PickleFormatter):
+    """Formatter that writes through a path rather than a stream, like most
+    FITS formatters.
+    """
+
+    def _writeFile(self, inMemoryDataset, fileDescriptor):
+        with open(fileDescriptor.location.path, "wb") as fd:
+            pickle.dump(inMemoryDataset, fd, protocol=-1)
+
+
+class FileFormatterTestCase(unittest.TestCase):
+    """Tests of writing files with FileFormatter.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(dir=TESTDIR)
+        self.locationFactory = LocationFactory(self.root)
+        self.storageClass = StorageClass("TestClass", dict, None)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def testWriteWithChecksum(self):
+        """Test that the size and checksum are computed as files are
+        written.
+        """
+        data = {"a": [1, 2, 3], "b": {"blue": 5, "red": "green"}}
+        for formatter in (YamlFormatter(), JsonFormatter(), PickleFormatter()):
+            with self.subTest(formatter=formatter.name()):
+                name = type(formatter).__name__
+                location = self.locationFactory.fromPath(f"hashed/{name}")
+                path, size, checksum = formatter.writeWithChecksum(
+                    data, FileDescriptor(location, storageClass=self.storageClass), hashlib.blake2b())
+                with open(os.path.join(self.root, path), "rb") as fd:
+                    contents = fd.read()
+                self.assertEqual(size, len(contents))
+                self.assertEqual(checksum, hashlib.blake2b(contents).hexdigest())
+                self.assertEqual(formatter.read(FileDescriptor(location, storageClass=self.storageClass)),
+                                 data)
+
+                # Without a hasher, only the size is computed; the file
+                # written is the same as that written by write.
+                location = self.locationFactory.fromPath(f"unhashed/{name}")
+                path, size, checksum = formatter.writeWithChecksum(
+                    data, FileDescriptor(location, storageClass=self.storageClass))
+                self.assertEqual(size, len(contents))
+                self.assertIsNone(checksum)
+                location = self.locationFactory.fromPath(f"written/{name}")
+                path = formatter.write(data, FileDescriptor(location, storageClass=self.storageClass))
+                with open(os.path.join(self.root, path), "rb") as fd:
+                    self.assertEqual(fd.read(), contents)
+
+    def testWriteWithChecksumFallback(self):
+        """Test that formatters that need a real path still write files, but
+        do not compute the size or checksum.
+        """
+        formatter = PathPickleFormatter()
+        location = self.locationFactory.fromPath("fallback/data")
+        path, size, checksum = formatter.writeWithChecksum(
+            {"a": 1}, FileDescriptor(location, storageClass=self.storageClass), hashlib.blake2b())
+        self.assertIsNone(size)
+        self.assertIsNone(checksum)
+        self.assertTrue(os.path.exists(os.path.join(self.root, path)))
+
+    def testWriterRequired(self):
+        """Test that a formatter that cannot write files cannot be
+        constructed.
+        """
+        class ReadOnlyFormatter(FileFormatter):
+            def _readFile(self, path, pytype=None):
+                return None
+
+        with self.assertRaises(TypeError):
+            ReadOnlyFormatter()
+        self.assertIsInstance(PathPickleFormatter(), FileFormatter)
+
+
 if __name__ == "__main__":
     unittest.main()
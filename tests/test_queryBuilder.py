@@ -20,13 +20,18 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from datetime import datetime, timedelta
+import math
 import os
 import unittest
+import unittest.mock
+
+import numpy as np
 
 from lsst.daf.butler import (ButlerConfig, DatasetType, Registry, DataId,
                              DatasetOriginInfoDef, StorageClass)
-from lsst.daf.butler.sql import MultipleDatasetQueryBuilder
-from lsst.sphgeom import Angle, Box, LonLat, NormalizedAngle
+from lsst.daf.butler.sql import MultipleDatasetQueryBuilder, QueryBuilder, ResultColumnsManager
+from lsst.sphgeom import (Angle, Box, LonLat, NormalizedAngle, ConvexPolygon, UnitVector3d,
+                          CONTAINS, DISJOINT)
 
 
 class QueryBuilderTestCase(unittest.TestCase):
@@ -152,6 +157,32 @@ class QueryBuilderTestCase(unittest.TestCase):
         self.assertCountEqual(set(row.dataId["visit"] for row in rows), (10, 11))
         self.assertCountEqual(set(row.dataId["detector"] for row in rows), (1, 2, 3))
 
+        # same query with columnar results
+        builder = MultipleDatasetQueryBuilder.fromDatasetTypes(
+            self.registry,
+            originInfo=originInfo,
+            required=[rawType],
+            optional=[calexpType],
+            defer=self.DEFER
+        )
+        if self.DEFER:
+            with self.assertRaises(ValueError):
+                list(builder.executeColumnar())
+        else:
+            chunks = list(builder.executeColumnar(chunkSize=5))
+            self.assertEqual([len(chunk) for chunk in chunks], [5, 5, 2])
+            self.assertCountEqual(set(np.concatenate([chunk.getLinks("exposure") for chunk in chunks])),
+                                  (100, 101, 110, 111))
+            self.assertTrue((np.concatenate([chunk.getDatasetIds(rawType) for chunk in chunks]) > 0).all())
+            self.assertTrue((np.concatenate([chunk.getDatasetIds(calexpType) for chunk in chunks]) < 0).all())
+            columnarRows = [row for chunk in chunks for row in chunk]
+            self.assertCountEqual(
+                [(row.dataId["exposure"], row.dataId["detector"], row.datasetRefs[rawType].id,
+                  row.datasetRefs[calexpType].id) for row in columnarRows],
+                [(row.dataId["exposure"], row.dataId["detector"], row.datasetRefs[rawType].id,
+                  row.datasetRefs[calexpType].id) for row in rows]
+            )
+
         # second collection
         originInfo = DatasetOriginInfoDef(defaultInputs=[collection2], defaultOutput=collection1)
         builder = MultipleDatasetQueryBuilder.fromDatasetTypes(
@@ -618,8 +649,165 @@ class QueryBuilderTestCase(unittest.TestCase):
             optional=[coaddType],
             defer=self.DEFER
         )
+        registry.resetQueryStatistics()
         rows = list(builder.execute())
         self.assertEqual(len(rows), 0)
+        statistics = registry.getQueryStatistics()
+        self.assertEqual(statistics.get("rows", 0), 0)
+        self.assertEqual(statistics.get("rowsFilteredByRegion", 0), 0)
+
+    def testRegionFiltering(self):
+        """Test that rows with disjoint regions are filtered out of a spatial
+        join, and that repeated regions are decoded only once.
+        """
+        registry = self.registry
+        # All regions are small triangles inside the same skypix, so the
+        # spatial join views relate every visit to every tract.
+        pixelization = registry.pixelization
+        pixel = pixelization.pixel(pixelization.index(UnitVector3d(LonLat.fromDegrees(45, 30))))
+        center = LonLat(pixel.getCentroid())
+
+        def makeRegion(offset):
+            lon = center.getLon().asDegrees() + offset
+            lat = center.getLat().asDegrees()
+            return ConvexPolygon([UnitVector3d(LonLat.fromDegrees(lon + dLon, lat + dLat))
+                                  for dLon, dLat in ((0, 0), (0.01, 0), (0, 0.01))])
+
+        registry.addDimensionEntry("instrument", dict(instrument="DummyCam"))
+        registry.addDimensionEntry("physical_filter", dict(instrument="DummyCam",
+                                                           physical_filter="dummy_r",
+                                                           abstract_filter="r"))
+        for visit, offset in ((1, 0.0), (2, 0.002)):
+            registry.addDimensionEntry("visit", dict(instrument="DummyCam", visit=visit,
+                                                     physical_filter="dummy_r",
+                                                     region=makeRegion(offset)))
+        registry.addDimensionEntry("skymap", dict(skymap="DummySkyMap", hash=bytes()))
+        # Tract 1 overlaps both visits; tract 2 overlaps neither.
+        for tract, offset in ((1, 0.001), (2, 0.03)):
+            registry.addDimensionEntry("tract", dict(skymap="DummySkyMap", tract=tract,
+                                                     region=makeRegion(offset)))
+
+        collection = "test"
+        run = registry.makeRun(collection=collection)
+        storageClass = StorageClass("testDataset")
+        registry.storageClasses.registerStorageClass(storageClass)
+        visitType = DatasetType(name="VISIT_SUMMARY",
+                                dimensions=registry.dimensions.extract(("instrument", "visit")),
+                                storageClass=storageClass)
+        tractType = DatasetType(name="TRACT_SUMMARY",
+                                dimensions=registry.dimensions.extract(("skymap", "tract")),
+                                storageClass=storageClass)
+        for datasetType in (visitType, tractType):
+            registry.registerDatasetType(datasetType)
+        for visit in (1, 2):
+            registry.addDataset(visitType, dataId=dict(instrument="DummyCam", visit=visit), run=run)
+        for tract in (1, 2):
+            registry.addDataset(tractType, dataId=dict(skymap="DummySkyMap", tract=tract), run=run)
+
+        originInfo = DatasetOriginInfoDef(defaultInputs=[collection], defaultOutput=collection)
+        builder = MultipleDatasetQueryBuilder.fromDatasetTypes(
+            registry,
+            originInfo=originInfo,
+            required=[visitType, tractType],
+            defer=self.DEFER
+        )
+        registry.resetQueryStatistics()
+        rows = list(builder.execute())
+        self.assertCountEqual([(row.dataId["visit"], row.dataId["tract"]) for row in rows],
+                              [(1, 1), (2, 1)])
+        statistics = registry.getQueryStatistics()
+        # Each of the 2 visits is related to each of the 2 tracts.
+        self.assertEqual(statistics["rows"], 2*2)
+        self.assertEqual(statistics["rowsFilteredByRegion"], 2)
+        # Each of the 4 distinct regions is decoded once, and then found in
+        # the cache when it appears in another row.
+        self.assertEqual(statistics["regionCacheMisses"], 4)
+        self.assertEqual(statistics["regionCacheHits"], 4)
+
+
+class ResultColumnsManagerTestCase(unittest.TestCase):
+    """Tests for ResultColumnsManager.
+    """
+
+    def setUp(self):
+        self.testDir = os.path.dirname(__file__)
+        self.configFile = os.path.join(self.testDir, "config/basic/butler.yaml")
+        self.butlerConfig = ButlerConfig(self.configFile)
+        self.registry = Registry.fromConfig(self.butlerConfig)
+
+    def testBuildCache(self):
+        """Test that built queries are reused even when there are too many
+        result columns for their count to be a cached `int` object.
+        """
+        builder = QueryBuilder.fromDimensions(self.registry, self.registry.dimensions.extract(["visit"]))
+        with unittest.mock.patch.object(ResultColumnsManager, "__len__", lambda self: int("1000")):
+            self.assertIs(builder.build(), builder.build())
+
+    def testRegionCache(self):
+        """Test that decoded regions are cached by their link values, with the
+        least-recently used regions evicted first.
+        """
+        registry = self.registry
+        skypix = registry.dimensions["skypix"]
+        manager = ResultColumnsManager(registry)
+        manager.addDimensionLink(registry._schema.tables["visit_skypix_join"], "skypix")
+        manager.REGION_CACHE_SIZE = 2
+        pixels = [registry.pixelization.index(UnitVector3d(LonLat.fromDegrees(lon, 10)))
+                  for lon in (10, 100, 190)]
+        self.assertEqual(len(set(pixels)), 3)
+
+        def getRegion(pixel):
+            return manager.getRegion(skypix, (pixel,))
+
+        region, boundingCircle = getRegion(pixels[0])
+        self.assertEqual(region, registry.pixelization.pixel(pixels[0]))
+        self.assertEqual(boundingCircle, region.getBoundingCircle())
+        getRegion(pixels[1])
+        self.assertEqual(manager.popStatistics(), {"regionCacheHits": 0, "regionCacheMisses": 2})
+        self.assertIs(getRegion(pixels[0]), getRegion(pixels[0]))
+        self.assertEqual(manager.popStatistics(), {"regionCacheHits": 2, "regionCacheMisses": 0})
+        # Adding a third region evicts the least-recently used one (pixels[1],
+        # since pixels[0] was just used), but not pixels[0].
+        getRegion(pixels[2])
+        getRegion(pixels[0])
+        self.assertEqual(manager.popStatistics(), {"regionCacheHits": 1, "regionCacheMisses": 1})
+        getRegion(pixels[1])
+        self.assertEqual(manager.popStatistics(), {"regionCacheHits": 0, "regionCacheMisses": 1})
+
+    def testBoundingCircleCheck(self):
+        """Test that regions are only compared directly when their bounding
+        circles are not disjoint.
+        """
+        registry = self.registry
+        visit = registry.dimensions["visit"]
+        tract = registry.dimensions["tract"]
+        manager = ResultColumnsManager(registry)
+        manager.addRegion(registry._schema.tables["visit"], visit)
+        manager.addRegion(registry._schema.tables["tract"], tract)
+        visitRegion = unittest.mock.Mock()
+        visitCircle = unittest.mock.Mock()
+        tractRegion = unittest.mock.Mock()
+        tractCircle = unittest.mock.Mock()
+        entries = {visit: (visitRegion, visitCircle), tract: (tractRegion, tractCircle)}
+        row = (None,)*len(manager)
+        getRegion = unittest.mock.Mock(side_effect=lambda holder, row: entries[holder])
+        with unittest.mock.patch.object(manager, "getRegion", getRegion):
+            # Disjoint bounding circles are enough to reject the row.
+            visitCircle.isDisjointFrom.return_value = True
+            tractCircle.isDisjointFrom.return_value = True
+            self.assertTrue(manager.manageRow(row).areRegionsDisjoint())
+            visitRegion.relate.assert_not_called()
+            tractRegion.relate.assert_not_called()
+            # Otherwise the regions themselves are compared.
+            visitCircle.isDisjointFrom.return_value = False
+            tractCircle.isDisjointFrom.return_value = False
+            visitRegion.relate.return_value = DISJOINT
+            tractRegion.relate.return_value = DISJOINT
+            self.assertTrue(manager.manageRow(row).areRegionsDisjoint())
+            visitRegion.relate.return_value = CONTAINS
+            tractRegion.relate.return_value = CONTAINS
+            self.assertFalse(manager.manageRow(row).areRegionsDisjoint())
+            self.assertEqual(visitRegion.relate.call_count + tractRegion.relate.call_count, 2)
 
 
 class QueryBuilderDeferralTestCase(QueryBuilderTestCase):
@@ -629,6 +817,152 @@ class QueryBuilderDeferralTestCase(QueryBuilderTestCase):
     """
     DEFER = True
 
+    def _makeDeferralData(self):
+        """Add dimensions and datasets for the tests of batched deferred
+        dataset searches, returning the raw, calexp, and src `DatasetType`s.
+        """
+        registry = self.registry
+        registry.addDimensionEntry("instrument", dict(instrument="DummyCam"))
+        registry.addDimensionEntry("physical_filter", dict(instrument="DummyCam",
+                                                           physical_filter="dummy_r",
+                                                           abstract_filter="r"))
+        for detector in (1, 2, 3):
+            registry.addDimensionEntry("detector", dict(instrument="DummyCam", detector=detector))
+        for visit in (10, 11):
+            registry.addDimensionEntry("visit", dict(instrument="DummyCam", visit=visit,
+                                                     physical_filter="dummy_r"))
+        # Two exposures in visit 10, so some deferred searches are repeated.
+        for exposure, visit in ((100, 10), (101, 10), (110, 11)):
+            registry.addDimensionEntry("exposure", dict(instrument="DummyCam", exposure=exposure,
+                                                        visit=visit, physical_filter="dummy_r"))
+        run = registry.makeRun(collection="test")
+        storageClass = StorageClass("testDataset")
+        registry.storageClasses.registerStorageClass(storageClass)
+        rawType = DatasetType(name="RAW",
+                              dimensions=registry.dimensions.extract(("instrument", "exposure", "detector")),
+                              storageClass=storageClass)
+        calexpType = DatasetType(name="CALEXP",
+                                 dimensions=registry.dimensions.extract(("instrument", "visit", "detector")),
+                                 storageClass=storageClass)
+        srcType = DatasetType(name="SRC",
+                              dimensions=registry.dimensions.extract(("instrument", "visit", "detector")),
+                              storageClass=storageClass)
+        for datasetType in (rawType, calexpType, srcType):
+            registry.registerDatasetType(datasetType)
+        for exposure in (100, 101, 110):
+            for detector in (1, 2, 3):
+                registry.addDataset(rawType, dataId=dict(instrument="DummyCam", exposure=exposure,
+                                                         detector=detector), run=run)
+        for visit in (10, 11):
+            for detector in (1, 2, 3):
+                dataId = dict(instrument="DummyCam", visit=visit, detector=detector)
+                registry.addDataset(srcType, dataId=dataId, run=run)
+                # CALEXP is missing for visit 11, detectors 2 and 3.
+                if visit == 10 or detector == 1:
+                    registry.addDataset(calexpType, dataId=dataId, run=run)
+        # Small enough that the six (visit, detector) combinations are
+        # searched for in more than one chunk.
+        registry._BULK_CHUNK_SIZE = 6
+        return rawType, calexpType, srcType
+
+    def _checkDeferralRows(self, rows, calexpType, srcType):
+        """Check the results of a query built with `_makeDeferralData`.
+        """
+        self.assertEqual(len(rows), 3*3)   # 3 exposures times 3 detectors
+        for row in rows:
+            calexpRef = row.datasetRefs[calexpType]
+            srcRef = row.datasetRefs[srcType]
+            self.assertIsNotNone(srcRef.id)
+            self.assertEqual(srcRef.dataId["visit"], row.dataId["visit"])
+            self.assertEqual(srcRef.dataId["detector"], row.dataId["detector"])
+            if row.dataId["visit"] == 10 or row.dataId["detector"] == 1:
+                self.assertIsNotNone(calexpRef.id)
+                self.assertEqual(calexpRef.dataId["visit"], row.dataId["visit"])
+                self.assertEqual(calexpRef.dataId["detector"], row.dataId["detector"])
+            else:
+                self.assertIsNone(calexpRef.id)
+
+    def testBatchedDeferral(self):
+        """Test that deferred optional and prerequisite dataset searches are
+        run once per chunk of rows rather than once per row.
+        """
+        rawType, calexpType, srcType = self._makeDeferralData()
+        originInfo = DatasetOriginInfoDef(defaultInputs=["test"], defaultOutput="test")
+        builder = MultipleDatasetQueryBuilder.fromDatasetTypes(
+            self.registry,
+            originInfo=originInfo,
+            required=[rawType],
+            optional=[calexpType],
+            prerequisite=[srcType],
+            defer=True
+        )
+        self.assertCountEqual(builder._deferrals.keys(), (calexpType, srcType))
+        with unittest.mock.ExitStack() as stack:
+            builds = {}
+            executeOnes = {}
+            for datasetType, data in builder._deferrals.items():
+                builds[datasetType] = stack.enter_context(
+                    unittest.mock.patch.object(data.builder, "build", wraps=data.builder.build)
+                )
+                executeOnes[datasetType] = stack.enter_context(
+                    unittest.mock.patch.object(data.builder, "executeOne", wraps=data.builder.executeOne)
+                )
+            rows = list(builder.execute())
+        self._checkDeferralRows(rows, calexpType, srcType)
+        for datasetType, data in builder._deferrals.items():
+            # One statement per chunk of the 6 distinct (visit, detector)
+            # combinations, instead of one per row.
+            chunkSize = max(1, self.registry._BULK_CHUNK_SIZE // len(data.links))
+            self.assertGreater(math.ceil(6/chunkSize), 1)
+            self.assertEqual(builds[datasetType].call_count, math.ceil(6/chunkSize))
+            executeOnes[datasetType].assert_not_called()
+
+        # A missing prerequisite dataset is still an error, even when it is
+        # not in the first chunk.
+        registry = self.registry
+        missingType = DatasetType(name="SRC_MISSING", dimensions=srcType.dimensions,
+                                  storageClass=srcType.storageClass)
+        registry.registerDatasetType(missingType)
+        run = registry.getRun(collection="test")
+        registry.addDataset(missingType, dataId=dict(instrument="DummyCam", visit=10, detector=1), run=run)
+        builder = MultipleDatasetQueryBuilder.fromDatasetTypes(
+            self.registry,
+            originInfo=originInfo,
+            required=[rawType],
+            prerequisite=[missingType],
+            defer=True
+        )
+        with self.assertRaises(LookupError):
+            list(builder.execute())
+
+    def testUnbatchedDeferral(self):
+        """Test deferred dataset searches when `makeDatasetRef` is called for
+        rows that were not prefetched.
+        """
+        rawType, calexpType, srcType = self._makeDeferralData()
+        originInfo = DatasetOriginInfoDef(defaultInputs=["test"], defaultOutput="test")
+        builder = MultipleDatasetQueryBuilder.fromDatasetTypes(
+            self.registry,
+            originInfo=originInfo,
+            required=[rawType],
+            optional=[calexpType],
+            prerequisite=[srcType],
+            defer=True
+        )
+        with unittest.mock.ExitStack() as stack:
+            executeOnes = {}
+            stack.enter_context(unittest.mock.patch.object(builder, "prepareResultRows"))
+            for datasetType, data in builder._deferrals.items():
+                executeOnes[datasetType] = stack.enter_context(
+                    unittest.mock.patch.object(data.builder, "executeOne", wraps=data.builder.executeOne)
+                )
+            rows = list(builder.execute())
+        self._checkDeferralRows(rows, calexpType, srcType)
+        for executeOne in executeOnes.values():
+            # One statement per distinct (visit, detector) combination;
+            # repeats are served from the cache.
+            self.assertEqual(executeOne.call_count, 6)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -85,6 +85,14 @@ class SqlDatabaseDictTestCase(unittest.TestCase):
         d = self.registry.makeDatabaseDict(table="test_table", key=self.key, types=self.types, value=value)
         self.checkDatabaseDict(d, data)
 
+    def testUpdateMany(self):
+        """Test bulk updates of existing keys."""
+        value = namedtuple("TestValue", ["y", "z"])
+        d = self.registry.makeDatabaseDict(table="test_table", key=self.key, types=self.types, value=value)
+        d.setMany({0: value(y="zero", z=0.0), 1: value(y="one", z=0.1)})
+        d.updateMany({0: value(y="ZERO", z=1.0), 1: value(y="ONE", z=1.1), 2: value(y="two", z=0.2)})
+        self.assertEqual(d.getMany([0, 1, 2]), {0: value(y="ZERO", z=1.0), 1: value(y="ONE", z=1.1)})
+
     def testLengths(self):
         """Test that when a length is specified that it is actually used."""
         value = namedtuple("TestValue", ["y", "z"])
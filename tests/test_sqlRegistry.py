@@ -20,18 +20,22 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import tempfile
 import unittest
+import unittest.mock
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from itertools import combinations
 
 import lsst.sphgeom
 
-from sqlalchemy.exc import OperationalError
-from lsst.daf.butler import (Execution, Quantum, Run, DatasetType, Registry,
-                             StorageClass, ButlerConfig, DataId,
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from lsst.daf.butler import (Execution, Quantum, Run, DatasetType, DatasetRef, Registry,
+                             StorageClass, ButlerConfig, DataId, AmbiguousDatasetError,
                              ConflictingDefinitionError, OrphanedRecordError)
 from lsst.daf.butler.registries.sqlRegistry import SqlRegistry
+from lsst.daf.butler.sql import MultipleDatasetQueryBuilder
 
 """Tests for SqlRegistry.
 """
@@ -54,6 +58,28 @@ class RegistryTests(metaclass=ABCMeta):
         rows = list(registry.query(query))
         self.assertEqual(rows[0]["cnt"], count)
 
+    def testQueryChunks(self):
+        registry = self.makeRegistry()
+        storageClass = StorageClass("testQueryChunks")
+        registry.storageClasses.registerStorageClass(storageClass)
+        dimensions = registry.dimensions.extract(("instrument", "visit"))
+        names = {f"test{i}" for i in range(5)}
+        for name in names:
+            registry.registerDatasetType(DatasetType(name, dimensions, storageClass))
+        # Results should be the same regardless of chunk size and whether
+        # they are streamed.
+        for streamResults in (False, True):
+            registry.config["streamResults"] = streamResults
+            for chunkSize in (1, 2, 5, 1000):
+                registry.config["fetchChunkSize"] = chunkSize
+                rows = list(registry.query('select dataset_type_name from "dataset_type"'))
+                self.assertEqual({row["dataset_type_name"] for row in rows}, names)
+                chunks = list(registry._executeInChunks(
+                    registry._schema.tables["dataset_type"].select()
+                ))
+                self.assertTrue(all(len(chunk) <= chunkSize for chunk in chunks))
+                self.assertEqual(sum(len(chunk) for chunk in chunks), len(names))
+
     def testDatasetType(self):
         registry = self.makeRegistry()
         # Check valid insert
@@ -88,6 +114,17 @@ class RegistryTests(metaclass=ABCMeta):
         allTypes = registry.getAllDatasetTypes()
         self.assertEqual(allTypes, {outDatasetType1, outDatasetType2})
 
+        # DatasetTypes are cached, but ones added by other clients after the
+        # cache was populated should still be found.
+        self.assertIs(registry.getDatasetType(datasetTypeName), registry.getDatasetType(datasetTypeName))
+        registry._connection.execute(
+            registry._schema.tables["dataset_type"].insert().values(dataset_type_name="external",
+                                                                    storage_class=storageClass.name)
+        )
+        self.assertEqual(registry.getDatasetType("external"),
+                         DatasetType("external", registry.dimensions.extract(()), storageClass))
+        self.assertEqual(len(registry.getAllDatasetTypes()), 3)
+
     def testDataset(self):
         registry = self.makeRegistry()
         run = registry.makeRun(collection="test")
@@ -108,6 +145,79 @@ class RegistryTests(metaclass=ABCMeta):
         registry.removeDataset(ref)
         self.assertIsNone(registry.find(run.collection, datasetType, dataId))
 
+    def testAddDatasets(self):
+        registry = self.makeRegistry()
+        run = registry.makeRun(collection="test")
+        childStorageClass = StorageClass("testAddDatasetsChild")
+        registry.storageClasses.registerStorageClass(childStorageClass)
+        parentStorageClass = StorageClass("testAddDatasetsParent",
+                                          components={"child1": childStorageClass,
+                                                      "child2": childStorageClass})
+        registry.storageClasses.registerStorageClass(parentStorageClass)
+        datasetType = DatasetType(name="parent", dimensions=registry.dimensions.extract(("instrument",)),
+                                  storageClass=parentStorageClass)
+        registry.registerDatasetType(datasetType)
+        dataIds = [{"instrument": "DummyCam"}, {"instrument": "MyCam"}]
+        if not registry.limited:
+            registry.addDimensionEntryList("instrument", dataIds)
+        refs = registry.addDatasets(datasetType, dataIds, run=run, recursive=True)
+        self.assertEqual(len(refs), 2)
+        self.assertEqual(len({ref.id for ref in refs}), 2)
+        for ref, dataId in zip(refs, dataIds):
+            self.assertIsNotNone(ref.id)
+            self.assertEqual(ref.dataId, dataId)
+            self.assertEqual(ref.components.keys(), {"child1", "child2"})
+            self.assertEqual(registry.find(run.collection, datasetType, dataId), ref)
+            self.assertEqual(registry.getDataset(ref.id), ref)
+        self.assertRowCount(registry, "dataset", 6)
+        self.assertRowCount(registry, "dataset_collection", 6)
+        self.assertRowCount(registry, "dataset_composition", 4)
+        # Adding any of the same datasets again should fail and roll back.
+        with self.assertRaises(ConflictingDefinitionError):
+            registry.addDatasets(datasetType, dataIds[1:], run=run)
+        self.assertRowCount(registry, "dataset", 6)
+        self.assertEqual(registry.addDatasets(datasetType, [], run=run), [])
+
+    def testRemoveDatasets(self):
+        registry = self.makeRegistry()
+        run = registry.makeRun(collection="test")
+        childStorageClass = StorageClass("testRemoveDatasetsChild")
+        registry.storageClasses.registerStorageClass(childStorageClass)
+        parentStorageClass = StorageClass("testRemoveDatasetsParent",
+                                          components={"child1": childStorageClass,
+                                                      "child2": childStorageClass})
+        registry.storageClasses.registerStorageClass(parentStorageClass)
+        datasetType = DatasetType(name="parent", dimensions=registry.dimensions.extract(("instrument",)),
+                                  storageClass=parentStorageClass)
+        registry.registerDatasetType(datasetType)
+        dataIds = [{"instrument": "DummyCam"}, {"instrument": "MyCam"}, {"instrument": "OtherCam"}]
+        if not registry.limited:
+            registry.addDimensionEntryList("instrument", dataIds)
+        refs = registry.addDatasets(datasetType, dataIds, run=run, recursive=True)
+        # Only parents are returned for a collection; components are attached.
+        inCollection = registry.getDatasetsInCollection(run.collection)
+        self.assertCountEqual(inCollection, refs)
+        for ref in inCollection:
+            self.assertEqual(ref.components.keys(), {"child1", "child2"})
+        # Datasets still present in a Datastore cannot be removed.
+        registry.addDatasetLocation(refs[0], "dummystore")
+        with self.assertRaises(OrphanedRecordError):
+            registry.removeDatasets(refs[:2])
+        self.assertRowCount(registry, "dataset", 9)
+        registry.removeDatasetLocations("dummystore", refs[:1])
+        self.assertEqual(registry.getDatasetLocations(refs[0]), set())
+        # Use a small chunk size to exercise chunking.
+        registry._BULK_CHUNK_SIZE = 2
+        registry.removeDatasets(refs[:2])
+        self.assertRowCount(registry, "dataset", 3)
+        self.assertRowCount(registry, "dataset_composition", 2)
+        self.assertEqual(registry.getDatasetsInCollection(run.collection), refs[2:])
+        for ref in refs[:2]:
+            self.assertIsNone(registry.getDataset(ref.id))
+            self.assertIsNone(registry.getDataset(ref.components["child1"].id))
+        with self.assertRaises(AmbiguousDatasetError):
+            registry.removeDatasets([DatasetRef(datasetType, dataIds[2])])
+
     def testComponents(self):
         registry = self.makeRegistry()
         childStorageClass = StorageClass("testComponentsChild")
@@ -140,6 +250,19 @@ class RegistryTests(metaclass=ABCMeta):
         self.assertEqual(parent.components, children)
         outParent = registry.getDataset(parent.id)
         self.assertEqual(outParent.components, children)
+        # Components may also be retrieved only when first accessed.
+        registry.config["lazyComponents"] = True
+        lazyParent = registry.getDataset(parent.id)
+        self.assertEqual(lazyParent.components, children)
+        self.assertEqual(lazyParent, outParent)
+        registry.config["lazyComponents"] = False
+        # Associating the parent also associates its children.
+        registry.associate("tagged", [parent])
+        self.assertEqual(registry.find("tagged", childDatasetType1, dataId), children["child1"])
+        self.assertEqual(registry.find("tagged", childDatasetType2, dataId), children["child2"])
+        registry.disassociate("tagged", [parent])
+        self.assertIsNone(registry.find("tagged", parentDatasetType, dataId))
+        self.assertIsNone(registry.find("tagged", childDatasetType1, dataId))
         # Remove the parent; this should remove both children.
         registry.removeDataset(parent)
         self.assertIsNone(registry.find(run.collection, parentDatasetType, dataId))
@@ -230,6 +353,97 @@ class RegistryTests(metaclass=ABCMeta):
         registry.removeDataset(ref1)
         self.assertIsNone(registry.getQuantum(quantum.id))
 
+    def testQuanta(self):
+        registry = self.makeRegistry()
+        if not registry.limited:
+            registry.addDimensionEntry("instrument", {"instrument": "DummyCam"})
+        run = registry.makeRun(collection="test")
+        storageClass = StorageClass("testQuanta")
+        registry.storageClasses.registerStorageClass(storageClass)
+        datasetType1 = DatasetType(name="dst1", dimensions=registry.dimensions.extract(("instrument",)),
+                                   storageClass=storageClass)
+        registry.registerDatasetType(datasetType1)
+        ref1 = registry.addDataset(datasetType1, dataId={"instrument": "DummyCam"}, run=run)
+        datasetType2 = DatasetType(name="dst2", dimensions=registry.dimensions.extract(("instrument",)),
+                                   storageClass=storageClass)
+        registry.registerDatasetType(datasetType2)
+        ref2 = registry.addDataset(datasetType2, dataId={"instrument": "DummyCam"}, run=run)
+        # Quanta share one input, and one has no inputs at all.
+        quanta = []
+        for i, inputs in enumerate([(ref1,), (ref1, ref2), ()]):
+            quantum = Quantum(run=run,
+                              task=f"some.fully.qualified.SuperTask{i}",
+                              startTime=datetime(2018, 1, 1),
+                              endTime=datetime(2018, 1, 2),
+                              host="localhost")
+            for ref in inputs:
+                quantum.addPredictedInput(ref)
+            quanta.append(quantum)
+        registry.addQuanta(quanta)
+        ids = [quantum.id for quantum in quanta]
+        self.assertNotIn(None, ids)
+        self.assertEqual(len(set(ids)), len(quanta))
+        self.assertNotIn(run.id, ids)
+        self.assertRowCount(registry, "dataset_consumers", 3)
+        registry.markInputUsed(quanta[1], ref2)
+        outQuanta = registry.getQuanta(ids + [max(ids) + 100])
+        self.assertEqual(outQuanta.keys(), set(ids))
+        for quantum in quanta:
+            outQuantum = outQuanta[quantum.id]
+            self.assertEqual(outQuantum, quantum)
+            self.assertEqual(outQuantum.task, quantum.task)
+            self.assertEqual(outQuantum.predictedInputs, quantum.predictedInputs)
+            self.assertEqual(outQuantum.actualInputs, quantum.actualInputs)
+        # A Quantum added on its own afterwards gets a new ID, too.
+        quantum = Quantum(run=run, task="some.fully.qualified.SuperTask", host="localhost")
+        registry.addQuantum(quantum)
+        self.assertNotIn(quantum.id, ids + [run.id])
+        self.assertEqual(registry.getQuantum(quantum.id), quantum)
+
+    def testProvenance(self):
+        registry = self.makeRegistry()
+        if not registry.limited:
+            registry.addDimensionEntry("instrument", {"instrument": "DummyCam"})
+        run = registry.makeRun(collection="test")
+        storageClass = StorageClass("testProvenance")
+        registry.storageClasses.registerStorageClass(storageClass)
+        dataId = {"instrument": "DummyCam"}
+        for name in ("raw1", "raw2", "calexp", "coadd", "other"):
+            registry.registerDatasetType(DatasetType(name=name,
+                                                     dimensions=registry.dimensions.extract(("instrument",)),
+                                                     storageClass=storageClass))
+
+        def addQuantum(task, inputs):
+            quantum = Quantum(run=run, task=task, host="localhost")
+            for ref in inputs:
+                quantum.addPredictedInput(ref)
+            registry.addQuantum(quantum)
+            return quantum
+
+        # raw1, raw2 -> calexp -> coadd, and raw1 -> other.
+        raw1 = registry.addDataset("raw1", dataId, run=run)
+        raw2 = registry.addDataset("raw2", dataId, run=run)
+        calexp = registry.addDataset("calexp", dataId, run=run,
+                                     producer=addQuantum("calibrate", [raw1, raw2]))
+        coadd, = registry.addDatasets("coadd", [dataId], run=run,
+                                      producer=addQuantum("assemble", [calexp]))
+        other = registry.addDataset("other", dataId, run=run, producer=addQuantum("other", [raw1]))
+        # Results should be the same whether or not they are streamed, even
+        # when they are fetched one row at a time.
+        for streamResults, chunkSize in ((False, 1000), (False, 1), (True, 1)):
+            registry.config["streamResults"] = streamResults
+            registry.config["fetchChunkSize"] = chunkSize
+            self.assertCountEqual(registry.getUpstreamDatasets(coadd), [raw1, raw2, calexp])
+            self.assertCountEqual(registry.getUpstreamDatasets(coadd, depth=1), [calexp])
+            self.assertCountEqual(registry.getUpstreamDatasets(other), [raw1])
+            self.assertCountEqual(registry.getUpstreamDatasets(raw1), [])
+            self.assertCountEqual(registry.getDownstreamDatasets(raw1), [calexp, coadd, other])
+            self.assertCountEqual(registry.getDownstreamDatasets(raw1, depth=1), [calexp, other])
+            self.assertCountEqual(registry.getDownstreamDatasets(raw2), [calexp, coadd])
+            self.assertCountEqual(registry.getDownstreamDatasets(coadd), [])
+        with self.assertRaises(AmbiguousDatasetError):
+            registry.getUpstreamDatasets(DatasetRef(coadd.datasetType, dataId))
+
     def testDatasetLocations(self):
         registry = self.makeRegistry()
         storageClass = StorageClass("testStorageInfo")
@@ -324,6 +538,46 @@ class RegistryTests(metaclass=ABCMeta):
         nonExistingDataId = {"instrument": "DummyCam", "visit": 42}
         self.assertIsNone(registry.find(collection, datasetType, nonExistingDataId))
 
+    def testCompiledStatements(self):
+        registry = self.makeRegistry()
+        storageClass = StorageClass("testCompiledStatements")
+        registry.storageClasses.registerStorageClass(storageClass)
+        datasetType = DatasetType(name="dummytype", dimensions=registry.dimensions.extract(("instrument",)),
+                                  storageClass=storageClass)
+        registry.registerDatasetType(datasetType)
+        dataIds = [{"instrument": "DummyCam"}, {"instrument": "MyCam"}]
+        if not registry.limited:
+            registry.addDimensionEntryList("instrument", dataIds)
+        run = registry.makeRun(collection="test")
+        refs = [registry.addDataset(datasetType, dataId=dataId, run=run) for dataId in dataIds]
+        self.assertEqual(registry.find(run.collection, datasetType, dataIds[0]), refs[0])
+        self.assertEqual(registry.getDataset(refs[0].id), refs[0])
+        size = len(registry._compiledCache)
+        # Lookups with new values reuse the same compiled statements.
+        self.assertEqual(registry.find(run.collection, datasetType, dataIds[1]), refs[1])
+        self.assertIsNone(registry.find("other", datasetType, dataIds[1]))
+        self.assertEqual(registry.getDataset(refs[1].id), refs[1])
+        self.assertEqual(len(registry._compiledCache), size)
+
+    def testFindMany(self):
+        registry = self.makeRegistry()
+        storageClass = StorageClass("testFindMany")
+        registry.storageClasses.registerStorageClass(storageClass)
+        datasetType = DatasetType(name="dummytype", dimensions=registry.dimensions.extract(("instrument",)),
+                                  storageClass=storageClass)
+        registry.registerDatasetType(datasetType)
+        dataIds = [{"instrument": "DummyCam"}, {"instrument": "MyCam"}, {"instrument": "OtherCam"}]
+        if not registry.limited:
+            registry.addDimensionEntryList("instrument", dataIds)
+        run = registry.makeRun(collection="test")
+        refs = [registry.addDataset(datasetType, dataId=dataId, run=run) for dataId in dataIds[:2]]
+        found = registry.findMany(run.collection, datasetType, dataIds)
+        self.assertEqual(len(found), 2)
+        for dataId, ref in zip(dataIds, refs):
+            self.assertEqual(found[DataId(dataId, dimensions=datasetType.dimensions)], ref)
+        self.assertEqual(registry.findMany("other", datasetType, dataIds), {})
+        self.assertEqual(registry.findMany(run.collection, datasetType, []), {})
+
     def testCollections(self):
         registry = self.makeRegistry()
         storageClass = StorageClass("testCollections")
@@ -436,6 +690,25 @@ class RegistryTests(metaclass=ABCMeta):
             registry.associate(newCollection, [ref1_run3])
         with self.assertRaises(ConflictingDefinitionError):
             registry.associate(newCollection, [ref1_run3, ref2_run3])
+        # re-associating refs already in the collection along with new ones
+        # adds only the new ones, and repeated refs are OK as well
+        otherCollection = "other"
+        registry.associate(otherCollection, [ref1_run1])
+        self.assertRowCount(registry, "dataset_collection", 11)
+        registry.associate(otherCollection, [ref1_run1, ref2_run1, ref2_run1, ref1_run2])
+        self.assertRowCount(registry, "dataset_collection", 13)
+        self.assertEqual(registry.find(otherCollection, datasetType1, dataId1), ref1_run1)
+        self.assertEqual(registry.find(otherCollection, datasetType1, dataId2), ref2_run1)
+        self.assertEqual(registry.find(otherCollection, datasetType2, dataId1), ref1_run2)
+        # a conflict anywhere in the refs adds none of them, whether it is
+        # with an existing entry or within the refs themselves
+        with self.assertRaises(ConflictingDefinitionError):
+            registry.associate(otherCollection, [ref2_run2, ref1_run3])
+        with self.assertRaises(ConflictingDefinitionError):
+            registry.associate("empty", [ref2_run2, ref1_run3, ref1_run2])
+        self.assertRowCount(registry, "dataset_collection", 13)
+        self.assertIsNone(registry.find(otherCollection, datasetType2, dataId2))
+        self.assertIsNone(registry.find("empty", datasetType2, dataId2))
 
     def testDatasetUnit(self):
         registry = self.makeRegistry()
@@ -652,6 +925,118 @@ class RegistryTests(metaclass=ABCMeta):
         dataId2a = packer.unpack(8)
         self.assertEqual(dataId2, dataId2a)
 
+    def testExpandDataIds(self):
+        registry = self.makeRegistry()
+        if registry.limited:
+            with self.assertRaises(NotImplementedError):
+                registry.expandDataIds([{"instrument": "DummyCam"}])
+            return
+        registry.addDimensionEntry("instrument", {"instrument": "DummyCam"})
+        for physical_filter, abstract_filter in (("R", "r"), ("I", "i")):
+            registry.addDimensionEntry("physical_filter",
+                                       {"instrument": "DummyCam", "physical_filter": physical_filter,
+                                        "abstract_filter": abstract_filter})
+        for visit in range(6):
+            registry.addDimensionEntry("visit",
+                                       {"instrument": "DummyCam", "visit": visit,
+                                        "physical_filter": "R" if visit % 2 else "I"})
+        # Include a duplicate data ID.
+        dataIds = [{"instrument": "DummyCam", "visit": visit} for visit in (0, 1, 2, 3, 4, 5, 3)]
+        expanded = registry.expandDataIds(dataIds)
+        self.assertEqual(len(expanded), len(dataIds))
+        for dataId, result in zip(dataIds, expanded):
+            self.assertIsInstance(result, DataId)
+            self.assertEqual(result["visit"], dataId["visit"])
+            physical_filter = "R" if dataId["visit"] % 2 else "I"
+            self.assertEqual(result.entries["visit"]["physical_filter"], physical_filter)
+            self.assertEqual(result.entries["physical_filter"]["abstract_filter"], physical_filter.lower())
+            self.assertEqual(result.entries, registry.expandDataId(dataId).entries)
+        # DataIds are expanded in-place.
+        dataId = DataId(instrument="DummyCam", visit=1, universe=registry.dimensions)
+        registry.expandDataIds([dataId])
+        self.assertEqual(dataId.entries["visit"]["physical_filter"], "R")
+        # A missing entry for any data ID should raise.
+        with self.assertRaises(LookupError):
+            registry.expandDataIds([{"instrument": "DummyCam", "visit": 1},
+                                    {"instrument": "DummyCam", "visit": 6}])
+
+    def testAddDatasetsExpandsInBulk(self):
+        """Test that addDatasets expands all data IDs with one metadata query
+        per element, rather than one per data ID.
+        """
+        registry = self.makeRegistry()
+        if registry.limited:
+            return
+        registry.addDimensionEntry("instrument", {"instrument": "DummyCam"})
+        registry.addDimensionEntry("physical_filter",
+                                   {"instrument": "DummyCam", "physical_filter": "R",
+                                    "abstract_filter": "r"})
+        for visit in range(4):
+            registry.addDimensionEntry("visit",
+                                       {"instrument": "DummyCam", "visit": visit, "physical_filter": "R"})
+        storageClass = StorageClass("testAddDatasetsExpand")
+        registry.storageClasses.registerStorageClass(storageClass)
+        datasetType = DatasetType(name="expanded", dimensions=registry.dimensions.extract(("visit",)),
+                                  storageClass=storageClass)
+        registry.registerDatasetType(datasetType)
+        run = registry.makeRun(collection="test")
+        registry.resetMetadataCacheStatistics()
+        with unittest.mock.patch.object(registry, "_queryMetadataMany",
+                                        wraps=registry._queryMetadataMany) as queryMany, \
+                unittest.mock.patch.object(registry, "_queryMetadata",
+                                           wraps=registry._queryMetadata) as queryOne:
+            refs = registry.addDatasets(datasetType, [{"instrument": "DummyCam", "visit": visit}
+                                                      for visit in range(4)], run=run)
+        self.assertEqual(queryOne.call_count, 0)
+        elements = [call[0][0].name for call in queryMany.call_args_list]
+        self.assertEqual(len(elements), len(set(elements)))
+        self.assertIn("visit", elements)
+        self.assertEqual(registry.getMetadataCacheStatistics()["visit"]["misses"], 4)
+        for visit, ref in enumerate(refs):
+            self.assertEqual(ref.dataId.entries["visit"]["physical_filter"], "R")
+
+    def testMetadataCache(self):
+        registry = self.makeRegistry()
+        if registry.limited:
+            return
+        registry.addDimensionEntry("instrument", {"instrument": "DummyCam"})
+        registry.addDimensionEntry("physical_filter",
+                                   {"instrument": "DummyCam", "physical_filter": "R",
+                                    "abstract_filter": "r"})
+        registry.addDimensionEntry("visit",
+                                   {"instrument": "DummyCam", "visit": 5, "physical_filter": "R"})
+        registry.resetMetadataCacheStatistics()
+        # First expansion should query the database for the visit.
+        dataId = registry.expandDataId(instrument="DummyCam", visit=5)
+        self.assertEqual(dataId.entries["visit"]["physical_filter"], "R")
+        stats = registry.getMetadataCacheStatistics()
+        self.assertEqual(stats["visit"]["misses"], 1)
+        self.assertEqual(stats["visit"]["hits"], 0)
+        self.assertEqual(stats["visit"]["size"], 1)
+        # Second expansion should be served by the cache.
+        dataId = registry.expandDataId(instrument="DummyCam", visit=5)
+        self.assertEqual(dataId.entries["visit"]["physical_filter"], "R")
+        stats = registry.getMetadataCacheStatistics()
+        self.assertEqual(stats["visit"]["misses"], 1)
+        self.assertEqual(stats["visit"]["hits"], 1)
+        # Setting a region should update the cached entry rather than leave
+        # it stale.
+        region = lsst.sphgeom.ConvexPolygon((lsst.sphgeom.UnitVector3d(1, 0, 0),
+                                             lsst.sphgeom.UnitVector3d(0, 1, 0),
+                                             lsst.sphgeom.UnitVector3d(0, 0, 1)))
+        registry.setDimensionRegion({"instrument": "DummyCam", "visit": 5}, dimension="visit",
+                                    region=region, update=True)
+        self.assertEqual(registry.expandDataId(instrument="DummyCam", visit=5, region=True).region, region)
+        stats = registry.getMetadataCacheStatistics()
+        self.assertEqual(stats["visit"]["misses"], 1)
+        self.assertEqual(stats["visit"]["hits"], 2)
+        # Rolling back a transaction should empty the cache.
+        with self.assertRaises(ConflictingDefinitionError):
+            with registry.transaction():
+                registry.addDimensionEntry("visit",
+                                           {"instrument": "DummyCam", "visit": 5, "physical_filter": "R"})
+        self.assertEqual(registry.getMetadataCacheStatistics()["visit"]["size"], 0)
+
 
 class SqlRegistryTestCase(unittest.TestCase, RegistryTests):
     """Test for SqlRegistry.
@@ -692,6 +1077,192 @@ class SqlRegistryTestCase(unittest.TestCase, RegistryTests):
         self.assertIsNotNone(registry.findDimensionEntry(dimension, dataId1))
         self.assertIsNone(registry.findDimensionEntry(dimension, dataId2))
 
+    def testSkyPixRanges(self):
+        testDir = os.path.dirname(__file__)
+        configFile = os.path.join(testDir, "config/basic/butler.yaml")
+        regionPatch = lsst.sphgeom.ConvexPolygon((lsst.sphgeom.UnitVector3d(1, 1, 0),
+                                                  lsst.sphgeom.UnitVector3d(0, 1, 0),
+                                                  lsst.sphgeom.UnitVector3d(0, 0, 1)))
+        regionVisitDetector = lsst.sphgeom.ConvexPolygon((lsst.sphgeom.UnitVector3d(1, 0, 0),
+                                                          lsst.sphgeom.UnitVector3d(0, 1, 0),
+                                                          lsst.sphgeom.UnitVector3d(0, 1, 1)))
+        counts = {}
+        for ranges in (False, True):
+            butlerConfig = ButlerConfig(configFile)
+            butlerConfig["registry", "skypix", "ranges"] = ranges
+            registry = Registry.fromConfig(butlerConfig, create=True)
+            registry.addDimensionEntry("instrument", {"instrument": "DummyCam"})
+            registry.addDimensionEntry("physical_filter",
+                                       {"instrument": "DummyCam", "physical_filter": "dummy_r",
+                                        "abstract_filter": "r"})
+            registry.addDimensionEntry("detector", {"instrument": "DummyCam", "detector": 2})
+            registry.addDimensionEntry("visit",
+                                       {"instrument": "DummyCam", "visit": 0, "physical_filter": "dummy_r"})
+            registry.addDimensionEntry("skymap", {"skymap": "DummySkyMap", "hash": bytes()})
+            registry.addDimensionEntry("tract", {"skymap": "DummySkyMap", "tract": 0})
+            registry.addDimensionEntry("patch",
+                                       {"skymap": "DummySkyMap", "tract": 0, "patch": 0,
+                                        "cell_x": 0, "cell_y": 0, "region": regionPatch})
+            registry.setDimensionRegion({"instrument": "DummyCam", "visit": 0, "detector": 2},
+                                        dimensions=["visit", "detector"],
+                                        region=regionVisitDetector, update=False)
+            rows = list(registry.query('select count(*) as "cnt" from "patch_skypix_join"'))
+            counts[ranges] = rows[0]["cnt"]
+            # The spatial join views should give the same answer either way.
+            rows = list(registry.query('select instrument, visit, detector, skymap, tract, patch '
+                                       'from "visit_detector_patch_join"'))
+            self.assertEqual([tuple(row) for row in rows], [("DummyCam", 0, 2, "DummySkyMap", 0, 0)])
+            # Queries for skypix values need a skypix column, which range
+            # tables don't have.
+            dimensions = registry.dimensions.extract(("instrument", "visit", "detector", "skypix"))
+            if ranges:
+                with self.assertRaisesRegex(ValueError, "skypix.ranges"):
+                    MultipleDatasetQueryBuilder.fromDimensions(registry, dimensions)
+            else:
+                builder = MultipleDatasetQueryBuilder.fromDimensions(registry, dimensions)
+                self.assertGreater(len(list(builder.execute())), 0)
+        self.assertGreater(counts[False], counts[True])
+        self.assertGreater(counts[True], 0)
+
+    def testEnvelopeProcesses(self):
+        testDir = os.path.dirname(__file__)
+        configFile = os.path.join(testDir, "config/basic/butler.yaml")
+        regions = [
+            lsst.sphgeom.ConvexPolygon((lsst.sphgeom.UnitVector3d(1, 1, 0),
+                                        lsst.sphgeom.UnitVector3d(0, 1, 0),
+                                        lsst.sphgeom.UnitVector3d(0, 0, 1))),
+            lsst.sphgeom.ConvexPolygon((lsst.sphgeom.UnitVector3d(1, 0, 0),
+                                        lsst.sphgeom.UnitVector3d(0, 1, 0),
+                                        lsst.sphgeom.UnitVector3d(0, 1, 1))),
+            lsst.sphgeom.ConvexPolygon((lsst.sphgeom.UnitVector3d(1, 0, 0),
+                                        lsst.sphgeom.UnitVector3d(0, 1, 1),
+                                        lsst.sphgeom.UnitVector3d(0, 0, 1))),
+        ]
+        results = {}
+        for processes in (0, 2):
+            butlerConfig = ButlerConfig(configFile)
+            butlerConfig["registry", "envelopeProcesses"] = processes
+            # Force more than one insert statement.
+            butlerConfig["registry", "skypixInsertChunkSize"] = 10
+            registry = Registry.fromConfig(butlerConfig, create=True)
+            registry.addDimensionEntry("skymap", {"skymap": "DummySkyMap", "hash": bytes()})
+            registry.addDimensionEntry("tract", {"skymap": "DummySkyMap", "tract": 0})
+            registry.addDimensionEntryList(
+                "patch",
+                [{"skymap": "DummySkyMap", "tract": 0, "patch": patch, "cell_x": patch, "cell_y": 0,
+                  "region": region} for patch, region in enumerate(regions)]
+            )
+            results[processes] = set(
+                tuple(row) for row in registry.query('select patch, skypix from "patch_skypix_join"')
+            )
+        self.assertEqual(results[0], results[2])
+        self.assertEqual({patch for patch, _ in results[2]}, {0, 1, 2})
+
+    def testQueryInstrumentation(self):
+        registry = self.makeRegistry()
+        registry.addDimensionEntry("instrument", {"instrument": "DummyCam"})
+        self.assertNotIn("statements", registry.getQueryStatistics())
+        self.assertEqual(registry.getSlowQueries(), [])
+
+        testDir = os.path.dirname(__file__)
+        configFile = os.path.join(testDir, "config/basic/butler.yaml")
+        butlerConfig = ButlerConfig(configFile)
+        butlerConfig["registry", "instrumentation", "enabled"] = True
+        # Treat every statement as slow.
+        butlerConfig["registry", "instrumentation", "slowQueryThreshold"] = 0.0
+        butlerConfig["registry", "instrumentation", "slowQueryLogSize"] = 3
+        registry = Registry.fromConfig(butlerConfig, create=True)
+        registry.resetQueryStatistics()
+        registry.addDimensionEntryList("instrument", [{"instrument": "DummyCam"},
+                                                      {"instrument": "MyCam"}])
+        for i in range(2):
+            rows = list(registry.query('select instrument from "instrument"'))
+            self.assertEqual(len(rows), 2)
+        statements = registry.getQueryStatistics()["statements"]
+        select, = [entry for sql, entry in statements.items() if sql.startswith("select instrument")]
+        self.assertEqual(select["count"], 2)
+        self.assertEqual(select["rows"], 4)
+        self.assertGreaterEqual(select["totalTime"], select["maxTime"])
+        insert, = [entry for sql, entry in statements.items() if sql.startswith("INSERT")]
+        self.assertEqual(insert["rows"], 2)
+        slowQueries = registry.getSlowQueries()
+        self.assertEqual(len(slowQueries), 3)
+        self.assertTrue(slowQueries[-1]["statement"].startswith("select instrument"))
+        registry.resetQueryStatistics()
+        self.assertEqual(registry.getQueryStatistics()["statements"], {})
+        self.assertEqual(registry.getSlowQueries(), [])
+        # Statements whose results are fetched directly, as by find, are
+        # timed, and autoincrement primary keys are still reported.
+        storageClass = StorageClass("testDataset")
+        registry.storageClasses.registerStorageClass(storageClass)
+        datasetType = DatasetType(name="summary", dimensions=("instrument",), storageClass=storageClass)
+        registry.registerDatasetType(datasetType)
+        run = registry.makeRun(collection="test")
+        self.assertIsNotNone(run.id)
+        ref = registry.addDataset(datasetType, dataId={"instrument": "DummyCam"}, run=run)
+        self.assertIsNotNone(ref.id)
+        registry.resetQueryStatistics()
+        self.assertEqual(registry.find(run.collection, datasetType, instrument="DummyCam"), ref)
+        self.assertIsNone(registry.find(run.collection, datasetType, instrument="MyCam"))
+        statements = registry.getQueryStatistics()["statements"]
+        find, = [entry for sql, entry in statements.items() if "dataset_collection.collection = ?" in sql]
+        self.assertEqual(find["count"], 2)
+        # A failing statement does not leave a start time behind.
+        with self.assertRaises(OperationalError):
+            list(registry.query('select instrument from "no_such_table"'))
+        self.assertEqual(len(registry._instrumentation._startTimes), 0)
+        rows = list(registry.query('select instrument from "instrument"'))
+        self.assertEqual(len(rows), 2)
+
+    def testThreadSafe(self):
+        testDir = os.path.dirname(__file__)
+        configFile = os.path.join(testDir, "config/basic/butler.yaml")
+        butlerConfig = ButlerConfig(configFile)
+        butlerConfig["registry", "threadSafe"] = True
+        # In-memory SQLite databases can't be shared between connections.
+        with self.assertRaises(ValueError):
+            Registry.fromConfig(butlerConfig, create=True)
+        with tempfile.TemporaryDirectory() as root:
+            butlerConfig["registry", "db"] = f"sqlite:///{root}/gen3.sqlite3"
+            registry = Registry.fromConfig(butlerConfig, create=True)
+            self.assertTrue(registry.threadSafe)
+            registry.addDimensionEntry("instrument", {"instrument": "DummyCam"})
+
+            def addDetectors(start):
+                # Each thread gets its own transaction; a failure in one
+                # should only roll back that thread's insertions.
+                with self.assertRaises(ConflictingDefinitionError):
+                    with registry.transaction():
+                        registry.addDimensionEntry("detector", {"instrument": "DummyCam",
+                                                                "detector": 100 + start})
+                        registry.addDimensionEntry("instrument", {"instrument": "DummyCam"})
+                for detector in range(start, start + 5):
+                    registry.addDimensionEntry("detector", {"instrument": "DummyCam", "detector": detector})
+                return registry._connection
+
+            with ThreadPoolExecutor(4) as pool:
+                connections = list(pool.map(addDetectors, range(0, 20, 5)))
+            self.assertNotIn(registry._connection, connections)
+            self.assertEqual({entry["detector"] for entry in registry.findDimensionEntries("detector")},
+                             set(range(20)))
+
+            # With a single pooled connection, other threads can only use the
+            # Registry once this thread releases its connection.
+            butlerConfig["registry", "poolSize"] = 1
+            butlerConfig["registry", "poolOverflow"] = 0
+            butlerConfig["registry", "poolTimeout"] = 0.1
+            registry = Registry.fromConfig(butlerConfig)
+            self.assertEqual(len(registry.findDimensionEntries("detector")), 20)
+            with ThreadPoolExecutor(1) as pool:
+                with self.assertRaises(PoolTimeoutError):
+                    pool.submit(registry.findDimensionEntries, "detector").result()
+            with registry.transaction():
+                with self.assertRaises(RuntimeError):
+                    registry.releaseConnection()
+            registry.releaseConnection()
+            with ThreadPoolExecutor(1) as pool:
+                self.assertEqual(len(pool.submit(registry.findDimensionEntries, "detector").result()), 20)
+
 
 class LimitedSqlRegistryTestCase(unittest.TestCase, RegistryTests):
     """Test for SqlRegistry with limited=True.
@@ -19,9 +19,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import time
 import unittest
 
-from lsst.daf.butler.core.utils import iterable, getFullTypeName, Singleton
+from lsst.daf.butler.core.utils import iterable, getFullTypeName, Singleton, parallelMap, chunked
 from lsst.daf.butler.core.formatter import Formatter
 from lsst.daf.butler import StorageClass
 
@@ -89,5 +90,41 @@ class TestButlerUtils(unittest.TestCase):
             self.assertEqual(getFullTypeName(item), typeName)
 
 
+def _slowSquare(x):
+    """Square a number, taking longer for smaller numbers."""
+    time.sleep(0.01*(5 - x))
+    if x < 0:
+        raise ValueError(f"Negative input {x}")
+    return x*x
+
+
+class ParallelMapTestCase(unittest.TestCase):
+    """Tests for `parallelMap` helper."""
+
+    def testSerial(self):
+        self.assertEqual(list(parallelMap(_slowSquare, range(5))), [(x, x*x) for x in range(5)])
+
+    def testThreads(self):
+        expected = [(x, x*x) for x in range(5)]
+        self.assertEqual(list(parallelMap(_slowSquare, range(5), workers=3)), expected)
+        self.assertCountEqual(list(parallelMap(_slowSquare, range(5), workers=3, ordered=False)),
+                              expected)
+        with self.assertRaises(ValueError):
+            list(parallelMap(_slowSquare, [1, 2, -1, 3], workers=2))
+
+    def testProcesses(self):
+        self.assertEqual(list(parallelMap(_slowSquare, range(5), workers=2, processes=True)),
+                         [(x, x*x) for x in range(5)])
+
+
+class ChunkedTestCase(unittest.TestCase):
+    """Tests for `chunked` helper."""
+
+    def testChunked(self):
+        self.assertEqual(list(chunked(range(7), 3)), [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertEqual(list(chunked(iter(range(4)), 2)), [[0, 1], [2, 3]])
+        self.assertEqual(list(chunked([], 3)), [])
+
+
 if __name__ == "__main__":
     unittest.main()